@@ -1,28 +1,70 @@
+import threading
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from contextlib import contextmanager
 
 
+DB_CONFIG = {
+    "host": "localhost",      # XAMPP MySQL server host
+    "user": "root",           # Default XAMPP username
+    "password": "",           # Default: blank password
+    "database": "db_laundry"  # Your actual database name
+}
+
+# Connections kept open for reuse; get_db_connection() falls back to a
+# plain connection when all of them are checked out.
+POOL_SIZE = 5
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Create the pool on first use (retried on later calls if MySQL is down)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(
+                pool_name="laundry", pool_size=POOL_SIZE, **DB_CONFIG)
+            print("Connection to MySQL DB successful!")
+        return _pool
+
+
 def get_db_connection():
+    """
+    Get a connection from the pool. close() hands it back to the pool
+    instead of disconnecting, so callers keep the usual open/close pattern.
+    Returns None if MySQL is unreachable.
+    """
     try:
-        connection = mysql.connector.connect(
-            host="localhost",      # XAMPP MySQL server host
-            user="root",           # Default XAMPP username
-            password="",           # Default: blank password
-            database="db_laundry"  # Your actual database name
-        )
-        if connection.is_connected():
-            print("Connection to MySQL DB successful!")
-        return connection
+        try:
+            return _get_pool().get_connection()
+        except pooling.PoolError:
+            # Every pooled connection is in use
+            return mysql.connector.connect(**DB_CONFIG)
     except Error as e:
         # Prints error if connection fails and returns None
         print(f"Error: {e}")
         return None
 
 
+class VersionConflictError(Exception):
+    """Raised when a row was changed by someone else since it was read."""
+
+    def __init__(self, table_name, row_id):
+        super().__init__(
+            f"{table_name} row {row_id} was changed by another terminal")
+        self.table_name = table_name
+        self.row_id = row_id
+
+
 @contextmanager
-def db_cursor(conn, dictionary=True):
-    cursor = conn.cursor(dictionary=dictionary)
+def db_cursor(conn, dictionary=True, buffered=None):
+    # buffered=False streams rows from the server as they are fetched
+    if buffered is None:
+        cursor = conn.cursor(dictionary=dictionary)
+    else:
+        cursor = conn.cursor(dictionary=dictionary, buffered=buffered)
     try:
         yield cursor
     finally:
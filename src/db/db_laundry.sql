@@ -59,6 +59,21 @@ INSERT INTO `categories` (`category_id`, `category_name`) VALUES
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `change_log`
+--
+
+CREATE TABLE `change_log` (
+  `change_id` bigint(20) NOT NULL,
+  `table_name` varchar(30) NOT NULL,
+  `row_id` int(11) NOT NULL,
+  `order_id` int(11) DEFAULT NULL,
+  `op` enum('insert','update','delete') NOT NULL,
+  `changed_at` datetime NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `customers`
 --
@@ -67,12 +82,40 @@ CREATE TABLE `customers` (
   `customer_id` int(11) NOT NULL,
   `customer_name` varchar(60) NOT NULL,
   `customer_phone` varchar(15) NOT NULL,
+  `customer_phone_normalized` varchar(15) DEFAULT NULL,
   `customer_email` varchar(100) NOT NULL,
   `customer_address` varchar(500) DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `import_checkpoints`
+--
+
+CREATE TABLE `import_checkpoints` (
+  `source` varchar(255) NOT NULL,
+  `last_line` int(11) NOT NULL,
+  `orders` int(11) NOT NULL,
+  `updated_at` datetime NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `offline_replays`
+--
+
+CREATE TABLE `offline_replays` (
+  `journal_id` char(32) NOT NULL,
+  `entry_id` int(11) NOT NULL,
+  `order_id` int(11) DEFAULT NULL,
+  `payment_id` int(11) DEFAULT NULL,
+  `replayed_at` datetime NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `orders`
 --
@@ -82,7 +125,11 @@ CREATE TABLE `orders` (
   `customer_id` int(11) NOT NULL,
   `order_status_id` int(11) NOT NULL,
   `order_date` datetime NOT NULL DEFAULT current_timestamp(),
-  `total_price` decimal(10,2) NOT NULL
+  `status_changed_at` datetime NOT NULL DEFAULT current_timestamp(),
+  `total_price` decimal(10,2) NOT NULL,
+  `amount_paid_total` decimal(10,2) NOT NULL DEFAULT 0.00,
+  `balance` decimal(10,2) NOT NULL DEFAULT 0.00,
+  `version` int(11) NOT NULL DEFAULT 1
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
@@ -101,6 +148,36 @@ CREATE TABLE `order_items` (
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `order_status_history`
+--
+
+CREATE TABLE `order_status_history` (
+  `history_id` bigint(20) NOT NULL,
+  `order_id` int(11) NOT NULL,
+  `from_status_id` int(11) DEFAULT NULL,
+  `to_status_id` int(11) NOT NULL,
+  `changed_at` datetime NOT NULL DEFAULT current_timestamp(),
+  `admin_id` int(11) DEFAULT NULL,
+  `seconds_in_from` int(11) DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `order_status_durations`
+--
+
+CREATE TABLE `order_status_durations` (
+  `order_status_id` int(11) NOT NULL,
+  `entered_count` bigint(20) NOT NULL DEFAULT 0,
+  `exited_count` bigint(20) NOT NULL DEFAULT 0,
+  `total_seconds` bigint(20) NOT NULL DEFAULT 0,
+  `max_seconds` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `order_statuses`
 --
@@ -135,7 +212,8 @@ CREATE TABLE `payments` (
   `amount_paid` decimal(10,2) NOT NULL,
   `payment_date` datetime NOT NULL DEFAULT current_timestamp(),
   `payment_method_id` int(11) NOT NULL,
-  `payment_status_id` int(11) NOT NULL
+  `payment_status_id` int(11) NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 1
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
@@ -221,6 +299,20 @@ INSERT INTO `services` (`service_id`, `category_id`, `service_name`, `min_price`
 (17, 4, 'Pressing (Ironing)', 20.00, 30.00, 'per piece', 'for standard service'),
 (18, 4, 'Special Stain Removal', 100.00, 500.00, 'per piece', 'depending on fabric & stain type');
 
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `service_status_durations`
+--
+
+CREATE TABLE `service_status_durations` (
+  `service_id` int(11) NOT NULL,
+  `order_status_id` int(11) NOT NULL,
+  `order_count` bigint(20) NOT NULL DEFAULT 0,
+  `units_total` bigint(20) NOT NULL DEFAULT 0,
+  `total_seconds` bigint(20) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 --
 -- Indexes for dumped tables
 --
@@ -238,11 +330,34 @@ ALTER TABLE `admin`
 ALTER TABLE `categories`
   ADD PRIMARY KEY (`category_id`);
 
+--
+-- Indexes for table `change_log`
+--
+ALTER TABLE `change_log`
+  ADD PRIMARY KEY (`change_id`);
+
 --
 -- Indexes for table `customers`
 --
 ALTER TABLE `customers`
-  ADD PRIMARY KEY (`customer_id`);
+  ADD PRIMARY KEY (`customer_id`),
+  ADD KEY `customer_name` (`customer_name`),
+  ADD KEY `customer_phone` (`customer_phone`),
+  ADD UNIQUE KEY `customer_phone_normalized` (`customer_phone_normalized`),
+  ADD KEY `customer_email` (`customer_email`),
+  ADD FULLTEXT KEY `customer_name_ft` (`customer_name`);
+
+--
+-- Indexes for table `import_checkpoints`
+--
+ALTER TABLE `import_checkpoints`
+  ADD PRIMARY KEY (`source`);
+
+--
+-- Indexes for table `offline_replays`
+--
+ALTER TABLE `offline_replays`
+  ADD PRIMARY KEY (`journal_id`,`entry_id`);
 
 --
 -- Indexes for table `orders`
@@ -250,7 +365,12 @@ ALTER TABLE `customers`
 ALTER TABLE `orders`
   ADD PRIMARY KEY (`order_id`),
   ADD KEY `customer_id` (`customer_id`),
-  ADD KEY `order_status_id` (`order_status_id`);
+  ADD KEY `order_status_id` (`order_status_id`),
+  ADD KEY `order_date` (`order_date`),
+  ADD KEY `total_price` (`total_price`),
+  ADD KEY `balance` (`balance`),
+  ADD KEY `order_status_date` (`order_status_id`,`order_date`),
+  ADD KEY `order_status_changed` (`order_status_id`,`status_changed_at`);
 
 --
 -- Indexes for table `order_items`
@@ -260,6 +380,20 @@ ALTER TABLE `order_items`
   ADD KEY `order_id` (`order_id`),
   ADD KEY `service_id` (`service_id`);
 
+--
+-- Indexes for table `order_status_history`
+--
+ALTER TABLE `order_status_history`
+  ADD PRIMARY KEY (`history_id`),
+  ADD KEY `order_id` (`order_id`),
+  ADD KEY `changed_at` (`changed_at`);
+
+--
+-- Indexes for table `order_status_durations`
+--
+ALTER TABLE `order_status_durations`
+  ADD PRIMARY KEY (`order_status_id`);
+
 --
 -- Indexes for table `order_statuses`
 --
@@ -294,6 +428,12 @@ ALTER TABLE `services`
   ADD PRIMARY KEY (`service_id`),
   ADD KEY `category_id` (`category_id`);
 
+--
+-- Indexes for table `service_status_durations`
+--
+ALTER TABLE `service_status_durations`
+  ADD PRIMARY KEY (`service_id`,`order_status_id`);
+
 --
 -- AUTO_INCREMENT for dumped tables
 --
@@ -310,6 +450,12 @@ ALTER TABLE `admin`
 ALTER TABLE `categories`
   MODIFY `category_id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=5;
 
+--
+-- AUTO_INCREMENT for table `change_log`
+--
+ALTER TABLE `change_log`
+  MODIFY `change_id` bigint(20) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT for table `customers`
 --
@@ -328,6 +474,12 @@ ALTER TABLE `orders`
 ALTER TABLE `order_items`
   MODIFY `order_item_id` int(11) NOT NULL AUTO_INCREMENT;
 
+--
+-- AUTO_INCREMENT for table `order_status_history`
+--
+ALTER TABLE `order_status_history`
+  MODIFY `history_id` bigint(20) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT for table `order_statuses`
 --
@@ -0,0 +1,161 @@
+"""
+One-off cleanup for databases created before customers were matched by
+phone number: merges customers that share a normalized phone into one row,
+repoints their orders, and then adds the unique phone index that
+Customer.find_or_create relies on.
+
+Run from the src directory:
+    python -m db.dedupe_customers            # merge and add the index
+    python -m db.dedupe_customers --dry-run  # only report what would change
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_db_connection, db_cursor  # noqa: E402
+from models.customer_class import normalize_phone  # noqa: E402
+
+
+# Duplicate groups merged per transaction
+MERGE_BATCH_SIZE = 200
+
+
+def ensure_normalized_column(cursor):
+    cursor.execute("SHOW COLUMNS FROM customers LIKE 'customer_phone_normalized'")
+    if cursor.fetchall():
+        return
+    print("➕ Adding customers.customer_phone_normalized")
+    cursor.execute("""
+        ALTER TABLE customers
+        ADD COLUMN customer_phone_normalized varchar(15) DEFAULT NULL
+        AFTER customer_phone
+    """)
+
+
+def ensure_unique_index(cursor):
+    cursor.execute(
+        "SHOW INDEX FROM customers WHERE Key_name = 'customer_phone_normalized'")
+    if cursor.fetchall():
+        return
+    print("➕ Adding unique index on customers.customer_phone_normalized")
+    cursor.execute("""
+        ALTER TABLE customers
+        ADD UNIQUE KEY customer_phone_normalized (customer_phone_normalized)
+    """)
+
+
+def find_duplicate_groups(cursor):
+    """
+    Group customer ids by normalized phone.
+    Returns {normalized_phone: [customer_id, ...]} with ids ascending.
+    """
+    groups = {}
+    cursor.execute(
+        "SELECT customer_id, customer_phone FROM customers ORDER BY customer_id")
+    for row in cursor.fetchall():
+        normalized = normalize_phone(row["customer_phone"])
+        if normalized:
+            groups.setdefault(normalized, []).append(row["customer_id"])
+    return groups
+
+
+def merge_group(cursor, normalized, customer_ids):
+    """
+    Keep the oldest customer id, give it the newest contact details,
+    move every order onto it and delete the other rows.
+    Returns the number of orders repointed.
+    """
+    keep_id, duplicate_ids = customer_ids[0], customer_ids[1:]
+    placeholders = ", ".join(["%s"] * len(duplicate_ids))
+
+    # Log the repointed orders so open admin grids pick up the change
+    cursor.execute(f"""
+        INSERT INTO change_log (table_name, row_id, order_id, op)
+        SELECT 'orders', order_id, order_id, 'update'
+        FROM orders WHERE customer_id IN ({placeholders})
+    """, duplicate_ids)
+    cursor.execute(f"""
+        UPDATE orders SET customer_id = %s
+        WHERE customer_id IN ({placeholders})
+    """, [keep_id] + duplicate_ids)
+    moved = cursor.rowcount
+
+    cursor.execute("""
+        UPDATE customers AS survivor
+        JOIN customers AS latest ON latest.customer_id = %s
+        SET survivor.customer_name = latest.customer_name,
+            survivor.customer_email = latest.customer_email,
+            survivor.customer_address = latest.customer_address
+        WHERE survivor.customer_id = %s
+    """, (duplicate_ids[-1], keep_id))
+    cursor.execute(f"DELETE FROM customers WHERE customer_id IN ({placeholders})",
+                   duplicate_ids)
+    cursor.executemany("""
+        INSERT INTO change_log (table_name, row_id, op)
+        VALUES ('customers', %s, 'delete')
+    """, [(customer_id,) for customer_id in duplicate_ids])
+    cursor.execute("""
+        UPDATE customers SET customer_phone_normalized = %s
+        WHERE customer_id = %s
+    """, (normalized, keep_id))
+    return moved
+
+
+def dedupe_customers(dry_run=False, batch_size=MERGE_BATCH_SIZE):
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Database connection failed!")
+        return None
+
+    try:
+        with db_cursor(conn) as cursor:
+            if not dry_run:
+                ensure_normalized_column(cursor)
+            groups = find_duplicate_groups(cursor)
+
+        duplicates = {phone: ids for phone, ids in groups.items() if len(ids) > 1}
+        extra_rows = sum(len(ids) - 1 for ids in duplicates.values())
+        print(f"🔍 {len(groups)} distinct phone numbers, "
+              f"{len(duplicates)} with duplicates ({extra_rows} extra customer rows)")
+        if dry_run:
+            return extra_rows
+
+        # Merge in batches, one transaction per batch
+        moved = 0
+        items = list(duplicates.items())
+        for start in range(0, len(items), batch_size):
+            try:
+                with db_cursor(conn) as cursor:
+                    for normalized, customer_ids in items[start:start + batch_size]:
+                        moved += merge_group(cursor, normalized, customer_ids)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        # Fill the normalized phone on customers that had no duplicates
+        with db_cursor(conn) as cursor:
+            singles = [(phone, ids[0]) for phone, ids in groups.items() if len(ids) == 1]
+            for start in range(0, len(singles), batch_size):
+                cursor.executemany("""
+                    UPDATE customers SET customer_phone_normalized = %s
+                    WHERE customer_id = %s
+                """, singles[start:start + batch_size])
+                conn.commit()
+            ensure_unique_index(cursor)
+
+        print(f"✅ Removed {extra_rows} duplicate customers, repointed {moved} orders")
+        return extra_rows
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Merge customers that share a phone number")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report duplicates without changing anything")
+    args = parser.parse_args()
+    dedupe_customers(dry_run=args.dry_run)
@@ -0,0 +1,168 @@
+"""
+Export orders, order items and payments placed in a date range to CSV or
+JSON Lines, one file per table. Rows are streamed from the server in
+chunks and written as they arrive, so memory use does not grow with the
+size of the tables.
+
+Run from the src directory:
+    python -m db.export_orders --out export/
+    python -m db.export_orders --out export/ --from 2024-01-01 --to 2024-12-31
+    python -m db.export_orders --out export/ --format jsonl --gzip
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_db_connection, db_cursor  # noqa: E402
+
+
+# Rows fetched from the server per round trip
+EXPORT_FETCH_SIZE = 5000
+
+# File name -> query; every query is filtered on o.order_date
+EXPORT_QUERIES = {
+    "orders": """
+        SELECT o.order_id, o.order_date, o.customer_id, c.customer_name,
+               c.customer_phone, c.customer_email, c.customer_address,
+               s.order_status_name, o.total_price, o.amount_paid_total, o.balance
+        FROM orders o
+        LEFT JOIN customers c ON c.customer_id = o.customer_id
+        LEFT JOIN order_statuses s ON s.order_status_id = o.order_status_id
+        {where}
+        ORDER BY o.order_id
+    """,
+    "order_items": """
+        SELECT oi.order_item_id, oi.order_id, sv.service_name, oi.quantity, oi.price
+        FROM order_items oi
+        JOIN orders o ON o.order_id = oi.order_id
+        LEFT JOIN services sv ON sv.service_id = oi.service_id
+        {where}
+        ORDER BY oi.order_id, oi.order_item_id
+    """,
+    "payments": """
+        SELECT p.payment_id, p.order_id, p.amount_paid, p.payment_date,
+               pm.payment_method_name, ps.payment_status_name
+        FROM payments p
+        JOIN orders o ON o.order_id = p.order_id
+        LEFT JOIN payment_methods pm ON pm.payment_method_id = p.payment_method_id
+        LEFT JOIN payment_statuses ps ON ps.payment_status_id = p.payment_status_id
+        {where}
+        ORDER BY p.order_id, p.payment_id
+    """,
+}
+
+
+def _date_filter(date_from, date_to):
+    """WHERE clause and params for an inclusive date range (either end optional)"""
+    conditions, params = [], []
+    if date_from:
+        conditions.append("o.order_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("o.order_date < %s")
+        params.append(date_to + timedelta(days=1))
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def _text(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (date, Decimal)):
+        return str(value)
+    return value
+
+
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path + ".gz", "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _stream_rows(cursor, sql, params, fetch_size):
+    cursor.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def export_table(conn, name, out_dir, fmt, where, params,
+                 compress=False, fetch_size=EXPORT_FETCH_SIZE):
+    """Write one table's rows to out_dir/<name>.<fmt>[.gz]; returns the row count"""
+    sql = EXPORT_QUERIES[name].format(where=where)
+    path = os.path.join(out_dir, f"{name}.{fmt}")
+    count = 0
+    # Unbuffered, so rows stay on the server until fetchmany() asks for them
+    with db_cursor(conn, dictionary=False, buffered=False) as cursor, \
+            _open_output(path, compress) as out:
+        columns = None
+        writer = None
+        for rows in _stream_rows(cursor, sql, params, fetch_size):
+            if columns is None:
+                columns = cursor.column_names
+                if fmt == "csv":
+                    writer = csv.writer(out)
+                    writer.writerow(columns)
+            if fmt == "csv":
+                writer.writerows([_text(v) for v in row] for row in rows)
+            else:
+                out.writelines(
+                    json.dumps(dict(zip(columns, map(_text, row))), ensure_ascii=False) + "\n"
+                    for row in rows)
+            count += len(rows)
+        if columns is None and fmt == "csv":
+            # Keep the header even when the range is empty
+            csv.writer(out).writerow(cursor.column_names)
+    return count
+
+
+def export_orders(out_dir, fmt="csv", date_from=None, date_to=None, compress=False,
+                  fetch_size=EXPORT_FETCH_SIZE):
+    """
+    Export every table in EXPORT_QUERIES for orders dated date_from..date_to.
+    Returns {name: rows written}, or None if the database is unreachable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Database connection failed!")
+        return None
+
+    os.makedirs(out_dir, exist_ok=True)
+    where, params = _date_filter(date_from, date_to)
+    counts = {}
+    try:
+        for name in EXPORT_QUERIES:
+            started = time.perf_counter()
+            counts[name] = export_table(conn, name, out_dir, fmt, where, params,
+                                        compress, fetch_size)
+            elapsed = time.perf_counter() - started
+            print(f"📤 {name}: {counts[name]} rows in {elapsed:.1f}s")
+        return counts
+    finally:
+        conn.close()
+
+
+def _parse_day(text):
+    return datetime.strptime(text, "%Y-%m-%d")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export orders, items and payments")
+    parser.add_argument("--out", required=True, help="directory for the exported files")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--from", dest="date_from", type=_parse_day,
+                        help="first order date to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=_parse_day,
+                        help="last order date to include (YYYY-MM-DD)")
+    parser.add_argument("--gzip", action="store_true", help="compress the files")
+    args = parser.parse_args()
+    export_orders(args.out, args.format, args.date_from, args.date_to, args.gzip)
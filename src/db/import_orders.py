@@ -0,0 +1,373 @@
+"""
+Bulk import of orders from a CSV file, e.g. a branch's paper records.
+
+One CSV row per order item. Consecutive rows with the same order_ref are
+one order; the order, customer and payment columns are read from the
+first row of each order. Columns:
+    order_ref, order_date, customer_name, customer_phone, customer_email,
+    customer_address, service_name, quantity, price, amount_paid,
+    payment_method, payment_status, order_status
+order_ref, order_date, email, address, price (defaults to the service's
+minimum price), payment_method, payment_status (derived from the amount)
+and order_status (Queueing when paid, else Pending Payment) may be blank.
+
+Orders are validated and written in chunks, one transaction per chunk.
+The last imported line is saved in the import_checkpoints table in the
+same transaction as the chunk, so an interrupted import continues where
+it stopped when run again and no chunk is written twice.
+
+Run from the src directory:
+    python -m db.import_orders orders.csv
+    python -m db.import_orders orders.csv --dry-run   # only validate
+    python -m db.import_orders orders.csv --restart   # ignore the checkpoint
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import groupby
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_db_connection, db_cursor  # noqa: E402
+from models import lookup_cache  # noqa: E402
+from models.change_log import record_changes, commit_changes  # noqa: E402
+from models.customer_class import normalize_phone  # noqa: E402
+from models.money import Money  # noqa: E402
+from models.payment import refresh_order_balances  # noqa: E402
+from models.status_history import record_status_changes  # noqa: E402
+from models.order_validator import (  # noqa: E402
+    BatchOrderValidator, PaymentProcessor, PaymentStatusValidator, ValidationIssue)
+
+
+# Orders validated and written per transaction
+IMPORT_CHUNK_SIZE = 500
+
+
+class Catalog:
+    """Services and status/method names resolved once per import (from lookup_cache)"""
+
+    def __init__(self):
+        def by_name(rows, name_column):
+            return {row[name_column].lower().strip(): row for row in rows}
+
+        self.services = by_name(lookup_cache.get_services(), "service_name")
+        self.payment_methods = by_name(lookup_cache.get_payment_methods(), "payment_method_name")
+        self.payment_statuses = by_name(lookup_cache.get_payment_statuses(), "payment_status_name")
+        self.order_statuses = by_name(lookup_cache.get_order_statuses(), "order_status_name")
+
+
+def ensure_checkpoint_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source varchar(255) NOT NULL,
+            last_line int(11) NOT NULL,
+            orders int(11) NOT NULL,
+            updated_at datetime NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+            PRIMARY KEY (source)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+
+
+def read_checkpoint(cursor, source):
+    """(last imported line, orders imported so far), (0, 0) when starting fresh"""
+    cursor.execute(
+        "SELECT last_line, orders FROM import_checkpoints WHERE source = %s", (source,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def write_checkpoint(cursor, source, line, orders):
+    """Save progress with the caller's cursor, inside the chunk's transaction"""
+    cursor.execute("""
+        INSERT INTO import_checkpoints (source, last_line, orders)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_line = VALUES(last_line), orders = VALUES(orders)
+    """, (source, line, orders))
+
+
+def clear_checkpoint(cursor, source):
+    cursor.execute("DELETE FROM import_checkpoints WHERE source = %s", (source,))
+
+
+def read_orders(csv_path, after_line=0):
+    """
+    Yield one order dict per order_ref group, streaming the file.
+    line is the CSV line of the order's first row.
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        numbered = ((reader.line_num, row) for row in reader)
+        # Rows without an order_ref are orders of their own
+        for _, group in groupby(numbered,
+                                key=lambda lr: (lr[1].get("order_ref") or "").strip() or lr[0]):
+            group = list(group)
+            line, first = group[0]
+            if line <= after_line:
+                continue
+            yield {
+                "line": line,
+                "last_line": group[-1][0],
+                "order_date": (first.get("order_date") or "").strip(),
+                "name": (first.get("customer_name") or "").strip(),
+                "phone": (first.get("customer_phone") or "").strip(),
+                "email": (first.get("customer_email") or "").strip() or None,
+                "address": (first.get("customer_address") or "").strip() or None,
+                "items": [{"service_name": (row.get("service_name") or "").strip(),
+                           "qty": _int_or_text(row.get("quantity")),
+                           "price": (row.get("price") or "").strip()}
+                          for _, row in group],
+                "amount_paid": (first.get("amount_paid") or "").strip(),
+                "payment_method": (first.get("payment_method") or "").strip(),
+                "payment_status": (first.get("payment_status") or "").strip(),
+                "order_status": (first.get("order_status") or "").strip(),
+            }
+
+
+def _int_or_text(value):
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else value
+
+
+def resolve(order, catalog):
+    """
+    Fill in ids, defaults and the total from the catalog.
+    Returns ValidationIssues for names that do not resolve.
+    """
+    row = order["line"]
+    issues = []
+    for item in order["items"]:
+        service = catalog.services.get(item["service_name"].lower())
+        if service is None:
+            issues.append(ValidationIssue(row, "items", f"Unknown service '{item['service_name']}'"))
+            continue
+        item["service_id"] = service["service_id"]
+        if not item["price"]:
+            item["price"] = Money.of(service["min_price"])
+
+    if not normalize_phone(order["phone"]) and order["phone"]:
+        issues.append(ValidationIssue(row, "customer", "Invalid contact number"))
+
+    try:
+        order["order_date"] = (datetime.fromisoformat(order["order_date"])
+                               if order["order_date"] else datetime.now())
+    except ValueError:
+        issues.append(ValidationIssue(row, "order", f"Invalid order date '{order['order_date']}'"))
+
+    try:
+        order["total_price"] = PaymentProcessor.calculate_total(order["items"])
+        amount_paid = Money.of(order["amount_paid"])
+    except (TypeError, ValueError):
+        # The validator reports the bad price or amount
+        return issues
+    if not order["payment_status"]:
+        order["payment_status"] = PaymentStatusValidator.auto_determine_payment_status(
+            amount_paid, order["total_price"])
+
+    for key, names in (("payment_status", catalog.payment_statuses),
+                       ("payment_method", catalog.payment_methods),
+                       ("order_status", catalog.order_statuses)):
+        if order[key] and order[key].lower() not in names:
+            issues.append(ValidationIssue(row, "payment" if key.startswith("payment") else "order",
+                                          f"Unknown {key.replace('_', ' ')} '{order[key]}'"))
+    return issues
+
+
+def upsert_customers(cursor, orders):
+    """
+    Insert or refresh the customers of a chunk with one multi-row upsert.
+    Returns {normalized phone: customer_id}.
+    """
+    latest = {}
+    for order in orders:
+        latest[normalize_phone(order["phone"])] = order
+    phones = list(latest)
+    placeholders = ", ".join(["%s"] * len(phones))
+    cursor.execute(f"""
+        SELECT customer_phone_normalized FROM customers
+        WHERE customer_phone_normalized IN ({placeholders})
+    """, phones)
+    existing = {phone for (phone,) in cursor.fetchall()}
+
+    cursor.executemany("""
+        INSERT INTO customers
+        (customer_name, customer_phone, customer_phone_normalized,
+         customer_email, customer_address)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            customer_name = VALUES(customer_name),
+            customer_phone = VALUES(customer_phone),
+            customer_email = VALUES(customer_email),
+            customer_address = VALUES(customer_address)
+    """, [(o["name"], o["phone"], phone, o["email"], o["address"])
+          for phone, o in latest.items()])
+
+    cursor.execute(f"""
+        SELECT customer_phone_normalized, customer_id FROM customers
+        WHERE customer_phone_normalized IN ({placeholders})
+    """, phones)
+    customer_ids = dict(cursor.fetchall())
+    for op, ids in (("insert", [customer_ids[p] for p in phones if p not in existing]),
+                    ("update", [customer_ids[p] for p in phones if p in existing])):
+        record_changes(cursor, "customers", ids, op, order_ids=[None] * len(ids))
+    return customer_ids
+
+
+def insert_orders(cursor, rows, consecutive_ids):
+    """
+    INSERT the order rows and return their order_ids in the same order.
+    A multi-row INSERT gets consecutive AUTO_INCREMENT ids unless InnoDB
+    runs in interleaved lock mode, in which case rows go one at a time.
+    """
+    sql = """
+        INSERT INTO orders (customer_id, order_status_id, order_date, total_price)
+        VALUES (%s, %s, %s, %s)
+    """
+    if consecutive_ids:
+        cursor.executemany(sql, rows)
+        first_id = cursor.lastrowid
+        return list(range(first_id, first_id + len(rows)))
+    order_ids = []
+    for row in rows:
+        cursor.execute(sql, row)
+        order_ids.append(cursor.lastrowid)
+    return order_ids
+
+
+def write_chunk(cursor, orders, catalog, consecutive_ids):
+    customer_ids = upsert_customers(cursor, orders)
+
+    order_rows = []
+    for order in orders:
+        paid = order["payment_status"].lower() == "paid"
+        status_name = order["order_status"].lower() or ("queueing" if paid else "pending payment")
+        status = catalog.order_statuses.get(status_name)
+        order_rows.append((customer_ids[normalize_phone(order["phone"])],
+                           status["order_status_id"] if status else 1,
+                           order["order_date"], order["total_price"].to_decimal()))
+    order_ids = insert_orders(cursor, order_rows, consecutive_ids)
+    record_changes(cursor, "orders", order_ids, "insert")
+    record_status_changes(cursor, [(order_id, None, row[1])
+                                   for order_id, row in zip(order_ids, order_rows)])
+
+    item_rows, payment_rows = [], []
+    for order_id, order in zip(order_ids, orders):
+        item_rows.extend((order_id, item["service_id"], item["qty"],
+                          Money.of(item["price"]).to_decimal())
+                         for item in order["items"])
+        status_name = order["payment_status"].lower()
+        method = catalog.payment_methods.get(order["payment_method"].lower())
+        status = catalog.payment_statuses.get(status_name)
+        payment_rows.append((order_id, Money.of(order["amount_paid"]).to_decimal(),
+                             order["order_date"] if status_name == "paid" else None,
+                             method["payment_method_id"] if method else 1,
+                             status["payment_status_id"] if status else 1))
+    cursor.executemany("""
+        INSERT INTO order_items (order_id, service_id, quantity, price)
+        VALUES (%s, %s, %s, %s)
+    """, item_rows)
+    cursor.executemany("""
+        INSERT INTO payments (order_id, amount_paid, payment_date, payment_method_id, payment_status_id)
+        VALUES (%s, %s, %s, %s, %s)
+    """, payment_rows)
+    refresh_order_balances(cursor, order_ids)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_orders(csv_path, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False, restart=False):
+    """
+    Import the CSV; returns (orders imported, orders rejected), or None if
+    the database is unreachable.
+    """
+    csv_path = os.path.abspath(csv_path)
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Database connection failed!")
+        return None
+
+    catalog = Catalog()
+    validator = BatchOrderValidator()
+    rejected = 0
+    started = time.perf_counter()
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            cursor.execute("SELECT @@innodb_autoinc_lock_mode")
+            consecutive_ids = cursor.fetchone()[0] != 2
+            after_line, imported = 0, 0
+            if not dry_run:
+                ensure_checkpoint_table(cursor)
+                if restart:
+                    clear_checkpoint(cursor, csv_path)
+                else:
+                    after_line, imported = read_checkpoint(cursor, csv_path)
+                conn.commit()
+        if after_line:
+            print(f"↩️ Resuming after line {after_line} ({imported} orders already imported)")
+
+        for chunk in _chunks(read_orders(csv_path, after_line), chunk_size):
+            valid = []
+            for order in chunk:
+                issues = resolve(order, catalog)
+                issues.extend(validator.check(order, order["line"]))
+                if issues:
+                    rejected += 1
+                    for issue in issues:
+                        print(f"⚠️ line {issue.row}: [{issue.section}] {issue.message}")
+                else:
+                    valid.append(order)
+
+            if not dry_run:
+                try:
+                    with db_cursor(conn, dictionary=False) as cursor:
+                        if valid:
+                            write_chunk(cursor, valid, catalog, consecutive_ids)
+                        write_checkpoint(cursor, csv_path, chunk[-1]["last_line"],
+                                         imported + len(valid))
+                    commit_changes(conn)
+                except Exception:
+                    conn.rollback()
+                    print(f"❌ Import stopped in the chunk starting at line {chunk[0]['line']}; "
+                          f"run again to resume")
+                    raise
+            imported += len(valid)
+
+            elapsed = time.perf_counter() - started
+            rows = chunk[-1]["last_line"] - after_line
+            print(f"📦 up to line {chunk[-1]['last_line']}: {imported} orders, "
+                  f"{rejected} rejected, {rows / elapsed if elapsed else 0:,.0f} rows/sec")
+
+        if not dry_run:
+            with db_cursor(conn, dictionary=False) as cursor:
+                clear_checkpoint(cursor, csv_path)
+            conn.commit()
+        verb = "Validated" if dry_run else "Imported"
+        print(f"✅ {verb} {imported} orders, rejected {rejected} "
+              f"in {time.perf_counter() - started:.1f}s")
+        return imported, rejected
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import orders from a CSV file")
+    parser.add_argument("csv_path", help="CSV file with one row per order item")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                        help="orders written per transaction")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="validate the file without writing anything")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore a saved checkpoint and start from the top")
+    args = parser.parse_args()
+    import_orders(args.csv_path, args.chunk_size, args.dry_run, args.restart)
@@ -0,0 +1,429 @@
+import json
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+from mysql.connector import Error
+
+from db.connection import get_db_connection, db_cursor
+from models.change_log import record_change, commit_changes
+from models.customer_class import upsert_customer
+from models.order_edits import OrderChangeSet, apply_order_changes
+from models.payment import refresh_order_balances
+from models.status_history import record_status_changes
+
+
+# Local journal that keeps the counter taking orders while MySQL is down.
+JOURNAL_PATH = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "offline_journal.sqlite3")
+REPLAY_BATCH_SIZE = 50
+
+
+@contextmanager
+def open_journal(path=None):
+    journal = sqlite3.connect(path or JOURNAL_PATH)
+    try:
+        journal.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                replayed_at TEXT,
+                failed_at TEXT,
+                error TEXT
+            )
+        """)
+        columns = {row[1] for row in journal.execute("PRAGMA table_info(journal)")}
+        for column in ("failed_at", "error"):
+            if column not in columns:
+                journal.execute(f"ALTER TABLE journal ADD COLUMN {column} TEXT")
+        journal.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        journal.execute("""
+            CREATE TABLE IF NOT EXISTS id_map (
+                local_order_id INTEGER PRIMARY KEY,
+                order_id INTEGER NOT NULL,
+                payment_id INTEGER
+            )
+        """)
+        yield journal
+        journal.commit()
+    finally:
+        journal.close()
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot journal value of type {type(value).__name__}")
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _append(kind, payload):
+    with open_journal() as journal:
+        cursor = journal.execute(
+            "INSERT INTO journal (kind, payload, created_at) VALUES (?, ?, ?)",
+            (kind, json.dumps(payload, default=_encode),
+             datetime.now().isoformat())
+        )
+        return cursor.lastrowid
+
+
+def server_available():
+    """Check whether MySQL accepts connections right now."""
+    conn = get_db_connection()
+    if not conn:
+        return False
+    conn.close()
+    return True
+
+
+def journal_order(customer, order_status_name, order_date, total_price, items, payment):
+    """
+    Journal a complete new order (customer, order, items and payment).
+    Returns the local order id, a negative number that is remapped to the
+    real order_id when the entry is replayed.
+    """
+    entry_id = _append("order", {
+        "customer": customer,
+        "order_status_name": order_status_name,
+        "order_date": order_date,
+        "total_price": total_price,
+        "items": items,
+        "payment": payment,
+    })
+    return -entry_id
+
+
+def journal_payment_update(payment_id, order_id, amount_paid, payment_date, payment_method_id, payment_status_id):
+    """
+    Journal an update_payment call. order_id may be a local (negative) id
+    handed out by journal_order.
+    """
+    return _append("payment_update", {
+        "payment_id": payment_id,
+        "order_id": order_id,
+        "amount_paid": amount_paid,
+        "payment_date": payment_date,
+        "payment_method_id": payment_method_id,
+        "payment_status_id": payment_status_id,
+    })
+
+
+def journal_order_changes(changes, admin_id=None):
+    """
+    Journal an OrderChangeSet as one entry, so its order and payment
+    edits are replayed together (by save_order_changes' rules, versions
+    included) or not at all.
+    """
+    payment = changes.payment or {}
+    return _append("order_changes", {
+        "order_id": changes.order_id,
+        "order_version": changes.order_version,
+        "order_fields": changes.order_fields,
+        "payment_id": payment.get("payment_id"),
+        "payment_version": payment.get("version"),
+        "payment_fields": changes.payment_fields,
+        "refunds": [[payment_id, version, payment_status_id] for payment_id,
+                    (version, payment_status_id) in changes.refunds.items()],
+        "admin_id": admin_id,
+    })
+
+
+def journal_id(journal):
+    """
+    Random id of this terminal's journal. Entry ids are only unique within
+    one journal, so MySQL records replayed entries under (journal_id, entry_id).
+    """
+    row = journal.execute("SELECT value FROM meta WHERE key = 'journal_id'").fetchone()
+    if row:
+        return row[0]
+    value = uuid.uuid4().hex
+    journal.execute("INSERT INTO meta (key, value) VALUES ('journal_id', ?)", (value,))
+    return value
+
+
+def journal_exists():
+    """Whether anything was ever journaled on this terminal"""
+    return os.path.exists(JOURNAL_PATH)
+
+
+def pending_count():
+    # Don't create the journal just to find it empty
+    if not journal_exists():
+        return 0
+    with open_journal() as journal:
+        row = journal.execute(
+            "SELECT COUNT(*) FROM journal WHERE replayed_at IS NULL AND failed_at IS NULL"
+        ).fetchone()
+        return row[0]
+
+
+def get_failed_entries():
+    """Entries MySQL rejected, as (entry_id, kind, payload, failed_at, error)"""
+    with open_journal() as journal:
+        return journal.execute("""
+            SELECT entry_id, kind, payload, failed_at, error FROM journal
+            WHERE failed_at IS NOT NULL AND replayed_at IS NULL
+            ORDER BY entry_id
+        """).fetchall()
+
+
+def retry_failed_entries():
+    """Put failed entries back in line for the next replay"""
+    with open_journal() as journal:
+        return journal.execute(
+            "UPDATE journal SET failed_at = NULL, error = NULL "
+            "WHERE failed_at IS NOT NULL AND replayed_at IS NULL").rowcount
+
+
+def get_mapped_order_id(local_order_id):
+    """Real order_id for a replayed local order id, or None if still pending."""
+    with open_journal() as journal:
+        row = journal.execute(
+            "SELECT order_id FROM id_map WHERE local_order_id = ?",
+            (local_order_id,)).fetchone()
+        return row[0] if row else None
+
+
+def _lookup_id(cursor, cache, table, id_column, name_column, name):
+    """
+    Id of a lookup row by name. Raises ValueError if there is none, so the
+    entry is set aside instead of being written with a guessed id.
+    """
+    key = (table, name.lower().strip())
+    if key not in cache:
+        cursor.execute(
+            f"SELECT {id_column} AS id FROM {table} WHERE LOWER(TRIM({name_column})) = %s",
+            (key[1],))
+        row = cursor.fetchone()
+        cache[key] = row["id"] if row else None
+    if cache[key] is None:
+        raise ValueError(f"No {table} row named '{name}'")
+    return cache[key]
+
+
+def _replay_order(cursor, data, lookups):
+    customer = data["customer"]
+    customer_id = upsert_customer(cursor, customer["name"], customer["phone"],
+                                  customer["email"], customer["address"])
+
+    order_status_id = _lookup_id(cursor, lookups, "order_statuses", "order_status_id",
+                                 "order_status_name", data["order_status_name"])
+    cursor.execute("""
+        INSERT INTO orders (customer_id, order_status_id, order_date, total_price)
+        VALUES (%s, %s, %s, %s)
+    """, (customer_id, order_status_id, _parse_date(data["order_date"]),
+          Decimal(str(data["total_price"]))))
+    order_id = cursor.lastrowid
+    record_change(cursor, "orders", order_id, "insert", order_id)
+    record_status_changes(cursor, [(order_id, None, order_status_id)])
+
+    if data["items"]:
+        cursor.executemany("""
+            INSERT INTO order_items (order_id, service_id, quantity, price)
+            VALUES (%s, %s, %s, %s)
+        """, [(order_id, item["service_id"], item["quantity"], Decimal(str(item["price"])))
+              for item in data["items"]])
+
+    payment = data["payment"]
+    payment_status_id = payment["payment_status_id"]
+    if payment_status_id is None:
+        from models.order_validator import PaymentStatusValidator
+        status_name = PaymentStatusValidator.auto_determine_payment_status(
+            payment["amount_paid"], data["total_price"])
+        payment_status_id = _lookup_id(cursor, lookups, "payment_statuses", "payment_status_id",
+                                       "payment_status_name", status_name)
+    if payment["payment_method_id"] is None:
+        raise ValueError("The order was journaled without a payment method")
+    cursor.execute("""
+        INSERT INTO payments (order_id, amount_paid, payment_date, payment_method_id, payment_status_id)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (order_id, Decimal(str(payment["amount_paid"])), _parse_date(payment["payment_date"]),
+          payment["payment_method_id"], payment_status_id))
+    payment_id = cursor.lastrowid
+    record_change(cursor, "payments", payment_id, "insert", order_id)
+    refresh_order_balances(cursor, [order_id])
+    return order_id, payment_id
+
+
+def _replay_payment_update(cursor, data, id_map):
+    order_id, payment_id = data["order_id"], data["payment_id"]
+    if order_id is not None and order_id < 0:
+        order_id, payment_id = id_map[order_id]
+    cursor.execute("""
+        UPDATE payments
+        SET order_id = %s, amount_paid = %s, payment_date = %s,
+            payment_method_id = %s, payment_status_id = %s,
+            version = version + 1
+        WHERE payment_id = %s
+    """, (order_id, Decimal(str(data["amount_paid"])), _parse_date(data["payment_date"]),
+          data["payment_method_id"], data["payment_status_id"], payment_id))
+    record_change(cursor, "payments", payment_id, "update", order_id)
+    refresh_order_balances(cursor, [order_id])
+
+
+def _replay_order_changes(cursor, data, id_map):
+    order_id, payment_id = data["order_id"], data["payment_id"]
+    if order_id is not None and order_id < 0:
+        order_id, payment_id = id_map[order_id]
+    payment = None
+    if payment_id is not None:
+        payment = {"payment_id": payment_id, "version": data["payment_version"]}
+    changes = OrderChangeSet(order_id, data["order_version"], payment)
+    changes.set_order(**data["order_fields"])
+    if data["payment_fields"]:
+        fields = dict(data["payment_fields"])
+        if fields.get("amount_paid") is not None:
+            fields["amount_paid"] = Decimal(str(fields["amount_paid"]))
+        if "payment_date" in fields:
+            fields["payment_date"] = _parse_date(fields["payment_date"])
+        changes.set_payment(**fields)
+    for payment_id, version, payment_status_id in data.get("refunds", ()):
+        changes.refunds[payment_id] = (version, payment_status_id)
+    apply_order_changes(cursor, changes, data["admin_id"])
+
+
+def _ensure_replay_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS offline_replays (
+            journal_id char(32) NOT NULL,
+            entry_id int(11) NOT NULL,
+            order_id int(11) DEFAULT NULL,
+            payment_id int(11) DEFAULT NULL,
+            replayed_at datetime NOT NULL DEFAULT current_timestamp(),
+            PRIMARY KEY (journal_id, entry_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+
+
+def _already_replayed(cursor, source, entry_ids):
+    """entry_id -> (order_id, payment_id) for entries MySQL has already committed"""
+    placeholders = ", ".join(["%s"] * len(entry_ids))
+    cursor.execute(f"""
+        SELECT entry_id, order_id, payment_id FROM offline_replays
+        WHERE journal_id = %s AND entry_id IN ({placeholders})
+    """, [source] + list(entry_ids))
+    return {row["entry_id"]: (row["order_id"], row["payment_id"]) for row in cursor.fetchall()}
+
+
+def _replay_entry(cursor, kind, data, id_map, lookups):
+    if kind == "order":
+        return _replay_order(cursor, data, lookups)
+    if kind == "payment_update":
+        _replay_payment_update(cursor, data, id_map)
+        return None
+    if kind == "order_changes":
+        _replay_order_changes(cursor, data, id_map)
+        return None
+    raise ValueError(f"Unknown journal entry kind '{kind}'")
+
+
+def replay_journal(batch_size=REPLAY_BATCH_SIZE):
+    """
+    Replay pending journal entries into MySQL in batches, one transaction
+    per batch, remapping local order ids to the ids MySQL assigns.
+    Each replayed entry is recorded in offline_replays in the same
+    transaction, so a batch that was committed but not yet retired from
+    the journal (e.g. after a crash) is recognised and not applied twice.
+    An entry MySQL rejects is rolled back on its own, marked failed with
+    the error and skipped; the rest of the batch goes through.
+    Returns the number of entries replayed; stops quietly if the server
+    is still unreachable.
+    """
+    if not pending_count():
+        return 0
+    with open_journal() as journal:
+        source = journal_id(journal)
+        id_map = {local_id: (order_id, payment_id) for local_id, order_id, payment_id
+                  in journal.execute("SELECT local_order_id, order_id, payment_id FROM id_map")}
+
+    conn = get_db_connection()
+    if not conn:
+        return 0
+
+    replayed = 0
+    lookups = {}
+    try:
+        with db_cursor(conn) as cursor:
+            _ensure_replay_table(cursor)
+        while True:
+            with open_journal() as journal:
+                batch = journal.execute("""
+                    SELECT entry_id, kind, payload FROM journal
+                    WHERE replayed_at IS NULL AND failed_at IS NULL
+                    ORDER BY entry_id LIMIT ?
+                """, (batch_size,)).fetchall()
+            if not batch:
+                break
+
+            new_ids, done, failed = {}, [], []
+            try:
+                with db_cursor(conn) as cursor:
+                    committed = _already_replayed(
+                        cursor, source, [entry_id for entry_id, _, _ in batch])
+                    for entry_id, kind, payload in batch:
+                        if entry_id in committed:
+                            if kind == "order":
+                                new_ids[-entry_id] = id_map[-entry_id] = committed[entry_id]
+                            done.append(entry_id)
+                            continue
+                        cursor.execute("SAVEPOINT journal_entry")
+                        try:
+                            ids = _replay_entry(cursor, kind, json.loads(payload),
+                                                id_map, lookups)
+                            order_id, payment_id = ids or (None, None)
+                            cursor.execute("""
+                                INSERT INTO offline_replays (journal_id, entry_id, order_id, payment_id)
+                                VALUES (%s, %s, %s, %s)
+                            """, (source, entry_id, order_id, payment_id))
+                        except Exception as e:
+                            if not conn.is_connected():
+                                raise
+                            cursor.execute("ROLLBACK TO SAVEPOINT journal_entry")
+                            failed.append((entry_id, f"{type(e).__name__}: {e}"))
+                            continue
+                        if ids:
+                            new_ids[-entry_id] = id_map[-entry_id] = ids
+                        done.append(entry_id)
+                commit_changes(conn)
+            except Exception:
+                conn.rollback()
+                raise
+
+            # MySQL has committed the batch (and knows it did); retire it here.
+            now = datetime.now().isoformat()
+            with open_journal() as journal:
+                journal.executemany(
+                    "INSERT OR REPLACE INTO id_map (local_order_id, order_id, payment_id) VALUES (?, ?, ?)",
+                    [(local_id, order_id, payment_id)
+                     for local_id, (order_id, payment_id) in new_ids.items()])
+                journal.executemany(
+                    "UPDATE journal SET replayed_at = ? WHERE entry_id = ?",
+                    [(now, entry_id) for entry_id in done])
+                journal.executemany(
+                    "UPDATE journal SET failed_at = ?, error = ? WHERE entry_id = ?",
+                    [(now, error, entry_id) for entry_id, error in failed])
+            replayed += len(done)
+            print(f"🔁 Replayed {len(done)} offline journal entries")
+            for entry_id, error in failed:
+                print(f"❌ Offline journal entry {entry_id} failed and was set aside: {error}")
+    except Error as e:
+        # Lost the server part way; the rest is retried on the next run
+        print(f"⚠️ Offline journal replay stopped: {e}")
+    finally:
+        conn.close()
+    return replayed
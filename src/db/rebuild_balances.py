@@ -0,0 +1,62 @@
+"""
+Adds orders.amount_paid_total and orders.balance to databases created
+before orders could have several payments, and fills them from the
+payments table. Also safe to re-run to repair balances.
+
+Run from the src directory:
+    python -m db.rebuild_balances
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_db_connection, db_cursor  # noqa: E402
+from models.payment import refresh_order_balances  # noqa: E402
+
+
+# Orders refreshed per transaction
+REBUILD_BATCH_SIZE = 1000
+
+
+def ensure_balance_columns(cursor):
+    cursor.execute("SHOW COLUMNS FROM orders LIKE 'balance'")
+    if cursor.fetchall():
+        return
+    print("➕ Adding orders.amount_paid_total and orders.balance")
+    cursor.execute("""
+        ALTER TABLE orders
+        ADD COLUMN amount_paid_total decimal(10,2) NOT NULL DEFAULT 0.00 AFTER total_price,
+        ADD COLUMN balance decimal(10,2) NOT NULL DEFAULT 0.00 AFTER amount_paid_total,
+        ADD KEY balance (balance)
+    """)
+
+
+def rebuild_balances(batch_size=REBUILD_BATCH_SIZE):
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Database connection failed!")
+        return None
+
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            ensure_balance_columns(cursor)
+            cursor.execute("SELECT order_id FROM orders ORDER BY order_id")
+            order_ids = [order_id for (order_id,) in cursor.fetchall()]
+
+        for start in range(0, len(order_ids), batch_size):
+            try:
+                with db_cursor(conn, dictionary=False) as cursor:
+                    refresh_order_balances(cursor, order_ids[start:start + batch_size])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        print(f"✅ Rebuilt balances of {len(order_ids)} orders")
+        return len(order_ids)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    rebuild_balances()
@@ -0,0 +1,339 @@
+"""
+Snapshot and restore of the laundry database, for nightly backups and for
+setting up a local copy to reproduce a problem.
+
+A snapshot is a directory with one subdirectory per table. Each table is
+stored as chunks of columns (one tuple per column), pickled and
+gzip-compressed, plus a manifest.json written last. Tables are dumped in
+parallel, each connection reading from the same consistent point in time.
+Restoring replaces the contents of the tables (the schema must already
+exist, e.g. from db_laundry.sql) with key checks off and multi-row inserts.
+The manifest and every chunk are checked before any table is emptied.
+Chunks are pickles, so only restore snapshots you made yourself.
+
+Run from the src directory:
+    python -m db.snapshot create backups/2024-06-01
+    python -m db.snapshot restore backups/2024-06-01 --yes
+"""
+import argparse
+import gzip
+import json
+import os
+import pickle
+import queue
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mysql.connector import Error
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_db_connection, db_cursor  # noqa: E402
+
+
+# Parents before children, so a restore with key checks on would also work
+SNAPSHOT_TABLES = (
+    "admin", "categories", "services", "order_statuses", "payment_methods",
+    "payment_statuses", "customers", "orders", "order_items", "payments",
+    "change_log", "order_status_history", "order_status_durations",
+    "service_status_durations",
+)
+SNAPSHOT_CHUNK_ROWS = 50000
+# One multi-row INSERT per batch on restore: at most this many rows, and
+# roughly this many bytes of values (XAMPP's max_allowed_packet is 1M)
+RESTORE_BATCH_ROWS = 1000
+RESTORE_BATCH_BYTES = 512 * 1024
+SNAPSHOT_JOBS = 4
+# gzip level: 1 is several times faster than the default and still small
+SNAPSHOT_COMPRESS_LEVEL = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def _chunk_name(index):
+    return f"chunk-{index:05d}.pkl.gz"
+
+
+def _write_chunk(path, columns):
+    data = pickle.dumps(columns, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data, SNAPSHOT_COMPRESS_LEVEL))
+
+
+def _read_chunk(path):
+    with open(path, "rb") as f:
+        return pickle.loads(gzip.decompress(f.read()))
+
+
+def dump_table(conn, table_name, out_dir, chunk_rows=SNAPSHOT_CHUNK_ROWS):
+    """Stream one table into column chunks; returns its manifest entry"""
+    table_dir = os.path.join(out_dir, table_name)
+    os.makedirs(table_dir, exist_ok=True)
+    chunks, rows_total = [], 0
+    with db_cursor(conn, dictionary=False, buffered=False) as cursor:
+        cursor.execute(f"SELECT * FROM `{table_name}`")
+        columns = list(cursor.column_names)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            name = _chunk_name(len(chunks))
+            _write_chunk(os.path.join(table_dir, name), tuple(zip(*rows)))
+            chunks.append(name)
+            rows_total += len(rows)
+    return {"columns": columns, "rows": rows_total, "chunks": chunks}
+
+
+def _open_consistent_connections(count):
+    """
+    Open count connections whose transactions all see the same data.
+    FLUSH TABLES WITH READ LOCK holds writers off while the snapshots
+    start; without the RELOAD privilege each table is only consistent
+    on its own.
+    """
+    coordinator = get_db_connection()
+    if not coordinator:
+        return None
+    conns = []
+    try:
+        locked = True
+        with db_cursor(coordinator, dictionary=False) as cursor:
+            try:
+                cursor.execute("FLUSH TABLES WITH READ LOCK")
+            except Error as e:
+                print(f"⚠️ Could not lock tables ({e}); tables are snapshotted one by one")
+                locked = False
+        for _ in range(count):
+            conn = get_db_connection()
+            if not conn:
+                break
+            with db_cursor(conn, dictionary=False) as cursor:
+                cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            conns.append(conn)
+        if locked:
+            with db_cursor(coordinator, dictionary=False) as cursor:
+                cursor.execute("UNLOCK TABLES")
+    finally:
+        coordinator.close()
+    if len(conns) < count:
+        for conn in conns:
+            conn.close()
+        return None
+    return conns
+
+
+def create_snapshot(out_dir, jobs=SNAPSHOT_JOBS, tables=SNAPSHOT_TABLES):
+    """Dump the tables into out_dir; returns the manifest, or None if MySQL is unreachable"""
+    conns = _open_consistent_connections(min(jobs, len(tables)))
+    if not conns:
+        print("❌ Database connection failed!")
+        return None
+
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    free = queue.Queue()
+    for conn in conns:
+        free.put(conn)
+
+    def dump(table_name):
+        conn = free.get()
+        try:
+            return table_name, dump_table(conn, table_name, out_dir)
+        finally:
+            free.put(conn)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(conns)) as executor:
+            entries = dict(executor.map(dump, tables))
+    finally:
+        for conn in conns:
+            conn.rollback()
+            conn.close()
+
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "tables": {name: entries[name] for name in tables},
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    rows = sum(entry["rows"] for entry in entries.values())
+    print(f"✅ Snapshot of {len(tables)} tables ({rows} rows) written to {out_dir} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return manifest
+
+
+def _insert_batches(rows):
+    """Split rows into lists small enough for one INSERT statement each"""
+    batch, size = [], 0
+    for row in rows:
+        batch.append(row)
+        size += sum(len(value) if isinstance(value, (str, bytes)) else 16
+                    for value in row)
+        if len(batch) >= RESTORE_BATCH_ROWS or size >= RESTORE_BATCH_BYTES:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def restore_table(conn, table_name, in_dir, entry):
+    """Replace a table's rows with the snapshot's; returns the rows loaded"""
+    columns = ", ".join(f"`{name}`" for name in entry["columns"])
+    placeholders = ", ".join(["%s"] * len(entry["columns"]))
+    sql = f"INSERT INTO `{table_name}` ({columns}) VALUES ({placeholders})"
+    with db_cursor(conn, dictionary=False) as cursor:
+        # Per-session settings: skip FK/unique checks while bulk loading
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+        cursor.execute(f"TRUNCATE TABLE `{table_name}`")
+        try:
+            for name in entry["chunks"]:
+                column_values = _read_chunk(os.path.join(in_dir, table_name, name))
+                for batch in _insert_batches(zip(*column_values)):
+                    cursor.executemany(sql, batch)
+                conn.commit()
+        finally:
+            cursor.execute("SET UNIQUE_CHECKS = 1")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    return entry["rows"]
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot directory is incomplete or does not fit the database."""
+
+
+def _check_table(in_dir, table_name, entry):
+    """Read every chunk of one table and check it against its manifest entry"""
+    try:
+        width, chunks, expected = len(entry["columns"]), entry["chunks"], entry["rows"]
+    except (KeyError, TypeError):
+        raise SnapshotError(f"{table_name}: manifest entry is malformed")
+    rows = 0
+    for name in chunks:
+        try:
+            column_values = _read_chunk(os.path.join(in_dir, table_name, name))
+        except Exception as e:
+            raise SnapshotError(f"{table_name}/{name}: unreadable ({e})")
+        lengths = {len(values) for values in column_values}
+        if len(column_values) != width or len(lengths) != 1:
+            raise SnapshotError(f"{table_name}/{name}: does not match the manifest's columns")
+        rows += lengths.pop()
+    if rows != expected:
+        raise SnapshotError(f"{table_name}: {rows} rows in the chunks, manifest says {expected}")
+
+
+def validate_snapshot(in_dir, jobs=SNAPSHOT_JOBS):
+    """
+    Load the manifest and check that every chunk it lists is readable and
+    complete. Returns the manifest; raises SnapshotError.
+    """
+    try:
+        with open(os.path.join(in_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+        tables = manifest["tables"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise SnapshotError(f"{MANIFEST_NAME} is missing or malformed ({e})")
+    if not isinstance(tables, dict) or not tables:
+        raise SnapshotError(f"{MANIFEST_NAME} lists no tables")
+
+    def check(table_name):
+        _check_table(in_dir, table_name, tables[table_name])
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(check, tables))
+    return manifest
+
+
+def _check_schema(conn, tables):
+    """Every snapshot table and column must exist in the target database"""
+    with db_cursor(conn, dictionary=False) as cursor:
+        cursor.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        existing = {}
+        for table_name, column in cursor.fetchall():
+            existing.setdefault(table_name, set()).add(column)
+    for table_name, entry in tables.items():
+        if table_name not in existing:
+            raise SnapshotError(f"table {table_name} does not exist in the database")
+        missing = set(entry["columns"]) - existing[table_name]
+        if missing:
+            raise SnapshotError(f"{table_name} has no column(s) {', '.join(sorted(missing))}")
+
+
+def restore_snapshot(in_dir, jobs=SNAPSHOT_JOBS):
+    """
+    Load a snapshot written by create_snapshot(), replacing the current
+    rows of its tables. Nothing is changed unless the whole snapshot
+    checks out. Returns the number of rows loaded, or None.
+    """
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Database connection failed!")
+        return None
+    try:
+        manifest = validate_snapshot(in_dir, jobs)
+        tables = manifest["tables"]
+        _check_schema(conn, tables)
+    except (SnapshotError, Error) as e:
+        print(f"❌ Snapshot not restored, nothing was changed: {e}")
+        return None
+    finally:
+        conn.close()
+    started = time.perf_counter()
+    emptied, loaded = set(), set()
+
+    def restore(table_name):
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("Database connection failed")
+        try:
+            emptied.add(table_name)
+            rows = restore_table(conn, table_name, in_dir, tables[table_name])
+            loaded.add(table_name)
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        rows = sum(executor.map(restore, tables))
+    except (ConnectionError, Error, OSError) as e:
+        # Stop tables not started yet; the ones running finish first
+        executor.shutdown(cancel_futures=True)
+        print(f"❌ Restore failed: {e}")
+        incomplete = [name for name in tables if name in emptied and name not in loaded]
+        untouched = [name for name in tables if name not in emptied]
+        if incomplete:
+            print(f"⚠️ Emptied but not fully loaded: {', '.join(incomplete)}")
+        if untouched:
+            print(f"⚠️ Not restored (still hold the old rows): {', '.join(untouched)}")
+        return None
+    finally:
+        executor.shutdown()
+    print(f"✅ Restored {len(tables)} tables ({rows} rows) from {manifest.get('created_at')} "
+          f"snapshot in {time.perf_counter() - started:.1f}s")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot or restore the laundry database")
+    parser.add_argument("action", choices=("create", "restore"))
+    parser.add_argument("directory", help="snapshot directory")
+    parser.add_argument("--jobs", type=int, default=SNAPSHOT_JOBS,
+                        help="tables dumped or loaded at the same time")
+    parser.add_argument("--yes", action="store_true",
+                        help="confirm that restore replaces the current data")
+    args = parser.parse_args()
+    if args.action == "create":
+        create_snapshot(args.directory, args.jobs)
+    elif not args.yes:
+        print("Restore replaces every row of the snapshot's tables; run again with --yes.")
+    else:
+        restore_snapshot(args.directory, args.jobs)
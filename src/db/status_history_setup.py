@@ -0,0 +1,89 @@
+"""
+Adds the order status history tables and orders.status_changed_at to
+databases created before status changes were logged. Existing orders
+start their current status now; safe to re-run.
+
+Run from the src directory:
+    python -m db.status_history_setup
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_db_connection, db_cursor  # noqa: E402
+
+
+def ensure_status_history_tables(cursor):
+    cursor.execute("SHOW COLUMNS FROM orders LIKE 'status_changed_at'")
+    if not cursor.fetchall():
+        print("➕ Adding orders.status_changed_at")
+        cursor.execute("""
+            ALTER TABLE orders
+            ADD COLUMN status_changed_at datetime NOT NULL DEFAULT current_timestamp()
+                AFTER order_date,
+            ADD KEY order_status_changed (order_status_id, status_changed_at)
+        """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_status_history (
+            history_id bigint(20) NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            order_id int(11) NOT NULL,
+            from_status_id int(11) DEFAULT NULL,
+            to_status_id int(11) NOT NULL,
+            changed_at datetime NOT NULL DEFAULT current_timestamp(),
+            admin_id int(11) DEFAULT NULL,
+            seconds_in_from int(11) DEFAULT NULL,
+            KEY order_id (order_id),
+            KEY changed_at (changed_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_status_durations (
+            order_status_id int(11) NOT NULL PRIMARY KEY,
+            entered_count bigint(20) NOT NULL DEFAULT 0,
+            exited_count bigint(20) NOT NULL DEFAULT 0,
+            total_seconds bigint(20) NOT NULL DEFAULT 0,
+            max_seconds int(11) NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS service_status_durations (
+            service_id int(11) NOT NULL,
+            order_status_id int(11) NOT NULL,
+            order_count bigint(20) NOT NULL DEFAULT 0,
+            units_total bigint(20) NOT NULL DEFAULT 0,
+            total_seconds bigint(20) NOT NULL DEFAULT 0,
+            PRIMARY KEY (service_id, order_status_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+
+
+def setup_status_history():
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Database connection failed!")
+        return False
+
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            ensure_status_history_tables(cursor)
+            # Orders already in a status count as having entered it once
+            cursor.execute("SELECT COUNT(*) FROM order_status_durations")
+            (seeded,) = cursor.fetchone()
+            if not seeded:
+                cursor.execute("""
+                    INSERT INTO order_status_durations (order_status_id, entered_count)
+                    SELECT order_status_id, COUNT(*) FROM orders GROUP BY order_status_id
+                """)
+        conn.commit()
+        print("✅ Order status history is ready")
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    setup_status_history()
@@ -2,77 +2,197 @@ import sys
 
 from datetime import datetime
 from decimal import Decimal
-from models.order import get_all_orders, delete_order, update_order, add_order
-from models.customer_class import get_customer_by_id, get_all_customers, update_customer, add_customer
-from models.order_status import get_order_status_by_id, get_all_order_statuses, update_order_status
+from models.order import get_all_orders, get_order_grid_rows, delete_order, add_order, advance_orders
+from models.order_index import OrderColumnStore, seconds_from_date
+from models.change_log import ChangeFeed, get_latest_change_seq
+from models.customer_class import get_all_customers, update_customer, add_customer
 from models.order_item import get_order_items_by_order, update_order_item, delete_order_item, add_order_item
-from models.payment import get_payments_by_order, update_payment, add_payment
-from models.service import get_service_by_id, get_all_services
-from models.payment_method import get_all_payment_methods
-from models.payment_status import get_all_payment_statuses
-from models.category import get_all_categories
+from models.payment import get_payments_by_order, add_payment
+from models import lookup_cache
+from models.records import Record
+from models.order_edits import OrderChangeSet, save_order_changes
+from models.order_details import get_order_details, prefetch_order_details, invalidate_order, invalidate_customer
+from db.offline_queue import journal_order_changes
+from db.connection import VersionConflictError
 from gui.order_form_page import AddOrderDialog
+from gui.workers import Worker
 
 from models.status_factory import PaymentStatusFactory
-from models.order_validator import PaymentProcessor, OrderValidator, OrderStatusManager, PaymentStatusValidator
+from models.order_validator import PaymentProcessor, OrderValidator, PaymentStatusValidator
+from models.order_state_machine import get_order_state_machine
+from models.load_planner import LoadPlanner, get_queued_load_items
+from models.money import Money
 
 from PyQt6.QtGui import QIcon, QPixmap
-from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QModelIndex
+from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QModelIndex, QTimer, QDate, QThreadPool
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QVBoxLayout, QPushButton, QHBoxLayout, QTableView, QMessageBox, QInputDialog, QHeaderView, QScrollArea, QFrame, QLineEdit,
                              QComboBox, QTextEdit, QDateEdit, QDoubleSpinBox, QSpinBox, QGroupBox, QFormLayout, QGridLayout, QDialog, QDialogButtonBox, QListWidget, QListWidgetItem, QCheckBox, QStyledItemDelegate)
 
+# How often AdminWindow polls change_log for other terminals' edits
+SYNC_INTERVAL_MS = 3000
+
+# change_log entries read per poll
+SYNC_BATCH_SIZE = 1000
+
+# Rows on each side of the selection whose details are prefetched
+PREFETCH_RADIUS = 2
+
+# Quiet period after the last detail-card edit before it is written
+EDIT_FLUSH_DELAY_MS = 800
+
+# Rejected orders listed individually after a batch status advance
+MAX_LISTED_REJECTIONS = 10
+
+# Rows fetched from the server per grid page
+GRID_PAGE_SIZE = 200
+
+# Quiet period after the last keystroke before the search box queries
+SEARCH_DEBOUNCE_MS = 250
+
 # -------- TABLE --------
 
 
+def fetch_grid_changes(feed, limit):
+    """
+    The next change_log batch and what the grid needs to apply it:
+    (batch, rows of changed orders, deleted order ids, rows of orders of
+    changed customers). None if MySQL is unreachable. Runs on a worker
+    thread and leaves the feed where it is.
+    """
+    batch = feed.fetch(limit)
+    if batch is None:
+        return None
+    changed_ids, deleted_ids, customer_ids = set(), set(), set()
+    for change in batch.changes:
+        if change['table_name'] == 'orders':
+            if change['op'] == 'delete':
+                deleted_ids.add(change['row_id'])
+                changed_ids.discard(change['row_id'])
+            else:
+                changed_ids.add(change['row_id'])
+                deleted_ids.discard(change['row_id'])
+        elif change['table_name'] == 'customers':
+            customer_ids.add(change['row_id'])
+    rows = get_order_grid_rows(changed_ids, raise_offline=True)
+    customer_rows = get_order_grid_rows(customer_ids=customer_ids, raise_offline=True)
+    return batch, rows, deleted_ids, customer_rows
+
+
 class OrdersTableModel(QAbstractTableModel):
     status_updated = pyqtSignal(str, str)
 
+    # Sort key passed to get_order_grid_rows for each column
+    SORT_KEYS = ["order_id", "customer", "status", "order_date", "total"]
+
     def __init__(self, data=None):
         super().__init__()
         self.headers = ["Order ID", "Customer Name",
                         "Status", "Order Date", "Total Price"]
-        self._raw_data = data or []
-        self._data = self._convert_data(self._raw_data)
+        self.status_names = self._load_status_names()
+        self._store = OrderColumnStore(data or [])
+        self._has_more = False
+        self.sort_by = "order_date"
+        self.descending = True
+        self.filters = {}
+
+    def query_page(self, after=None):
+        """
+        Fetch one page with the current sort and filters applied in SQL,
+        starting after the grid row `after` (None for the first page)
+        """
+        rows = get_order_grid_rows(sort_by=self.sort_by, descending=self.descending,
+                                   limit=GRID_PAGE_SIZE + 1, after=after, **self.filters)
+        self._has_more = len(rows) > GRID_PAGE_SIZE
+        return rows[:GRID_PAGE_SIZE]
 
-    def _convert_data(self, raw_data):
-        converted = []
-        for row in raw_data:
-            if isinstance(row, dict):
-                customer_name = "Unknown Customer"
-                if row.get('customer_id'):
-                    customer = get_customer_by_id(row['customer_id'])
-                    if customer:
-                        customer_name = customer.get(
-                            'customer_name', customer_name)
-
-                status_name = "Unknown Status"
-                if row.get('order_status_id'):
-                    status = get_order_status_by_id(row['order_status_id'])
-                    if status:
-                        status_name = status.get(
-                            'order_status_name', status_name)
-
-                order_date = row.get('order_date', '')
-                if isinstance(order_date, datetime):
-                    order_date = order_date.strftime('%Y-%m-%d %H:%M:%S')
-
-                total_price = row.get('total_price', '')
-                if isinstance(total_price, Decimal):
-                    total_price = f"₱{float(total_price):.2f}"
+    def query_first_page(self, filters):
+        """
+        Fetch the first page for the given filters without touching the
+        model, so it can run on a worker thread. Pass the result to set_page().
+        """
+        return get_order_grid_rows(sort_by=self.sort_by, descending=self.descending,
+                                   limit=GRID_PAGE_SIZE + 1, **filters)
 
-                converted.append([
-                    str(row.get('order_id', '')),
-                    customer_name,
-                    status_name,
-                    str(order_date),
-                    str(total_price)
-                ])
-            else:
-                converted.append([str(item) for item in row])
-        return converted
+    def set_page(self, filters, rows):
+        """Show a first page fetched by query_first_page()"""
+        self.filters = filters
+        self._has_more = len(rows) > GRID_PAGE_SIZE
+        self.update_data(rows[:GRID_PAGE_SIZE])
+
+    def reload(self):
+        """Re-query the first page"""
+        self.update_data(self.query_page())
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not len(self._store):
+            return
+        rows = self.query_page(self._store.row(len(self._store) - 1))
+        if not rows:
+            return
+        position = len(self._store)
+        self.beginInsertRows(QModelIndex(), position,
+                             position + len(rows) - 1)
+        for row in rows:
+            self._store.append(row)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if not 0 <= column < len(self.SORT_KEYS):
+            return
+        sort_by = self.SORT_KEYS[column]
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (sort_by, descending) == (self.sort_by, self.descending) and len(self._store):
+            return
+        self.sort_by, self.descending = sort_by, descending
+        self.reload()
+
+    @staticmethod
+    def build_filters(status_id=None, date_from=None, date_to=None, search=None):
+        return {key: value for key, value in (
+            ("status_id", status_id), ("date_from", date_from),
+            ("date_to", date_to), ("search", search or None))
+            if value is not None}
+
+    def set_filters(self, status_id=None, date_from=None, date_to=None, search=None):
+        self.filters = self.build_filters(status_id, date_from, date_to, search)
+        self.reload()
+
+    def _matches_filters(self, row):
+        status_id = self.filters.get("status_id")
+        if status_id is not None and row[2] != status_id:
+            return False
+        date_from = self.filters.get("date_from")
+        if date_from is not None and row[3] < seconds_from_date(date_from):
+            return False
+        date_to = self.filters.get("date_to")
+        if date_to is not None and row[3] >= seconds_from_date(date_to):
+            return False
+        return True
+
+    def _insert_position(self):
+        """Where a brand-new order belongs in the loaded rows, or None"""
+        if self.sort_by not in ("order_id", "order_date"):
+            return None
+        # Search matches phone and email too, which the grid does not hold
+        if "search" in self.filters:
+            return None
+        if self.descending:
+            return 0
+        return None if self._has_more else len(self._store)
+
+    def _load_status_names(self):
+        try:
+            return {s['order_status_id']: s['order_status_name']
+                    for s in lookup_cache.get_order_statuses()}
+        except Exception as e:
+            print(f"Error loading order statuses: {e}")
+            return {}
 
     def rowCount(self, parent=QModelIndex()):
-        return len(self._data)
+        return len(self._store)
 
     def columnCount(self, parent=QModelIndex()):
         return len(self.headers)
@@ -81,9 +201,20 @@ class OrdersTableModel(QAbstractTableModel):
         if not index.isValid():
             return None
         if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            row, column = index.row(), index.column()
+            store = self._store
             try:
-                return self._data[index.row()][index.column()]
-            except (IndexError, TypeError):
+                if column == 0:
+                    return str(store.order_ids[row])
+                if column == 1:
+                    return store.customer_names[row] or "Unknown Customer"
+                if column == 2:
+                    return self.status_names.get(store.status_ids[row], "Unknown Status")
+                if column == 3:
+                    return store.format_date(row)
+                if column == 4:
+                    return store.format_total(row)
+            except IndexError:
                 return ""
         return None
 
@@ -100,26 +231,77 @@ class OrdersTableModel(QAbstractTableModel):
         return super().flags(index)
 
     def update_data(self, new_data):
+        """Replace all rows with get_order_grid_rows() tuples"""
         self.beginResetModel()
-        self._raw_data = new_data
-        self._data = self._convert_data(new_data)
+        self.status_names = self._load_status_names()
+        self._store.load(new_data)
         self.endResetModel()
 
+    def apply_changes(self, changed_rows, deleted_ids=()):
+        """
+        Apply changed/new grid rows and deletions without a full reset.
+        Rows that no longer match the filters are dropped; new orders are
+        only placed when the sort makes their position obvious (newest
+        first), otherwise they show up on the next re-query.
+        """
+        deleted_ids = set(deleted_ids)
+        deleted_ids.update(row[0] for row in changed_rows
+                           if not self._matches_filters(row))
+        # Bottom-up, so the positions still to remove stay valid
+        positions = [self._store.find(order_id) for order_id in deleted_ids]
+        for i in sorted((i for i in positions if i is not None), reverse=True):
+            self.beginRemoveRows(QModelIndex(), i, i)
+            self._store.remove(i)
+            self.endRemoveRows()
+
+        new_rows = []
+        for row in changed_rows:
+            if row[0] in deleted_ids:
+                continue
+            i = self._store.find(row[0])
+            if i is None:
+                new_rows.append(row)
+            else:
+                self._store.replace(i, row)
+                self.dataChanged.emit(self.index(i, 0),
+                                      self.index(i, len(self.headers) - 1))
+        for row in new_rows:
+            position = self._insert_position()
+            if position is None:
+                continue
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._store.insert(position, row)
+            self.endInsertRows()
+
+    def update_row(self, order_id, status_id=None, version=None):
+        """Patch a loaded row after a local edit, without a query"""
+        i = self._store.find(order_id)
+        if i is None:
+            return
+        row = list(self._store.row(i))
+        if status_id is not None:
+            row[2] = status_id
+        if version is not None:
+            row[5] = version
+        self.apply_changes([tuple(row)])
+
+    def find_row(self, order_id):
+        return self._store.find(order_id)
+
     def get_order_data(self, row):
         try:
-            if 0 <= row < len(self._raw_data):
-                return self._raw_data[row]
+            if row is not None and 0 <= row < len(self._store):
+                return self._store.record(row)
             return None
         except (IndexError, TypeError):
             return None
 
     def get_order_id(self, row):
         try:
-            order_data = self.get_order_data(row)
-            if order_data:
-                return int(order_data.get('order_id', 0))
+            if row is not None and 0 <= row < len(self._store):
+                return self._store.order_ids[row]
             return None
-        except (IndexError, ValueError, TypeError):
+        except (IndexError, TypeError):
             return None
 
 
@@ -134,17 +316,17 @@ class OrderItemsTableModel(QAbstractTableModel):
     def _convert_data(self, raw_data):
         converted = []
         for row in raw_data:
-            if isinstance(row, dict):
+            if isinstance(row, (dict, Record)):
                 service_name = "Unknown Service"
                 if row.get('service_id'):
-                    service = get_service_by_id(row['service_id'])
+                    service = lookup_cache.get_by_id("services", row['service_id'])
                     if service:
                         service_name = service.get(
                             'service_name', service_name)
 
                 price = row.get('price', 0)
                 if isinstance(price, Decimal):
-                    price = f"₱ {float(price):.2f}"
+                    price = f"₱ {Money.of(price).to_decimal()}"
 
                 converted.append([
                     str(row.get('order_id', '')),
@@ -189,7 +371,7 @@ class OrderItemsTableModel(QAbstractTableModel):
 class StatusDelegate(QStyledItemDelegate):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.statuses = get_all_order_statuses()
+        self.statuses = lookup_cache.get_order_statuses()
 
     def createEditor(self, parent, option, index):
         combo = QComboBox(parent)
@@ -219,19 +401,42 @@ class AdminWindow(QMainWindow):
         self.setWindowIcon(QIcon("src/gui/a_logo.png"))
         self.setStyleSheet("background-color: #f9f9f9;")
 
+        # Set by the main window after login; recorded with status changes
+        self.admin_id = None
+        # Machine loads of the queued orders, updated as orders join the queue
+        self.load_planner = LoadPlanner()
         self.current_order_id = None
+        self.current_payment = None
+        # Every payment of the selected order, oldest first
+        self.current_payments = ()
         self.is_deleting = False
 
+        # Bumped on every grid query; results from older queries are dropped
+        self.search_generation = 0
+        self.search_worker = None
+        self.prefetch_worker = None
+
+        # Detail-card edits of the selected order, written together once
+        # editing pauses (or before another order is selected)
+        self.pending_changes = None
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(EDIT_FLUSH_DELAY_MS)
+        self.flush_timer.timeout.connect(self.flush_pending_changes)
+
+        # Read the change_log position before loading, so nothing is missed
+        self.change_feed = ChangeFeed(get_latest_change_seq() or 0)
+        self.sync_worker = None
+
+        self.model = OrdersTableModel()
         try:
-            orders_data = get_all_orders()
-            print(f"✅ Loaded {len(orders_data)} orders from database")
+            self.model.reload()
+            print(f"✅ Loaded {self.model.rowCount()} orders from database")
         except Exception as e:
             print(f"❌ Error loading orders: {e}")
             import traceback
             traceback.print_exc()
-            orders_data = []
 
-        self.model = OrdersTableModel(orders_data)
         self.model.status_updated.connect(self.show_status_update_notification)
         self.table = QTableView()
         self.table.setModel(self.model)
@@ -243,6 +448,11 @@ class AdminWindow(QMainWindow):
         self.table.setSelectionBehavior(
             QTableView.SelectionBehavior.SelectRows)
 
+        # Sorting is delegated to the model, which re-queries in SQL
+        self.table.horizontalHeader().setSortIndicator(
+            3, Qt.SortOrder.DescendingOrder)
+        self.table.setSortingEnabled(True)
+
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
 
@@ -276,8 +486,93 @@ class AdminWindow(QMainWindow):
         """)
 
         self.initUI()
+
+        # Pick up other terminals' edits as small deltas while shown
+        # (started and stopped by showEvent/hideEvent)
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(SYNC_INTERVAL_MS)
+        self.sync_timer.timeout.connect(self.sync_changes)
+        self.needs_catch_up = False
+
         self.showMaximized()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.needs_catch_up:
+            self.needs_catch_up = False
+            self.catch_up()
+        self.sync_timer.start()
+
+    def hideEvent(self, event):
+        self.flush_pending_changes()
+        # MainWindow keeps this window between visits; stop polling meanwhile
+        self.sync_timer.stop()
+        self.needs_catch_up = True
+        super().hideEvent(event)
+
+    def catch_up(self):
+        """Apply every change made while the window was hidden"""
+        # on_changes_fetched keeps polling while batches come back full
+        self.sync_changes()
+
+    def sync_changes(self):
+        """
+        Read the next change_log entries and the grid rows they touch on a
+        worker thread; on_changes_fetched applies them.
+        """
+        if self.is_deleting or self.sync_worker is not None:
+            return
+        self.sync_worker = Worker(fetch_grid_changes, self.change_feed, SYNC_BATCH_SIZE)
+        self.sync_worker.signals.finished.connect(self.on_changes_fetched)
+        self.sync_worker.signals.failed.connect(self.on_changes_failed)
+        QThreadPool.globalInstance().start(self.sync_worker)
+
+    def on_changes_failed(self, error):
+        # The feed has not moved, so the same entries are read next time
+        self.sync_worker = None
+        print(f"Error polling changes: {error}")
+
+    def on_changes_fetched(self, result):
+        self.sync_worker = None
+        if result is None or self.is_deleting:
+            return
+        batch, rows, deleted_ids, customer_rows = result
+        if not batch.changes:
+            self.change_feed.advance(batch)
+            return
+
+        current_changed = False
+        for change in batch.changes:
+            if change['table_name'] == 'customers':
+                invalidate_customer(change['row_id'])
+            if change['order_id'] is not None:
+                invalidate_order(change['order_id'])
+                if change['order_id'] == self.current_order_id:
+                    current_changed = True
+
+        # A customer edit only refreshes orders already on screen
+        loaded = [row for row in customer_rows
+                  if row[0] not in deleted_ids and self.model.find_row(row[0]) is not None]
+        current_changed = current_changed or any(
+            row[0] == self.current_order_id for row in loaded)
+        try:
+            self.model.apply_changes(rows + loaded, deleted_ids)
+        except Exception as e:
+            print(f"Error applying changes: {e}")
+            return
+        full = self.change_feed.new_entry_count(batch) >= SYNC_BATCH_SIZE
+        self.change_feed.advance(batch)
+
+        if self.current_order_id in deleted_ids:
+            self.clear_order_details()
+        elif current_changed and not self.pending_changes:
+            # (with edits pending, the flush's version check decides instead)
+            row = self.model.find_row(self.current_order_id)
+            if row is not None:
+                self.load_order_details(row)
+        if full:
+            self.sync_changes()
+
     def show_status_update_notification(self, old_status, new_status):
         if not self.is_deleting:
             QMessageBox.information(
@@ -308,7 +603,6 @@ class AdminWindow(QMainWindow):
         """)
 
         back_btn.clicked.connect(self._on_back_clicked)
-        back_btn.clicked.connect(self.close)
         top_bar.addWidget(back_btn)
         top_bar.addStretch()
 
@@ -328,17 +622,28 @@ class AdminWindow(QMainWindow):
         hbox = QHBoxLayout()
         add_btn = QPushButton("Add Order")
         del_btn = QPushButton("Delete Order")
+        advance_btn = QPushButton("Advance Status")
+        loads_btn = QPushButton("Plan Loads")
 
         add_btn.clicked.connect(self.open_order_form_page)
         del_btn.clicked.connect(self.delete_selected_order)
+        advance_btn.clicked.connect(self.advance_selected_orders)
+        loads_btn.clicked.connect(self.show_load_plan)
 
         self.buttons_style(add_btn)
         self.buttons_style(del_btn)
+        self.buttons_style(advance_btn)
+        self.buttons_style(loads_btn)
 
         hbox.addWidget(add_btn)
         hbox.addWidget(del_btn)
+        hbox.addWidget(advance_btn)
+        hbox.addWidget(loads_btn)
         header_vbox.addLayout(hbox)
 
+        # Filters (applied in SQL by the grid model)
+        header_vbox.addLayout(self.create_filter_bar())
+
         # Add table
         header_vbox.addWidget(self.table)
 
@@ -347,6 +652,128 @@ class AdminWindow(QMainWindow):
         # ---------- DETAIL CARDS ZONE ----------
         self.create_detail_cards(outer_vbox)
 
+    def create_filter_bar(self):
+        filter_style = """
+            QComboBox, QDateEdit {
+                background-color: #e6e6fa;
+                border: 1px solid #d8cbef;
+                border-radius: 5px;
+                padding: 5px;
+                font-size: 12px;
+            }
+            QCheckBox, QLabel { font-size: 12px; color: #122620; }
+        """
+        bar = QHBoxLayout()
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText(
+            "Search name, phone, email or order ID")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setMinimumWidth(260)
+        self.search_edit.setStyleSheet("""
+            QLineEdit {
+                background-color: #e6e6fa;
+                border: 1px solid #d8cbef;
+                border-radius: 5px;
+                padding: 5px;
+                font-size: 12px;
+            }
+        """)
+        # Restarted on every keystroke, so only a pause in typing queries
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_grid_filters)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_edit.returnPressed.connect(self.apply_grid_filters)
+
+        self.status_filter_combo = QComboBox()
+        self.status_filter_combo.setStyleSheet(filter_style)
+        self.status_filter_combo.addItem("All Statuses", None)
+        try:
+            for status in lookup_cache.get_order_statuses():
+                self.status_filter_combo.addItem(
+                    status['order_status_name'], status['order_status_id'])
+        except Exception as e:
+            print(f"Error loading order statuses: {e}")
+
+        self.date_filter_check = QCheckBox("Order date from")
+        self.date_filter_check.setStyleSheet(filter_style)
+        self.date_from_edit = QDateEdit(QDate.currentDate().addDays(-30))
+        self.date_to_edit = QDateEdit(QDate.currentDate())
+        self.date_to_label = QLabel("to")
+        self.date_to_label.setStyleSheet(filter_style)
+        for date_edit in (self.date_from_edit, self.date_to_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.setStyleSheet(filter_style)
+            date_edit.dateChanged.connect(self.apply_grid_filters)
+
+        self.status_filter_combo.currentIndexChanged.connect(
+            self.apply_grid_filters)
+        self.date_filter_check.toggled.connect(self.apply_grid_filters)
+
+        bar.addWidget(self.search_edit)
+        bar.addWidget(self.status_filter_combo)
+        bar.addWidget(self.date_filter_check)
+        bar.addWidget(self.date_from_edit)
+        bar.addWidget(self.date_to_label)
+        bar.addWidget(self.date_to_edit)
+        bar.addStretch()
+        return bar
+
+    def apply_grid_filters(self):
+        """
+        Re-query the grid for the search box and filter bar on a worker
+        thread. Only the newest query's result is shown: a query still
+        waiting in the pool is cancelled, and a late result from an older
+        one is ignored.
+        """
+        self.search_timer.stop()
+        date_from = date_to = None
+        if self.date_filter_check.isChecked():
+            date_from = datetime.combine(
+                self.date_from_edit.date().toPyDate(), datetime.min.time())
+            # date_to is exclusive: include the whole selected day
+            date_to = datetime.combine(
+                self.date_to_edit.date().addDays(1).toPyDate(), datetime.min.time())
+        filters = OrdersTableModel.build_filters(
+            status_id=self.status_filter_combo.currentData(),
+            date_from=date_from,
+            date_to=date_to,
+            search=self.search_edit.text().strip()
+        )
+
+        pool = QThreadPool.globalInstance()
+        if self.search_worker is not None:
+            pool.tryTake(self.search_worker)
+        self.search_generation += 1
+        generation = self.search_generation
+
+        worker = Worker(self.model.query_first_page, filters)
+        # Kept alive by us rather than the pool, so tryTake() above is safe
+        # even if the query has already finished
+        worker.setAutoDelete(False)
+        worker.signals.finished.connect(
+            lambda rows: self.on_grid_query_finished(worker, generation, filters, rows))
+        worker.signals.failed.connect(
+            lambda error: self.on_grid_query_failed(worker, error))
+        self.search_worker = worker
+        pool.start(worker)
+
+    def on_grid_query_failed(self, worker, error):
+        if self.search_worker is worker:
+            self.search_worker = None
+        print(f"Error filtering orders: {error}")
+
+    def on_grid_query_finished(self, worker, generation, filters, rows):
+        if self.search_worker is worker:
+            self.search_worker = None
+        if generation != self.search_generation:
+            return
+        self.model.set_page(filters, rows)
+        self.select_order(self.current_order_id)
+
     def create_detail_cards(self, parent_layout):
         """Create the three horizontal cards for detailed information"""
         cards_layout = QHBoxLayout()
@@ -515,6 +942,38 @@ class AdminWindow(QMainWindow):
         payment_layout = QFormLayout()
 
         self.total_price_label = QLabel("-")
+        self.paid_total_label = QLabel("-")
+        self.balance_label = QLabel("-")
+
+        # Which of the order's payments the fields below edit
+        self.payment_select_combo = QComboBox()
+        self.payment_select_combo.currentIndexChanged.connect(
+            self.on_payment_selected)
+        self.payment_select_combo.setStyleSheet("""
+            QComboBox {
+                background-color: transparent;;
+                border: 1px solid #d8cbef;
+                border-radius: 5px;
+                padding: 5px;
+                font-size: 13px;
+            }
+        """)
+        self.add_payment_btn = QPushButton("Add Payment")
+        self.add_payment_btn.clicked.connect(self.add_payment_to_order)
+        self.add_payment_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #c8b3ee;
+                border-radius: 5px;
+                padding: 5px 10px;
+                font-size: 12px;
+            }
+            QPushButton:hover {
+                background-color: #b79ce6;
+            }
+        """)
+        payment_select_row = QHBoxLayout()
+        payment_select_row.addWidget(self.payment_select_combo, stretch=1)
+        payment_select_row.addWidget(self.add_payment_btn)
 
         # Editable amount paid
         self.amount_paid_input = QDoubleSpinBox()
@@ -584,6 +1043,20 @@ class AdminWindow(QMainWindow):
         self.total_price_label.setStyleSheet(
             "font-size: 13px; color: #122620; padding: 4px; background-color: #e6e6fa; border-radius: 5px;")
 
+        paid_total_title = QLabel("Paid Total")
+        paid_total_title.setStyleSheet(
+            "font-weight: bold; font-size: 11px; color: #666; background-color: transparent;")
+        self.paid_total_label.setStyleSheet(self.total_price_label.styleSheet())
+
+        balance_title = QLabel("Balance")
+        balance_title.setStyleSheet(
+            "font-weight: bold; font-size: 11px; color: #666; background-color: transparent;")
+        self.balance_label.setStyleSheet(self.total_price_label.styleSheet())
+
+        payment_select_title = QLabel("Payment")
+        payment_select_title.setStyleSheet(
+            "font-weight: bold; font-size: 11px; color: #666; background-color: transparent;")
+
         amount_title = QLabel("Amount Paid")
         amount_title.setStyleSheet(
             "font-weight: bold; font-size: 11px; color: #666; background-color: transparent;")
@@ -607,6 +1080,9 @@ class AdminWindow(QMainWindow):
             "font-weight: bold; font-size: 11px; color: #666; background-color: transparent;")
 
         payment_layout.addRow(total_title, self.total_price_label)
+        payment_layout.addRow(paid_total_title, self.paid_total_label)
+        payment_layout.addRow(balance_title, self.balance_label)
+        payment_layout.addRow(payment_select_title, payment_select_row)
         payment_layout.addRow(amount_title, self.amount_paid_input)
         payment_layout.addRow(payment_date_title, self.payment_date_label)
         payment_layout.addRow(method_title, self.payment_method_combo)
@@ -626,7 +1102,7 @@ class AdminWindow(QMainWindow):
     def load_payment_dropdowns(self):
         # Load payment methods
         try:
-            methods = get_all_payment_methods()
+            methods = lookup_cache.get_payment_methods()
             self.payment_method_combo.clear()
             for method in methods:
                 self.payment_method_combo.addItem(
@@ -638,7 +1114,7 @@ class AdminWindow(QMainWindow):
 
         # Load payment statuses
         try:
-            statuses = get_all_payment_statuses()
+            statuses = lookup_cache.get_payment_statuses()
             self.payment_status_combo.clear()
             for status in statuses:
                 self.payment_status_combo.addItem(
@@ -651,7 +1127,7 @@ class AdminWindow(QMainWindow):
     def load_order_status_dropdown(self):
         """Load order statuses into dropdown"""
         try:
-            statuses = get_all_order_statuses()
+            statuses = lookup_cache.get_order_statuses()
             self.order_status_combo.clear()
             for status in statuses:
                 self.order_status_combo.addItem(
@@ -663,6 +1139,7 @@ class AdminWindow(QMainWindow):
 
     def on_selection_changed(self, selected, deselected):
         """Handle table row selection changes"""
+        self.flush_pending_changes()
         indexes = selected.indexes()
         if indexes:
             row = indexes[0].row()
@@ -677,10 +1154,17 @@ class AdminWindow(QMainWindow):
         order_id = order_data.get('order_id')
         self.current_order_id = order_id
 
-        # Load customer info
         customer_id = order_data.get('customer_id')
+        try:
+            details = get_order_details(order_id, customer_id)
+        except Exception as e:
+            print(f"Error loading order details: {e}")
+            details = None
+        self.prefetch_neighbors(row)
+
+        # Load customer info
         if customer_id:
-            customer = get_customer_by_id(customer_id)
+            customer = details.customer if details else None
             if customer:
                 self.customer_id_label.setText(
                     str(customer.get('customer_id', '-')))
@@ -712,68 +1196,196 @@ class AdminWindow(QMainWindow):
 
         # Load order items
         try:
-            order_items = get_order_items_by_order(order_id)
-            self.order_items_model.update_data(order_items)
+            self.order_items_model.update_data(
+                list(details.items) if details else [])
         except Exception as e:
             print(f"Error loading order items: {e}")
             self.order_items_model.update_data([])
 
-        # Load payment info
+        # Load payment info; the latest payment is selected for editing
         try:
-            payments = get_payments_by_order(order_id)
-            if payments and len(payments) > 0:
-                payment = payments[0]
-
-                total_price = order_data.get('total_price', 0)
-                if isinstance(total_price, Decimal):
-                    self.total_price_label.setText(
-                        f"₱{float(total_price):.2f}")
-                else:
-                    self.total_price_label.setText(f"₱{total_price:.2f}")
-
-                # Block signals while setting values to avoid triggering updates
-                self.amount_paid_input.blockSignals(True)
-                amount_paid = payment.get('amount_paid', 0)
-                if isinstance(amount_paid, Decimal):
-                    self.amount_paid_input.setValue(float(amount_paid))
-                else:
-                    self.amount_paid_input.setValue(amount_paid)
-                self.amount_paid_input.blockSignals(False)
-
-                payment_date = payment.get('payment_date', '')
-                if payment_date is None or payment_date == '':
-                    self.payment_date_label.setText("-")
-                elif isinstance(payment_date, datetime):
-                    self.payment_date_label.setText(
-                        payment_date.strftime('%Y-%m-%d %H:%M:%S'))
-                else:
-                    self.payment_date_label.setText(str(payment_date))
-
-                # Set payment method
-                self.payment_method_combo.blockSignals(True)
-                method_id = payment.get('payment_method_id')
-                for i in range(self.payment_method_combo.count()):
-                    if self.payment_method_combo.itemData(i) == method_id:
-                        self.payment_method_combo.setCurrentIndex(i)
-                        break
-                self.payment_method_combo.blockSignals(False)
-
-                # Set payment status
-                self.payment_status_combo.blockSignals(True)
-                status_id = payment.get('payment_status_id')
-                for i in range(self.payment_status_combo.count()):
-                    if self.payment_status_combo.itemData(i) == status_id:
-                        self.payment_status_combo.setCurrentIndex(i)
-                        break
-                self.payment_status_combo.blockSignals(False)
+            self.current_payments = details.payments if details else ()
+            self.current_payment = self.current_payments[-1] if self.current_payments else None
+            self.fill_payment_select()
+            if self.current_payment:
+                self.show_payment(self.current_payment)
             else:
                 self.clear_payment_info()
         except Exception as e:
             print(f"Error loading payment info: {e}")
             self.clear_payment_info()
 
+    def fill_payment_select(self):
+        """List the order's payments in the selector, current one selected"""
+        self.payment_select_combo.blockSignals(True)
+        self.payment_select_combo.clear()
+        for number, payment in enumerate(self.current_payments, 1):
+            payment_date = payment.get('payment_date')
+            date_text = payment_date.strftime('%Y-%m-%d') if isinstance(
+                payment_date, datetime) else "unpaid"
+            self.payment_select_combo.addItem(
+                f"#{number} · {Money.of(payment.get('amount_paid'))} · {date_text}",
+                payment.get('payment_id'))
+        if self.current_payment:
+            self.payment_select_combo.setCurrentIndex(
+                self.payment_select_combo.findData(self.current_payment.get('payment_id')))
+        self.payment_select_combo.blockSignals(False)
+
+    def show_payment(self, payment):
+        """Fill the payment fields from one payment row"""
+        self.update_balance_labels()
+
+        # Block signals while setting values to avoid triggering updates
+        self.amount_paid_input.blockSignals(True)
+        amount_paid = Money.of(payment.get('amount_paid', 0))
+        self.amount_paid_input.setValue(float(amount_paid))
+        self.amount_paid_input.blockSignals(False)
+
+        payment_date = payment.get('payment_date', '')
+        if payment_date is None or payment_date == '':
+            self.payment_date_label.setText("-")
+        elif isinstance(payment_date, datetime):
+            self.payment_date_label.setText(
+                payment_date.strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            self.payment_date_label.setText(str(payment_date))
+
+        # Set payment method
+        self.payment_method_combo.blockSignals(True)
+        method_id = payment.get('payment_method_id')
+        for i in range(self.payment_method_combo.count()):
+            if self.payment_method_combo.itemData(i) == method_id:
+                self.payment_method_combo.setCurrentIndex(i)
+                break
+        self.payment_method_combo.blockSignals(False)
+
+        # Set payment status
+        self.payment_status_combo.blockSignals(True)
+        status_id = payment.get('payment_status_id')
+        for i in range(self.payment_status_combo.count()):
+            if self.payment_status_combo.itemData(i) == status_id:
+                self.payment_status_combo.setCurrentIndex(i)
+                break
+        self.payment_status_combo.blockSignals(False)
+
+    def current_order_total(self):
+        order = self.model.get_order_data(self.model.find_row(self.current_order_id)) \
+            if self.current_order_id else None
+        return Money.of(order.get('total_price')) if order else Money(0)
+
+    def paid_by_other_payments(self):
+        """Sum of the selected order's payments other than the one being edited"""
+        current_id = (self.current_payment or {}).get('payment_id')
+        return sum((Money.of(p.get('amount_paid')) for p in self.current_payments
+                    if p.get('payment_id') != current_id), Money(0))
+
+    def paid_total(self):
+        """Everything paid on the selected order, including unsaved edits"""
+        return self.paid_by_other_payments() + \
+            Money.of((self.current_payment or {}).get('amount_paid'))
+
+    def update_balance_labels(self):
+        total_price = self.current_order_total()
+        paid_total = self.paid_total()
+        self.total_price_label.setText(total_price.format())
+        self.paid_total_label.setText(paid_total.format())
+        self.balance_label.setText((total_price - paid_total).format())
+
+    def on_payment_selected(self, index):
+        if index < 0 or not self.current_order_id or self.is_deleting:
+            return
+        payment_id = self.payment_select_combo.itemData(index)
+        if self.current_payment and self.current_payment.get('payment_id') == payment_id:
+            return
+        # Edits apply to one payment at a time; save those made so far
+        if not self.flush_pending_changes():
+            return
+        order = self.model.get_order_data(self.model.find_row(self.current_order_id))
+        if order is not None:
+            details = get_order_details(self.current_order_id, order.get('customer_id'))
+            self.current_payments = details.payments
+        # else the row was paged out or removed by a sync; use the payments shown
+        self.current_payment = next(
+            (p for p in self.current_payments if p.get('payment_id') == payment_id), None)
+        self.fill_payment_select()
+        if self.current_payment:
+            self.show_payment(self.current_payment)
+
+    def add_payment_to_order(self):
+        """Record another payment against the selected order's balance"""
+        if not self.current_order_id:
+            QMessageBox.warning(self, "No Selection", "Please select an order first.")
+            return
+        if not self.flush_pending_changes():
+            return
+
+        order_id = self.current_order_id
+        total_price = self.current_order_total()
+        balance = total_price - self.paid_total()
+        amount, ok = QInputDialog.getDouble(
+            self, "Add Payment",
+            f"Balance of Order ID {order_id} is {balance}.\nAmount received:",
+            max(float(balance), 0.01), 0.01, 999999.99, 2)
+        if not ok:
+            return
+        amount = Money.of(amount)
+
+        suggested_status = PaymentStatusValidator.auto_determine_payment_status(
+            self.paid_total() + amount, total_price)
+        status = next((s for s in lookup_cache.get_payment_statuses()
+                       if s['payment_status_name'].lower().strip() == suggested_status.lower()), None)
+        method_id = self.payment_method_combo.currentData()
+        try:
+            payment_id = add_payment(order_id, amount.to_decimal(), datetime.now(), method_id,
+                                     status['payment_status_id'] if status else None)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to add payment:\n{e}")
+            return
+        if not payment_id:
+            QMessageBox.warning(
+                self, "Error", "The database is unreachable, so the payment was not added.")
+            return
+
+        print(f"✅ Added payment of {amount} to order {order_id}")
+        self.refresh_order(order_id)
+        if suggested_status.lower() == "paid":
+            self.auto_update_order_status_to_queueing()
+
+    def prefetch_neighbors(self, row):
+        """Load the details of the rows around the selection in the background"""
+        neighbors = []
+        for offset in range(1, PREFETCH_RADIUS + 1):
+            for neighbor in (row + offset, row - offset):
+                if 0 <= neighbor < self.model.rowCount():
+                    order = self.model.get_order_data(neighbor)
+                    neighbors.append((order.order_id, order.customer_id))
+        if not neighbors:
+            return
+        worker = Worker(prefetch_order_details, neighbors)
+        worker.signals.failed.connect(
+            lambda error: print(f"Error prefetching order details: {error}"))
+        self.prefetch_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def clear_order_details(self):
+        self.current_order_id = None
+        self.current_payment = None
+        self.current_payments = ()
+        self.clear_payment_info()
+        self.customer_id_label.setText("-")
+        self.customer_name_label.setText("-")
+        self.customer_contact_label.setText("-")
+        self.customer_email_label.setText("-")
+        self.customer_address_text.setPlainText("-")
+        self.order_items_model.update_data([])
+
     def clear_payment_info(self):
         self.total_price_label.setText("-")
+        self.paid_total_label.setText("-")
+        self.balance_label.setText("-")
+        self.payment_select_combo.blockSignals(True)
+        self.payment_select_combo.clear()
+        self.payment_select_combo.blockSignals(False)
         self.amount_paid_input.setValue(0)
         self.payment_date_label.setText("-")
         self.payment_method_combo.setCurrentIndex(0)
@@ -786,19 +1398,18 @@ class AdminWindow(QMainWindow):
         if self.is_deleting:
             return
 
-        value = self.amount_paid_input.value()
+        value = Money.of(self.amount_paid_input.value())
 
         try:
-            payments = get_payments_by_order(self.current_order_id)
-            if not payments:
+            payment = self.get_current_payment()
+            if not payment:
                 return
-            payment = payments[0]
-            old_value = float(payment.get('amount_paid', 0))
+            old_value = Money.of(payment.get('amount_paid', 0))
         except Exception as e:
             print(f"Error fetching payment: {e}")
             return
 
-        if abs(value - old_value) < 0.01:
+        if value == old_value:
             return
 
         current_row = self.table.selectionModel().selectedRows()[0].row(
@@ -807,31 +1418,28 @@ class AdminWindow(QMainWindow):
             return
 
         order_data = self.model.get_order_data(current_row)
-        total_price = float(order_data.get('total_price', 0))
+        total_price = Money.of(order_data.get('total_price', 0))
 
         from models.order_validator import PaymentStatusValidator
         suggested_status = PaymentStatusValidator.auto_determine_payment_status(
-            value, total_price)
+            self.paid_by_other_payments() + value, total_price)
 
         confirm = QMessageBox.question(
             self,
             "Confirm Payment Update",
-            f"Update amount paid to ₱{value:.2f}?\n\n" +
+            f"Update amount paid to {value}?\n\n" +
             f"Payment status will be automatically set to: {suggested_status}",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
 
         if confirm != QMessageBox.StandardButton.Yes:
             self.amount_paid_input.blockSignals(True)
-            self.amount_paid_input.setValue(old_value)
+            self.amount_paid_input.setValue(float(old_value))
             self.amount_paid_input.blockSignals(False)
             return
 
         try:
-            payment_id = payment.get('payment_id')
-
-            from models.payment_status import get_all_payment_statuses
-            all_statuses = get_all_payment_statuses()
+            all_statuses = lookup_cache.get_payment_statuses()
             new_status_id = None
             for status in all_statuses:
                 if status['payment_status_name'].lower().strip() == suggested_status.lower():
@@ -841,56 +1449,38 @@ class AdminWindow(QMainWindow):
             if new_status_id is None:
                 new_status_id = payment.get('payment_status_id')
 
-            from models.status_factory import PaymentStatusFactory
-            status_obj = PaymentStatusFactory.create(suggested_status)
-            payment_date = status_obj.get_payment_date()
-
             # Only finalize payment date when fully paid
             if suggested_status.lower() == "paid":
                 payment_date = datetime.now()
             else:
                 payment_date = None
 
-            success = update_payment(
-                payment_id,
-                self.current_order_id,
-                Decimal(str(value)),
-                payment_date,
-                payment.get('payment_method_id'),
-                new_status_id
+            self.queue_payment_changes(
+                amount_paid=value.to_decimal(),
+                payment_date=payment_date,
+                payment_status_id=new_status_id
             )
+            self.update_balance_labels()
 
-            if success:
-                # Update UI to reflect new status
-                self.payment_status_combo.blockSignals(True)
-                for i in range(self.payment_status_combo.count()):
-                    if self.payment_status_combo.itemData(i) == new_status_id:
-                        self.payment_status_combo.setCurrentIndex(i)
-                        break
-                self.payment_status_combo.blockSignals(False)
-
-                if payment_date:
-                    if isinstance(payment_date, datetime):
-                        self.payment_date_label.setText(
-                            payment_date.strftime('%Y-%m-%d %H:%M:%S'))
-                    else:
-                        self.payment_date_label.setText(str(payment_date))
-                else:
-                    self.payment_date_label.setText("-")
+            # Update UI to reflect new status
+            self.payment_status_combo.blockSignals(True)
+            for i in range(self.payment_status_combo.count()):
+                if self.payment_status_combo.itemData(i) == new_status_id:
+                    self.payment_status_combo.setCurrentIndex(i)
+                    break
+            self.payment_status_combo.blockSignals(False)
 
-                if suggested_status.lower() == "paid":
-                    self.auto_update_order_status_to_queueing()
+            if payment_date:
+                self.payment_date_label.setText(
+                    payment_date.strftime('%Y-%m-%d %H:%M:%S'))
+            else:
+                self.payment_date_label.setText("-")
 
-                self.model.update_data(get_all_orders())
-                if current_row is not None:
-                    self.table.selectRow(current_row)
+            if suggested_status.lower() == "paid":
+                self.auto_update_order_status_to_queueing()
 
-                print(
-                    f"✅ Amount paid updated to ₱{value:.2f}, status set to {suggested_status}")
-            else:
-                print("❌ Failed to update amount paid")
-                QMessageBox.warning(
-                    self, "Error", "Failed to update amount paid")
+            print(
+                f"✅ Amount paid set to {value}, status set to {suggested_status}")
 
         except Exception as e:
             print(f"Error updating amount paid: {e}")
@@ -914,9 +1504,8 @@ class AdminWindow(QMainWindow):
 
         if confirm != QMessageBox.StandardButton.Yes:
             try:
-                payments = get_payments_by_order(self.current_order_id)
-                if payments and len(payments) > 0:
-                    payment = payments[0]
+                payment = self.get_current_payment()
+                if payment:
                     method_id = payment.get('payment_method_id')
                     self.payment_method_combo.blockSignals(True)
                     for i in range(self.payment_method_combo.count()):
@@ -929,23 +1518,10 @@ class AdminWindow(QMainWindow):
             return
 
         try:
-            payments = get_payments_by_order(self.current_order_id)
-            if payments and len(payments) > 0:
-                payment = payments[0]
-                payment_id = payment.get('payment_id')
+            if self.get_current_payment():
                 method_id = self.payment_method_combo.itemData(index)
-
-                success = update_payment(payment_id, self.current_order_id, payment.get(
-                    'amount_paid'), payment.get('payment_date'), method_id, payment.get('payment_status_id'))
-
-                if success:
-                    QMessageBox.information(
-                        self, "Success", f"Payment method updated to '{method_name}'")
-                    print(f"✅ Updated payment method")
-                else:
-                    print("❌ Failed to update payment method")
-                    QMessageBox.warning(
-                        self, "Error", "Failed to update payment method")
+                self.queue_payment_changes(payment_method_id=method_id)
+                print(f"✅ Payment method set to {method_name}")
         except Exception as e:
             print(f"Error updating payment method: {e}")
             QMessageBox.critical(
@@ -966,15 +1542,14 @@ class AdminWindow(QMainWindow):
             return
 
         order_data = self.model.get_order_data(current_row)
-        total_price = float(order_data.get('total_price', 0))
+        total_price = Money.of(order_data.get('total_price', 0))
 
         try:
-            payments = get_payments_by_order(self.current_order_id)
-            if not payments:
+            payment = self.get_current_payment()
+            if not payment:
                 return
 
-            payment = payments[0]
-            amount_paid = float(payment.get('amount_paid', 0))
+            amount_paid = self.paid_total()
 
             from models.order_validator import PaymentStatusValidator
             is_valid, error_msg, suggested_status = PaymentStatusValidator.validate_payment_status_change(
@@ -1010,9 +1585,8 @@ class AdminWindow(QMainWindow):
 
         if confirm != QMessageBox.StandardButton.Yes:
             try:
-                payments = get_payments_by_order(self.current_order_id)
-                if payments and len(payments) > 0:
-                    payment = payments[0]
+                payment = self.get_current_payment()
+                if payment:
                     status_id = payment.get('payment_status_id')
                     self.payment_status_combo.blockSignals(True)
                     for i in range(self.payment_status_combo.count()):
@@ -1025,87 +1599,226 @@ class AdminWindow(QMainWindow):
             return
 
         try:
-            payments = get_payments_by_order(self.current_order_id)
-            if payments and len(payments) > 0:
-                payment = payments[0]
-                payment_id = payment.get('payment_id')
+            payment = self.get_current_payment()
+            if payment:
                 status_id = self.payment_status_combo.itemData(index)
 
                 status = PaymentStatusFactory.create(status_name)
-                payment_date = status.get_payment_date()
-
                 if status_name.lower().strip() == "paid":
-                    amount_paid = status.get_amount_paid(total_price)
+                    # This payment settles whatever the others left open
+                    amount_paid = status.get_amount_paid(total_price) - self.paid_by_other_payments()
                     payment_date = datetime.now()
                 else:
-                    amount_paid = payment.get('amount_paid')
+                    amount_paid = Money.of(payment.get('amount_paid'))
                     payment_date = None
 
-                success = update_payment(
-                    payment_id,
-                    self.current_order_id,
-                    amount_paid,
-                    payment_date,
-                    payment.get('payment_method_id'),
-                    status_id
+                self.queue_payment_changes(
+                    amount_paid=amount_paid.to_decimal(),
+                    payment_date=payment_date,
+                    payment_status_id=status_id
                 )
 
-                if success:
-                    if payment_date:
-                        self.payment_date_label.setText(
-                            payment_date.strftime('%Y-%m-%d %H:%M:%S'))
-                    else:
-                        self.payment_date_label.setText("-")
-
-                    self.amount_paid_input.blockSignals(True)
-                    self.amount_paid_input.setValue(float(amount_paid))
-                    self.amount_paid_input.blockSignals(False)
+                if payment_date:
+                    self.payment_date_label.setText(
+                        payment_date.strftime('%Y-%m-%d %H:%M:%S'))
+                else:
+                    self.payment_date_label.setText("-")
 
-                    if status_name.lower().strip() == "paid":
-                        self.auto_update_order_status_to_queueing()
+                self.amount_paid_input.blockSignals(True)
+                self.amount_paid_input.setValue(float(amount_paid))
+                self.amount_paid_input.blockSignals(False)
+                self.update_balance_labels()
 
-                    self.model.update_data(get_all_orders())
-                    if current_row is not None:
-                        self.table.selectRow(current_row)
+                if status_name.lower().strip() == "paid":
+                    self.auto_update_order_status_to_queueing()
 
-                    QMessageBox.information(
-                        self, "Success", f"Payment status updated to '{status_name}'")
-                    print(f"✅ Updated payment status to {status_name}")
-                else:
-                    print("❌ Failed to update payment status")
-                    QMessageBox.warning(
-                        self, "Error", "Failed to update payment status")
+                print(f"✅ Payment status set to {status_name}")
         except Exception as e:
             print(f"Error updating payment status: {e}")
             QMessageBox.critical(
                 self, "Error", f"Error updating payment status:\n{e}")
 
-    def auto_update_order_status_to_queueing(self):
+    def get_current_payment(self):
+        """
+        Payment of the selected order as it was shown to the user. Its
+        version is what save_payment checks, so edits made meanwhile on
+        another terminal are detected instead of overwritten.
+        """
+        if self.current_payment is None:
+            payments = get_payments_by_order(self.current_order_id)
+            self.current_payments = tuple(payments)
+            self.current_payment = payments[-1] if payments else None
+        return self.current_payment
+
+    def pending_changes_for_current_order(self):
+        """The change set of the selected order, started on first use"""
+        if self.pending_changes is not None and \
+                self.pending_changes.order_id != self.current_order_id:
+            self.flush_pending_changes()
+        if self.pending_changes is None:
+            order = self.model.get_order_data(
+                self.model.find_row(self.current_order_id))
+            self.pending_changes = OrderChangeSet(
+                self.current_order_id,
+                order.get("version") if order else None,
+                self.get_current_payment(),
+                order
+            )
+        return self.pending_changes
+
+    def queue_payment_changes(self, **fields):
+        """
+        Record a payment edit for the selected order. It is shown right
+        away and written with the order's other edits by the next flush.
+        """
+        changes = self.pending_changes_for_current_order()
+        changes.set_payment(**fields)
+        self.current_payment = changes.merged_payment()
+        self.flush_timer.start()
+
+    def queue_order_changes(self, **fields):
+        """Record an order edit for the selected order (see queue_payment_changes)"""
+        changes = self.pending_changes_for_current_order()
+        changes.set_order(**fields)
+        if "order_status_id" in fields:
+            self.model.update_row(self.current_order_id,
+                                  status_id=fields["order_status_id"])
+        self.flush_timer.start()
+
+    def flush_pending_changes(self):
+        """
+        Write the pending detail-card edits in one transaction, or journal
+        the payment edits if MySQL is down.
+        Returns False if the edits could not be saved.
+        """
+        self.flush_timer.stop()
+        changes, self.pending_changes = self.pending_changes, None
+        if not changes:
+            return True
         try:
-            current_index = self.order_status_combo.currentIndex()
-            current_status_name = self.order_status_combo.currentText().lower().strip()
+            versions = save_order_changes(changes, self.admin_id)
+        except VersionConflictError as e:
+            self.handle_conflict(e, changes.order_id)
+            return False
+        except Exception as e:
+            print(f"Error saving order changes: {e}")
+            QMessageBox.critical(
+                self, "Error", f"Failed to save changes to Order ID {changes.order_id}:\n{e}")
+            self.refresh_order(changes.order_id, changes)
+            return False
+
+        if versions is None:
+            return self.save_changes_offline(changes)
+
+        order_version, payment_version = versions
+        if changes.payment_fields and changes.order_id == self.current_order_id:
+            self.current_payment = dict(
+                changes.merged_payment(), version=payment_version)
+        if changes.refunds and changes.order_id == self.current_order_id:
+            self.current_payments = tuple(
+                dict(payment, version=payment['version'] + 1)
+                if payment.get('payment_id') in changes.refunds
+                and payment.get('version') is not None else payment
+                for payment in self.current_payments)
+        if order_version is not None:
+            self.model.update_row(changes.order_id, version=order_version)
+        print(f"✅ Saved changes to order {changes.order_id}")
+        return True
+
+    def save_changes_offline(self, changes):
+        """
+        Journal the whole change set while MySQL is down, so its order and
+        payment edits are uploaded together. If even that fails, the edits
+        are undone on screen.
+        """
+        try:
+            journal_order_changes(changes, self.admin_id)
+        except Exception as e:
+            print(f"Error journaling order changes: {e}")
+            QMessageBox.critical(
+                self, "Error",
+                f"The database is unreachable and the changes to Order ID {changes.order_id} "
+                f"could not be saved locally either:\n{e}")
+            self.revert_changes(changes)
+            return False
+        self.show_offline_notice()
+        return True
+
+    def revert_changes(self, changes):
+        """Show an order as it was before unsaved edits, from the data already loaded"""
+        if changes.order is not None and "order_status_id" in changes.order_fields:
+            self.model.update_row(changes.order_id,
+                                  status_id=changes.order.get("order_status_id"))
+        if changes.order_id != self.current_order_id:
+            return
+        # The cached details were not invalidated, nothing was committed
+        row = self.model.find_row(changes.order_id)
+        if row is not None:
+            self.load_order_details(row)
 
-            if current_status_name == "pending payment":
-                for i in range(self.order_status_combo.count()):
-                    if self.order_status_combo.itemText(i).lower().strip() == "queueing":
-                        self.order_status_combo.blockSignals(True)
-                        self.order_status_combo.setCurrentIndex(i)
-                        self.order_status_combo.blockSignals(False)
+    def handle_conflict(self, error, order_id=None):
+        """Reload just the conflicting order and tell the user to re-apply"""
+        print(f"⚠️ {error}")
+        order_id = order_id or self.current_order_id
+        QMessageBox.warning(
+            self, "Changed on Another Terminal",
+            f"Order ID {order_id} was changed on another terminal, so your edit was not saved.\n\n"
+            "The latest values have been loaded. Please review them and try again.")
+        self.refresh_order(order_id)
+
+    def reload_orders(self):
+        """Re-query the visible page and keep the selected order selected"""
+        self.model.reload()
+        self.select_order(self.current_order_id)
+
+    def select_order(self, order_id):
+        row = self.model.find_row(order_id) if order_id else None
+        if row is not None:
+            self.table.selectRow(row)
+
+    def refresh_order(self, order_id, changes=None):
+        """
+        Re-read one order into the grid and, if selected, the detail cards.
+        If MySQL is unreachable the order is kept, with the unsaved
+        changes (if given) undone.
+        """
+        try:
+            rows = get_order_grid_rows([order_id], raise_offline=True)
+        except ConnectionError:
+            if changes is not None:
+                self.revert_changes(changes)
+            return
+        # The cached details are what the failed write was based on
+        invalidate_order(order_id)
+        self.model.apply_changes(rows, () if rows else (order_id,))
+        if order_id != self.current_order_id:
+            return
+        row = self.model.find_row(order_id)
+        if row is None:
+            self.clear_order_details()
+        else:
+            self.load_order_details(row)
 
-                        current_row = self.table.selectionModel().selectedRows()[0].row(
-                        ) if self.table.selectionModel().selectedRows() else None
-                        order_data = self.model.get_order_data(current_row)
-                        status_id = self.order_status_combo.itemData(i)
+    def show_offline_notice(self):
+        QMessageBox.information(
+            self, "Saved Offline",
+            "The database is unreachable, so these changes were saved locally.\n"
+            "It will be uploaded automatically once the connection returns.")
 
-                        update_order(
-                            self.current_order_id, order_data["customer_id"], status_id, order_data["order_date"], order_data["total_price"])
+    def auto_update_order_status_to_queueing(self):
+        try:
+            machine = get_order_state_machine()
+            queueing_id = machine.id_of("queueing")
+            if self.order_status_combo.currentData() == machine.id_of("pending payment") \
+                    and queueing_id is not None:
+                self.order_status_combo.blockSignals(True)
+                self.order_status_combo.setCurrentIndex(
+                    self.order_status_combo.findData(queueing_id))
+                self.order_status_combo.blockSignals(False)
 
-                        self.model.update_data(get_all_orders())
-                        if current_row is not None:
-                            self.table.selectRow(current_row)
+                self.queue_order_changes(order_status_id=queueing_id)
 
-                        print("✅ Auto-updated order status to Queueing")
-                        break
+                print("✅ Auto-updated order status to Queueing")
         except Exception as e:
             print(f"Error auto-updating order status: {e}")
 
@@ -1144,33 +1857,18 @@ class AdminWindow(QMainWindow):
         order_data = self.model.get_order_data(current_row)
 
         try:
-            payments = get_payments_by_order(self.current_order_id)
-            if not payments:
+            payment = self.get_current_payment()
+            if not payment:
                 QMessageBox.warning(
                     self, "Error", "No payment information found for this order")
                 return
 
-            payment = payments[0]
-            amount_paid = float(payment.get('amount_paid', 0))
-            total_price = float(order_data.get('total_price', 0))
-
-            from models.payment_status import get_payment_status_by_id
-            payment_status_data = get_payment_status_by_id(
-                payment.get('payment_status_id'))
-            payment_status_name = payment_status_data.get(
-                'payment_status_name', 'Unknown') if payment_status_data else 'Unknown'
-
-            current_order_status_data = get_order_status_by_id(
-                order_data.get('order_status_id'))
-            current_order_status_name = current_order_status_data.get(
-                'order_status_name', 'Unknown') if current_order_status_data else 'Unknown'
-
-            is_valid, error_msg = OrderStatusManager.validate_transition_with_payment(
-                current_order_status_name,
-                status_name,
-                payment_status_name,
-                amount_paid,
-                total_price
+            is_valid, error_msg = get_order_state_machine().validate(
+                order_data.get('order_status_id'),
+                self.order_status_combo.itemData(index),
+                payment.get('payment_status_id'),
+                self.paid_total(),
+                Money.of(order_data.get('total_price'))
             )
 
             if not is_valid:
@@ -1213,31 +1911,13 @@ class AdminWindow(QMainWindow):
 
         try:
             status_id = self.order_status_combo.itemData(index)
+            self.queue_order_changes(order_status_id=status_id)
 
-            success = update_order(
-                self.current_order_id,
-                order_data["customer_id"],
-                status_id,
-                order_data["order_date"],
-                order_data["total_price"]
-            )
-
-            if success:
-                self.model.update_data(get_all_orders())
-                if current_row is not None:
-                    self.table.selectRow(current_row)
+            status_text = status_name.lower().strip()
+            if status_text == "cancelled":
+                self.auto_refund_payment()
 
-                status_text = status_name.lower().strip()
-                if status_text == "cancelled":
-                    self.auto_refund_payment()
-
-                QMessageBox.information(
-                    self, "Success", f"Order status updated to '{status_name}'")
-                print(f"✅ Updated order status to {status_name}")
-            else:
-                print("❌ Failed to update order status")
-                QMessageBox.warning(
-                    self, "Error", "Failed to update order status")
+            print(f"✅ Order status set to {status_name}")
         except Exception as e:
             print(f"Error updating order status: {e}")
             QMessageBox.critical(
@@ -1245,11 +1925,7 @@ class AdminWindow(QMainWindow):
 
     def auto_refund_payment(self):
         try:
-            payments = get_payments_by_order(self.current_order_id)
-            if payments and len(payments) > 0:
-                payment = payments[0]
-                payment_id = payment.get('payment_id')
-
+            if self.get_current_payment():
                 refunded_status_id = None
                 for i in range(self.payment_status_combo.count()):
                     if self.payment_status_combo.itemText(i).lower().strip() == "refunded":
@@ -1258,27 +1934,47 @@ class AdminWindow(QMainWindow):
                         break
 
                 if refunded_status_id:
-                    success = update_payment(payment_id, self.current_order_id, Decimal(
-                        '0'), None, payment.get('payment_method_id'), refunded_status_id)
+                    self.queue_payment_changes(amount_paid=Decimal('0'), payment_date=None,
+                                               payment_status_id=refunded_status_id)
 
-                    if success:
-                        self.amount_paid_input.blockSignals(True)
-                        self.amount_paid_input.setValue(0)
-                        self.amount_paid_input.blockSignals(False)
+                    self.amount_paid_input.blockSignals(True)
+                    self.amount_paid_input.setValue(0)
+                    self.amount_paid_input.blockSignals(False)
 
-                        self.payment_date_label.setText("-")
+                    self.payment_date_label.setText("-")
 
-                        self.payment_status_combo.blockSignals(True)
-                        for i in range(self.payment_status_combo.count()):
-                            if self.payment_status_combo.itemData(i) == refunded_status_id:
-                                self.payment_status_combo.setCurrentIndex(i)
-                                break
-                        self.payment_status_combo.blockSignals(False)
+                    self.payment_status_combo.blockSignals(True)
+                    for i in range(self.payment_status_combo.count()):
+                        if self.payment_status_combo.itemData(i) == refunded_status_id:
+                            self.payment_status_combo.setCurrentIndex(i)
+                            break
+                    self.payment_status_combo.blockSignals(False)
 
-                        print("✅ Auto-refunded payment (set to ₱0)")
+                    self.refund_other_payments(refunded_status_id)
+                    self.update_balance_labels()
+                    print("✅ Auto-refunded payment (set to ₱0)")
         except Exception as e:
             print(f"Error auto-refunding payment: {e}")
 
+    def refund_other_payments(self, refunded_status_id):
+        """
+        Refund the selected order's payments besides the one in the detail
+        card, in the same pending change set (and transaction) as it.
+        """
+        current_id = (self.current_payment or {}).get('payment_id')
+        others = [payment for payment in self.current_payments
+                  if payment.get('payment_id') != current_id
+                  and Money.of(payment.get('amount_paid'))]
+        if not others:
+            return
+        changes = self.pending_changes_for_current_order()
+        changes.refund_payments(others, refunded_status_id)
+        self.current_payments = tuple(
+            dict(payment, amount_paid=Decimal('0'), payment_status_id=refunded_status_id)
+            if payment.get('payment_id') in changes.refunds else payment
+            for payment in self.current_payments)
+        self.flush_timer.start()
+
     def _on_back_clicked(self):
         self.back_requested.emit()
 
@@ -1288,9 +1984,109 @@ class AdminWindow(QMainWindow):
     def open_order_form_page(self):
         dialog = AddOrderDialog(self)
         if dialog.exec():
-            self.model.update_data(get_all_orders())
+            self.reload_orders()
+
+    def advance_selected_orders(self):
+        """Move every selected order to its next status in one batch"""
+        self.flush_pending_changes()
+        order_ids = [self.model.get_order_id(index.row())
+                     for index in self.table.selectionModel().selectedRows()]
+        order_ids = [order_id for order_id in order_ids if order_id]
+        if not order_ids:
+            QMessageBox.warning(self, "No Selection",
+                                "Please select the orders to advance (Ctrl/Shift-click for several).")
+            return
+
+        confirm = QMessageBox.question(
+            self,
+            "Confirm Status Advance",
+            f"Move {len(order_ids)} selected order(s) to their next status?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if confirm != QMessageBox.StandardButton.Yes:
+            return
+
+        try:
+            result = advance_orders(order_ids, admin_id=self.admin_id)
+        except Exception as e:
+            print(f"Error advancing orders: {e}")
+            QMessageBox.critical(self, "Error", f"Error advancing orders:\n{e}")
+            return
+        if result is None:
+            QMessageBox.warning(
+                self, "Error", "The database is unreachable, so no orders were changed.")
+            return
+
+        advanced, rejected = result
+        for order_id, (status_id, version) in advanced.items():
+            self.model.update_row(order_id, status_id=status_id, version=version)
+        if self.current_order_id in advanced:
+            row = self.model.find_row(self.current_order_id)
+            if row is not None:
+                self.load_order_details(row)
+
+        message = f"{len(advanced)} order(s) moved to their next status."
+        print(f"✅ {message} {len(rejected)} rejected.")
+        if not rejected:
+            QMessageBox.information(self, "Success", message)
+            return
+        lines = [f"• Order ID {order_id}: {reason}"
+                 for order_id, reason in rejected[:MAX_LISTED_REJECTIONS]]
+        if len(rejected) > MAX_LISTED_REJECTIONS:
+            lines.append(f"… and {len(rejected) - MAX_LISTED_REJECTIONS} more")
+        QMessageBox.warning(
+            self, "Some Orders Not Advanced",
+            f"{message}\n\n{len(rejected)} order(s) were not changed:\n" + "\n".join(lines))
+
+    def show_load_plan(self):
+        """Show the queued orders' machine-washed items grouped into machine loads"""
+        self.flush_pending_changes()
+        try:
+            queued = get_queued_load_items()
+        except Exception as e:
+            print(f"Error loading the queue: {e}")
+            QMessageBox.critical(self, "Error", f"Error loading the queue:\n{e}")
+            return
+        # Only orders that joined or left the queue since last time are repacked
+        self.load_planner.sync(queued)
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Machine Load Plan")
+        dialog.resize(700, 450)
+        layout = QVBoxLayout(dialog)
+        summary = QLabel()
+        layout.addWidget(summary)
+        loads_list = QListWidget()
+        layout.addWidget(loads_list)
+
+        def fill():
+            loads = self.load_planner.loads()
+            loads_list.clear()
+            for number, load in enumerate(loads, 1):
+                service = lookup_cache.get_by_id("services", load.service_id)
+                name = service["service_name"] if service else f"Service {load.service_id}"
+                parts = ", ".join(f"#{order_id} ({kg} kg)" for order_id, kg in load.parts)
+                loads_list.addItem(
+                    f"Load {number}: {name} - {load.used_kg}/{self.load_planner.capacity} kg - {parts}")
+            summary.setText(
+                f"{len(queued)} queued order(s) in {len(loads)} load(s), "
+                f"{self.load_planner.utilization():.0%} of machine capacity used")
+
+        def repack():
+            self.load_planner.repack()
+            fill()
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        repack_btn = buttons.addButton("Repack All", QDialogButtonBox.ButtonRole.ActionRole)
+        repack_btn.clicked.connect(repack)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+
+        fill()
+        dialog.exec()
 
     def delete_selected_order(self):
+        self.flush_pending_changes()
         indexes = self.table.selectionModel().selectedRows()
         if not indexes:
             QMessageBox.warning(self, "No Selection",
@@ -1341,14 +2137,8 @@ class AdminWindow(QMainWindow):
             if success:
                 QMessageBox.information(
                     self, "Deleted", f"Order ID {order_id} has been deleted successfully.")
-                self.model.update_data(get_all_orders())
-                self.clear_payment_info()
-                self.customer_id_label.setText("-")
-                self.customer_name_label.setText("-")
-                self.customer_contact_label.setText("-")
-                self.customer_email_label.setText("-")
-                self.customer_address_text.setPlainText("-")
-                self.order_items_model.update_data([])
+                self.reload_orders()
+                self.clear_order_details()
             else:
                 QMessageBox.warning(
                     self, "Failed", "Failed to delete order from database.")
@@ -12,6 +12,7 @@ class LoginDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Admin Login")
         self.setModal(True)
+        self.admin_id = None
         self.setFixedSize(500, 300)
         self.setWindowIcon(QIcon("src/gui/a_logo.png"))
         self.setStyleSheet("""background-color: #f9f9f9;" 
@@ -92,6 +93,7 @@ class LoginDialog(QDialog):
         if record and record["password"] == password:
             QMessageBox.information(
                 self, "Login Success", f"Welcome {record['name']}!")
+            self.admin_id = record["admin_id"]
             self.accept()
         else:
             QMessageBox.critical(self, "Login Failed",
@@ -1,14 +1,41 @@
-from gui.admin_page import AdminWindow
-from gui.login_page import LoginDialog
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QLabel, QVBoxLayout, QPushButton, QHBoxLayout, QLineEdit, QWidgetAction, QStyleOptionToolButton, QToolButton, QSizePolicy, QDialog, QMessageBox
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon, QPixmap, QResizeEvent, QAction, QActionEvent
 import sys
 from pathlib import Path
 SRC_DIR = Path(__file__).resolve().parents[1]  # ...\LaundrySystem\src
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QLabel, QVBoxLayout, QPushButton, QHBoxLayout, QLineEdit, QWidgetAction, QStyleOptionToolButton, QToolButton, QSizePolicy, QDialog, QMessageBox
+from PyQt6.QtCore import Qt, QTimer, QThreadPool
+from PyQt6.QtGui import QIcon, QPixmap, QResizeEvent, QAction, QActionEvent
+
+# The admin, login, services and tracking pages (and with them the models,
+# mysql.connector and the order form) are imported when first opened, not
+# here, so the kiosk window paints without waiting for them.
+
+# How often to try uploading orders journaled while MySQL was unreachable
+REPLAY_INTERVAL_MS = 30000
+
+
+def warm_up_reference_data():
+    """
+    Open the connection pool and preload lookup tables. Runs on a worker
+    thread, so the model and mysql.connector imports happen there too.
+    """
+    from models.lookup_cache import warm_up
+    return warm_up()
+
+
+def replay_pending_journal():
+    """
+    Upload journaled offline orders, if any. Runs on a worker thread.
+    Terminals that were never offline have no journal file, and this
+    does not create one.
+    """
+    from db.offline_queue import journal_exists, pending_count, replay_journal
+    if not journal_exists():
+        return 0
+    return replay_journal() if pending_count() else 0
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -35,6 +62,23 @@ class MainWindow(QMainWindow):
         # Move the window to center
         self.move(x, y)
 
+        # Replays run on a worker thread; at most one at a time
+        self.replay_worker = None
+        self.replay_timer = QTimer(self)
+        self.replay_timer.timeout.connect(self.replay_offline_journal)
+        self.replay_timer.start(REPLAY_INTERVAL_MS)
+
+        # Zero-delay timers fire once the event loop runs, after the first paint
+        self.warm_up_worker = None
+        QTimer.singleShot(0, self.start_warm_up)
+
+    def start_warm_up(self):
+        from gui.workers import Worker
+        self.warm_up_worker = Worker(warm_up_reference_data)
+        self.warm_up_worker.signals.failed.connect(
+            lambda error: print(f"Error warming up: {error}"))
+        QThreadPool.globalInstance().start(self.warm_up_worker)
+
     def initUI(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -192,6 +236,25 @@ class MainWindow(QMainWindow):
             self.icon_label.setPixmap(scaled)
             self.icon_label.setFixedHeight(banner_height)
 
+    # FOR OFFLINE JOURNAL
+    def replay_offline_journal(self):
+        # Connecting to a server that is down can take seconds; keep it
+        # off the GUI thread
+        if self.replay_worker is not None:
+            return
+        from gui.workers import Worker
+        self.replay_worker = Worker(replay_pending_journal)
+        self.replay_worker.signals.finished.connect(self.on_replay_done)
+        self.replay_worker.signals.failed.connect(self.on_replay_failed)
+        QThreadPool.globalInstance().start(self.replay_worker)
+
+    def on_replay_done(self, replayed):
+        self.replay_worker = None
+
+    def on_replay_failed(self, error):
+        self.replay_worker = None
+        print(f"Error replaying offline journal: {error}")
+
     # FOR TRACKING DIALOG
     def open_tracking_dialog(self, order_id_text):
         if not order_id_text.isdigit():
@@ -212,24 +275,20 @@ class MainWindow(QMainWindow):
     # FOR BACK TO MAINS
 
     def open_admin_via_login(self):
+        from gui.login_page import LoginDialog
         dlg = LoginDialog(self)
         if dlg.exec() == QDialog.DialogCode.Accepted:
-            self.open_admin()
-
-    def open_admin(self):
-        if self.admin_win is not None:
-            try:
-                self.admin_win.back_requested.disconnect(self.on_admin_back)
-            except:
-                pass
-            self.admin_win.close()
-            self.admin_win = None
-
-        # Create new admin window
-        self.admin_win = AdminWindow()
-        self.admin_win.back_requested.connect(self.on_admin_back)
-        self.admin_win.destroyed.connect(
-            lambda: setattr(self, "admin_win", None))
+            self.open_admin(dlg.admin_id)
+
+    def open_admin(self, admin_id=None):
+        # The admin window is built once and then kept: showing it again
+        # only applies the changes made since it was hidden.
+        if self.admin_win is None:
+            from gui.admin_page import AdminWindow
+            self.admin_win = AdminWindow()
+            self.admin_win.back_requested.connect(self.on_admin_back)
+        # Status changes are logged under whoever logged in last
+        self.admin_win.admin_id = admin_id
 
         self.hide()
         self.admin_win.show()
@@ -238,12 +297,7 @@ class MainWindow(QMainWindow):
 
     def on_admin_back(self):
         if self.admin_win is not None:
-            try:
-                self.admin_win.back_requested.disconnect(self.on_admin_back)
-            except Exception:
-                pass
-            self.admin_win.close()
-            self.admin_win = None
+            self.admin_win.hide()
         self.show()
 
 
@@ -1,6 +1,5 @@
 import sys
 from datetime import datetime
-from decimal import Decimal
 from PyQt6.QtWidgets import (
     QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QPushButton, QGroupBox, QTextEdit, QWidget,
@@ -11,17 +10,18 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon, QPixmap
 
 # --- Import your models ---
-from models.service import get_all_services
-from models.payment_method import get_all_payment_methods
-from models.payment_status import get_all_payment_statuses
-from models.customer_class import add_customer
+from models import lookup_cache
+from models.customer_class import find_or_create_customer
 from models.order import add_order
 from models.order_item import add_order_item
 from models.payment import add_payment
+from db.offline_queue import journal_order
 
 # NEW: Import OOP classes
 from models.order_validator import OrderValidator, PaymentProcessor
+from models.money import Money
 from models.status_factory import PaymentStatusFactory
+from models.turnaround import estimate_ready_time, describe_estimate
 
 
 class AddOrderDialog(QDialog):
@@ -255,7 +255,7 @@ class AddOrderDialog(QDialog):
     # ---------- Load Services ----------
     def load_services(self):
         """Group services by category in fixed order, show price ranges."""
-        services = get_all_services()
+        services = lookup_cache.get_services()
         if not services:
             return
 
@@ -345,21 +345,21 @@ class AddOrderDialog(QDialog):
         price_input.setEnabled(enabled)
 
     def update_total(self):
-        total = 0
+        total = Money(0)
         for item in self.service_widgets:
             if item["checkbox"].isChecked():
-                total += item["qty"].value() * item["price"].value()
-        self.total_input.setText(f"₱{total:,.2f}")
+                total += Money.of(item["price"].value()) * item["qty"].value()
+        self.total_input.setText(f"₱{total.to_decimal():,.2f}")
         self.sync_amount_paid()
 
     def load_payment_dropdowns(self):
         self.payment_method_combo.clear()
         self.payment_status_combo.clear()
         try:
-            for m in get_all_payment_methods():
+            for m in lookup_cache.get_payment_methods():
                 self.payment_method_combo.addItem(
                     m["payment_method_name"], m["payment_method_id"])
-            for s in get_all_payment_statuses():
+            for s in lookup_cache.get_payment_statuses():
                 self.payment_status_combo.addItem(
                     s["payment_status_name"], s["payment_status_id"])
         except Exception as e:
@@ -370,22 +370,21 @@ class AddOrderDialog(QDialog):
         status_name = self.payment_status_combo.currentText()
         status = PaymentStatusFactory.create(status_name)
 
-        total_text = self.total_input.text().replace("₱", "").replace(",", "").strip()
         try:
-            total = Decimal(total_text) if total_text else Decimal("0")
-        except:
-            total = Decimal("0")
+            total = Money.parse(self.total_input.text())
+        except ValueError:
+            total = Money(0)
 
         # Get amount from status object
         amount = status.get_amount_paid(total)
 
         if not status.can_modify_amount():
-            self.amount_paid_input.setText(f"{float(amount):.2f}")
+            self.amount_paid_input.setText(str(amount.to_decimal()))
             self.amount_paid_input.setReadOnly(True)
         else:
             self.amount_paid_input.setReadOnly(False)
             if not self.amount_paid_input.text():
-                self.amount_paid_input.setText(f"{float(amount):.2f}")
+                self.amount_paid_input.setText(str(amount.to_decimal()))
 
     # ---------- Save Order (UPDATED WITH VALIDATION) ----------
     def save_order(self):
@@ -422,12 +421,10 @@ class AddOrderDialog(QDialog):
         total = PaymentProcessor.calculate_total(selected)
 
         # NEW: Use validator for payment validation
-        amount_paid_text = self.amount_paid_input.text().strip()
         try:
-            amount_paid = Decimal(
-                amount_paid_text) if amount_paid_text else Decimal("0")
-        except:
-            amount_paid = Decimal("0")
+            amount_paid = Money.parse(self.amount_paid_input.text())
+        except ValueError:
+            amount_paid = Money(0)
 
         payment_status = self.payment_status_combo.currentText()
 
@@ -437,9 +434,6 @@ class AddOrderDialog(QDialog):
             return
 
         try:
-            # Add customer
-            cust_id = add_customer(name, contact, email, address)
-
             # Get payment info
             method_id = self.payment_method_combo.currentData()
             status_id = self.payment_status_combo.currentData()
@@ -448,9 +442,17 @@ class AddOrderDialog(QDialog):
             status = PaymentStatusFactory.create(payment_status)
             payment_date = status.get_payment_date()
 
+            # Reuse the customer with this phone number, or add them
+            cust_id = find_or_create_customer(name, contact, email, address)
+            if not cust_id:
+                # MySQL is unreachable: keep the order in the local journal
+                self.save_order_offline(name, contact, email, address, selected, total,
+                                        amount_paid, payment_date, method_id, status_id,
+                                        payment_status)
+                return
+
             # Determine order status
-            from models.order_status import get_all_order_statuses
-            all_statuses = get_all_order_statuses()
+            all_statuses = lookup_cache.get_order_statuses()
 
             if payment_status.lower().strip() == "paid":
                 order_status_id = next(
@@ -467,11 +469,10 @@ class AddOrderDialog(QDialog):
 
             # Add order
             order_id = add_order(cust_id, order_status_id,
-                                 datetime.now(), total)
+                                 datetime.now(), total.to_decimal())
 
             # Add order items
-            from models.service import get_all_services
-            all_services = get_all_services()
+            all_services = lookup_cache.get_services()
             for sel in selected:
                 sid = sel.get("service_id")
                 if not sid:
@@ -484,19 +485,46 @@ class AddOrderDialog(QDialog):
                         f"⚠️ Could not determine service_id for {sel.get('service_name')}, skipping item.")
                     continue
 
-                add_order_item(order_id, sid, sel["qty"], float(sel["price"]))
+                add_order_item(order_id, sid, sel["qty"],
+                               Money.of(sel["price"]).to_decimal())
 
             # Add payment record
-            add_payment(order_id, amount_paid,
+            add_payment(order_id, amount_paid.to_decimal(),
                         payment_date, method_id, status_id)
 
-            QMessageBox.information(
-                self, "Success", "Order successfully added!")
+            message = f"Order successfully added!\nOrder Tracking ID: {order_id}"
+            estimate = estimate_ready_time(order_id)
+            if estimate:
+                message += f"\nEstimated Ready: {describe_estimate(estimate)}"
+            QMessageBox.information(self, "Success", message)
             self.accept()
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save order:\n{e}")
 
+    def save_order_offline(self, name, contact, email, address, selected, total,
+                           amount_paid, payment_date, method_id, status_id, payment_status):
+        """Journal the order locally; it is replayed once MySQL is back."""
+        order_status_name = "queueing" if payment_status.lower().strip() == "paid" \
+            else "pending payment"
+        items = [
+            {"service_id": sel["service_id"], "quantity": sel["qty"],
+             "price": Money.of(sel["price"]).to_decimal()}
+            for sel in selected if sel.get("service_id")
+        ]
+        local_id = journal_order(
+            {"name": name, "phone": contact, "email": email, "address": address},
+            order_status_name, datetime.now(), total.to_decimal(), items,
+            {"amount_paid": amount_paid.to_decimal(), "payment_date": payment_date,
+             "payment_method_id": method_id, "payment_status_id": status_id}
+        )
+        QMessageBox.information(
+            self, "Saved Offline",
+            "The database is unreachable, so the order was saved locally "
+            f"(reference L{-local_id}).\nIt will be uploaded automatically once "
+            "the connection returns.")
+        self.accept()
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -3,7 +3,7 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QScrollArea, QGroupBox, QWidget)
 from PyQt6.QtGui import QPixmap, QIcon
 from PyQt6.QtCore import Qt
-from models.service import get_all_services
+from models import lookup_cache
 
 
 class ServicesPage(QDialog):
@@ -54,7 +54,7 @@ class ServicesPage(QDialog):
         container = QWidget()
         container_layout = QVBoxLayout(container)
 
-        services = get_all_services()
+        services = lookup_cache.get_services()
         if not services:
             no_service = QLabel("No services available.")
             no_service.setAlignment(Qt.AlignmentFlag.AlignCenter)
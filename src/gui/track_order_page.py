@@ -10,12 +10,11 @@ from PyQt6.QtCore import Qt
 # --- Import models ---
 from models.order import get_order_by_id
 from models.customer_class import get_customer_by_id
-from models.order_status import get_order_status_by_id
 from models.order_item import get_order_items_by_order
 from models.payment import get_payments_by_order
-from models.payment_method import get_payment_method_by_id
-from models.payment_status import get_payment_status_by_id
-from models.service import get_service_by_id
+from models import lookup_cache
+from models.money import Money
+from models.turnaround import estimate_ready_time, describe_estimate
 
 
 class TrackOrderDialog(QDialog):
@@ -57,10 +56,10 @@ class TrackOrderDialog(QDialog):
                 return
 
             customer = get_customer_by_id(order["customer_id"])
-            status = get_order_status_by_id(order["order_status_id"])
+            status = lookup_cache.get_by_id("order_statuses", order["order_status_id"])
             payments = get_payments_by_order(self.order_id)
-            payment = payments[0] if payments else None
             items = get_order_items_by_order(self.order_id)
+            estimate = estimate_ready_time(self.order_id)
 
         except Exception as e:
             QMessageBox.critical(
@@ -76,6 +75,13 @@ class TrackOrderDialog(QDialog):
             "font-size: 20px; color: #4b0082; font-weight: 600;")
         layout.addWidget(status_label)
 
+        if estimate:
+            eta_label = QLabel(f"Estimated Ready: {describe_estimate(estimate)}")
+            eta_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            eta_label.setStyleSheet(
+                "font-size: 14px; color: #122620; font-style: italic;")
+            layout.addWidget(eta_label)
+
         def make_label(text):
             lbl = QLabel(text)
             lbl.setStyleSheet(
@@ -127,31 +133,42 @@ class TrackOrderDialog(QDialog):
         pay_layout = QVBoxLayout()
         pay_layout.setSpacing(8)
 
-        if payment:
-            amount_paid = float(payment.get("amount_paid", 0))
-            pay_date = payment.get("payment_date")
-            if isinstance(pay_date, datetime):
-                pay_date = pay_date.strftime("%Y-%m-%d %H:%M:%S")
-
-            # fetch names manually if missing
-            payment_method_name = payment.get("payment_method_name")
-            if not payment_method_name and payment.get("payment_method_id"):
-                method = get_payment_method_by_id(payment["payment_method_id"])
-                payment_method_name = method.get(
-                    "payment_method_name", "-") if method else "-"
-
-            payment_status_name = payment.get("payment_status_name")
-            if not payment_status_name and payment.get("payment_status_id"):
-                status_data = get_payment_status_by_id(
-                    payment["payment_status_id"])
-                payment_status_name = status_data.get(
-                    "payment_status_name", "-") if status_data else "-"
-
-            pay_layout.addWidget(make_label(
-                f"Amount Paid: ₱{amount_paid:.2f}"))
-            pay_layout.addWidget(make_label(f"Payment Date: {pay_date}"))
-            pay_layout.addWidget(make_label(f"Method: {payment_method_name}"))
-            pay_layout.addWidget(make_label(f"Status: {payment_status_name}"))
+        if payments:
+            total_price = Money.of(order.get("total_price"))
+            # Kept up to date on the order row by every payment write
+            paid_total = Money.of(order.get("amount_paid_total"))
+            balance = Money.of(order.get("balance"))
+            pay_layout.addWidget(make_label(f"Total: {total_price}"))
+            pay_layout.addWidget(make_label(f"Amount Paid: {paid_total}"))
+            pay_layout.addWidget(make_label(f"Balance: {balance}"))
+
+            pay_table = QTableWidget()
+            pay_table.setColumnCount(4)
+            pay_table.setHorizontalHeaderLabels(
+                ["Amount", "Payment Date", "Method", "Status"])
+            pay_table.horizontalHeader().setStretchLastSection(True)
+            pay_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            pay_table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
+            pay_table.verticalHeader().setVisible(False)
+            pay_table.setRowCount(len(payments))
+
+            for r, payment in enumerate(payments):
+                pay_date = payment.get("payment_date")
+                if isinstance(pay_date, datetime):
+                    pay_date = pay_date.strftime("%Y-%m-%d %H:%M:%S")
+
+                method = lookup_cache.get_by_id("payment_methods", payment.get("payment_method_id"))
+                status_data = lookup_cache.get_by_id("payment_statuses",
+                                                     payment.get("payment_status_id"))
+
+                pay_table.setItem(r, 0, QTableWidgetItem(
+                    str(Money.of(payment.get("amount_paid")))))
+                pay_table.setItem(r, 1, QTableWidgetItem(str(pay_date or "-")))
+                pay_table.setItem(r, 2, QTableWidgetItem(
+                    method.get("payment_method_name", "-") if method else "-"))
+                pay_table.setItem(r, 3, QTableWidgetItem(
+                    status_data.get("payment_status_name", "-") if status_data else "-"))
+            pay_layout.addWidget(pay_table)
         else:
             pay_layout.addWidget(QLabel("No payment record found."))
 
@@ -178,7 +195,7 @@ class TrackOrderDialog(QDialog):
         table.setRowCount(len(items))
 
         for r, item in enumerate(items):
-            service = get_service_by_id(item["service_id"])
+            service = lookup_cache.get_by_id("services", item["service_id"])
             service_name = service["service_name"] if service else "Unknown"
 
             qty = item["quantity"]
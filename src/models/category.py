@@ -1,4 +1,5 @@
 from db.connection import get_db_connection, db_cursor
+from models import lookup_cache
 
 
 def add_category(category_name):
@@ -10,6 +11,7 @@ def add_category(category_name):
             sql = "INSERT INTO categories (category_name) VALUES (%s)"
             cursor.execute(sql, (category_name,))
             conn.commit()
+            lookup_cache.invalidate("categories", "services")
             return cursor.lastrowid
     finally:
         conn.close()
@@ -50,6 +52,7 @@ def update_category(category_id, category_name):
             sql = "UPDATE categories SET category_name = %s WHERE category_id = %s"
             cursor.execute(sql, (category_name, category_id))
             conn.commit()
+            lookup_cache.invalidate("categories", "services")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -64,6 +67,7 @@ def delete_category(category_id):
             sql = "DELETE FROM categories WHERE category_id = %s"
             cursor.execute(sql, (category_id,))
             conn.commit()
+            lookup_cache.invalidate("categories", "services")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -0,0 +1,202 @@
+import threading
+import time
+
+from db.connection import get_db_connection, db_cursor
+from models import order_details
+
+
+# How long a change_id skipped by a ChangeFeed is asked for again. Ids are
+# taken when a row is inserted but transactions commit in any order, so a
+# lower id can become visible after a higher one; ids of rolled-back
+# transactions never do.
+CHANGE_GAP_GRACE_SECONDS = 60
+# Skipped ids remembered at most (the oldest are given up first)
+MAX_CHANGE_GAPS = 1000
+
+# Cache invalidations of this thread's uncommitted changes, run by
+# commit_changes() once the changes are visible to other readers
+_pending = threading.local()
+
+
+def _defer_invalidation(table_name, row_id, order_id):
+    pending = getattr(_pending, "keys", None)
+    if pending is None:
+        pending = _pending.keys = set()
+    if table_name == "customers":
+        pending.add(("customer", row_id))
+    elif order_id is not None:
+        pending.add(("order", order_id))
+
+
+def record_change(cursor, table_name, row_id, op, order_id=None):
+    """
+    Append a change_log entry using the caller's cursor, so the entry is
+    committed in the same transaction as the change it describes.
+    op is one of 'insert', 'update' or 'delete'.
+    Every mutator goes through here, so this is also where the order
+    details cache of this process is told what changed; the entries are
+    dropped by commit_changes(), after the commit, so a reader cannot cache
+    the old rows again while the transaction is still open.
+    """
+    sql = """
+        INSERT INTO change_log (table_name, row_id, order_id, op)
+        VALUES (%s, %s, %s, %s)
+    """
+    cursor.execute(sql, (table_name, row_id, order_id, op))
+    _defer_invalidation(table_name, row_id, order_id)
+
+
+def record_changes(cursor, table_name, row_ids, op, order_ids=None):
+    """
+    record_change() for many rows of a table at once, in one multi-row
+    INSERT. order_ids gives each row's order_id; by default rows are
+    order-scoped rows whose order_id is the row id itself (e.g. orders).
+    """
+    row_ids = list(row_ids)
+    if not row_ids:
+        return
+    order_ids = row_ids if order_ids is None else list(order_ids)
+    sql = """
+        INSERT INTO change_log (table_name, row_id, order_id, op)
+        VALUES (%s, %s, %s, %s)
+    """
+    cursor.executemany(sql, [(table_name, row_id, order_id, op)
+                             for row_id, order_id in zip(row_ids, order_ids)])
+    for row_id, order_id in zip(row_ids, order_ids):
+        _defer_invalidation(table_name, row_id, order_id)
+
+
+def commit_changes(conn):
+    """
+    Commit conn, then drop the cached order details of everything
+    record_change() logged on this thread. Use it instead of
+    conn.commit() wherever changes are recorded. Invalidations left over
+    from a rolled-back transaction are run too, which is harmless.
+    """
+    conn.commit()
+    pending = getattr(_pending, "keys", None)
+    if not pending:
+        return
+    _pending.keys = None
+    for kind, row_id in pending:
+        if kind == "customer":
+            order_details.invalidate_customer(row_id)
+        else:
+            order_details.invalidate_order(row_id)
+
+
+def get_changes_since(seq, limit=1000):
+    """
+    Get change_log entries newer than seq, oldest first.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        with db_cursor(conn) as cursor:
+            sql = """
+                SELECT change_id, table_name, row_id, order_id, op
+                FROM change_log
+                WHERE change_id > %s
+                ORDER BY change_id
+                LIMIT %s
+            """
+            cursor.execute(sql, (seq, limit))
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def get_latest_change_seq():
+    """
+    Get the newest change_log sequence number (0 if the log is empty).
+    Returns None if the database is unreachable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with db_cursor(conn) as cursor:
+            sql = "SELECT COALESCE(MAX(change_id), 0) AS seq FROM change_log"
+            cursor.execute(sql)
+            return cursor.fetchone()["seq"]
+    finally:
+        conn.close()
+
+
+class ChangeBatch:
+    """change_log rows read by ChangeFeed.fetch() and the feed position after them"""
+
+    __slots__ = ("changes", "last_seq", "gaps")
+
+    def __init__(self, changes, last_seq, gaps):
+        self.changes = changes
+        self.last_seq = last_seq
+        self.gaps = gaps
+
+
+class ChangeFeed:
+    """
+    Reads change_log entries for a poller without losing any that commit
+    out of id order: ids skipped over are asked for again on every fetch
+    for CHANGE_GAP_GRACE_SECONDS. fetch() does not move the feed, so it can
+    run on a worker thread; call advance() once the batch is applied, and
+    a failed apply reads the same entries again next time.
+    """
+
+    __slots__ = ("last_seq", "gaps")
+
+    def __init__(self, last_seq=0):
+        self.last_seq = last_seq
+        self.gaps = {}  # change_id -> time.monotonic() when it was first skipped
+
+    def fetch(self, limit=1000):
+        """
+        The next entries (pending gaps first, then newer ones), oldest
+        first, as a ChangeBatch. Returns None if the database is unreachable.
+        """
+        now = time.monotonic()
+        gaps = {change_id: seen for change_id, seen in self.gaps.items()
+                if now - seen < CHANGE_GAP_GRACE_SECONDS}
+        conn = get_db_connection()
+        if not conn:
+            return None
+        try:
+            with db_cursor(conn) as cursor:
+                sql = """
+                    SELECT change_id, table_name, row_id, order_id, op
+                    FROM change_log
+                    WHERE change_id > %s
+                """
+                params = [self.last_seq]
+                if gaps:
+                    sql += f" OR change_id IN ({', '.join(['%s'] * len(gaps))})"
+                    params.extend(gaps)
+                sql += " ORDER BY change_id LIMIT %s"
+                params.append(limit + len(gaps))
+                cursor.execute(sql, params)
+                changes = cursor.fetchall()
+        finally:
+            conn.close()
+
+        last_seq = self.last_seq
+        for change in changes:
+            change_id = change["change_id"]
+            if change_id in gaps:
+                del gaps[change_id]
+                continue
+            first_missing = max(last_seq + 1, change_id - MAX_CHANGE_GAPS)
+            gaps.update((missing, now) for missing in range(first_missing, change_id))
+            last_seq = change_id
+        if len(gaps) > MAX_CHANGE_GAPS:
+            gaps = dict(sorted(gaps.items())[-MAX_CHANGE_GAPS:])
+        return ChangeBatch(changes, last_seq, gaps)
+
+    def advance(self, batch):
+        """Move past a batch from fetch() once it has been applied"""
+        self.last_seq = batch.last_seq
+        self.gaps = batch.gaps
+
+    def new_entry_count(self, batch):
+        """Entries in batch beyond the previous position (not refilled gaps)"""
+        return sum(1 for change in batch.changes if change["change_id"] > self.last_seq)
@@ -1,9 +1,72 @@
+import re
+
+from mysql.connector import IntegrityError, errorcode
+
 from db.connection import get_db_connection, db_cursor
+from models.change_log import record_change, commit_changes
+
+
+def normalize_phone(phone):
+    """
+    Reduce a phone number to the digits that identify it, so "0917 123 4567",
+    "0917-123-4567" and "+63 917 123 4567" are the same customer.
+    Returns None when there are no digits at all.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 12 and digits.startswith("63"):
+        digits = "0" + digits[2:]
+    return digits or None
+
+
+class DuplicatePhoneError(ValueError):
+    """Raised when a customer is given a phone number another customer has."""
+
+    def __init__(self, phone):
+        super().__init__(
+            f"Contact number {phone} already belongs to another customer")
+        self.phone = phone
+
+
+def upsert_customer(cursor, name, phone, email, address):
+    """
+    Insert a customer, or reuse the one with the same normalized phone,
+    using the caller's cursor (and transaction). The reused row gets the
+    latest name, email and address. Returns the customer_id.
+    """
+    normalized = normalize_phone(phone)
+    sql = """
+        INSERT INTO customers
+        (customer_name, customer_phone, customer_phone_normalized,
+         customer_email, customer_address)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            customer_id = LAST_INSERT_ID(customer_id),
+            customer_name = VALUES(customer_name),
+            customer_phone = VALUES(customer_phone),
+            customer_email = VALUES(customer_email),
+            customer_address = VALUES(customer_address)
+    """
+    cursor.execute(sql, (name, phone, normalized, email, address))
+    # rowcount is 1 for a new row, 2 for an updated one, 0 if nothing changed
+    affected = cursor.rowcount
+    customer_id = cursor.lastrowid
+    if not customer_id:
+        cursor.execute(
+            "SELECT customer_id FROM customers WHERE customer_phone_normalized = %s",
+            (normalized,))
+        row = cursor.fetchone()
+        customer_id = row["customer_id"] if isinstance(row, dict) else row[0]
+    if affected:
+        record_change(cursor, "customers", customer_id,
+                      "insert" if affected == 1 else "update")
+    return customer_id
 
 
 class Customer:
     """Customer model class - represents a customer entity"""
 
+    __slots__ = ("customer_id", "name", "phone", "email", "address")
+
     def __init__(self, customer_id=None, name="", phone="", email="", address=""):
         self.customer_id = customer_id
         self.name = name
@@ -12,7 +75,12 @@ class Customer:
         self.address = address
 
     def save(self):
-        """Save customer to database (insert or update)"""
+        """
+        Save customer to database (insert or update). A new customer whose
+        phone number is already on file takes over that customer's row.
+        Raises DuplicatePhoneError when an update would give this customer
+        another customer's phone number.
+        """
         conn = get_db_connection()
         if not conn:
             return False
@@ -23,26 +91,50 @@ class Customer:
                     sql = """
                         UPDATE customers
                         SET customer_name = %s, customer_phone = %s, 
+                            customer_phone_normalized = %s,
                             customer_email = %s, customer_address = %s
                         WHERE customer_id = %s
                     """
-                    cursor.execute(sql, (self.name, self.phone, self.email,
-                                         self.address, self.customer_id))
+                    try:
+                        cursor.execute(sql, (self.name, self.phone,
+                                             normalize_phone(self.phone), self.email,
+                                             self.address, self.customer_id))
+                    except IntegrityError as e:
+                        if e.errno != errorcode.ER_DUP_ENTRY:
+                            raise
+                        conn.rollback()
+                        raise DuplicatePhoneError(self.phone) from e
+                    record_change(cursor, "customers",
+                                  self.customer_id, "update")
                 else:
-                    # Insert new
-                    sql = """
-                        INSERT INTO customers 
-                        (customer_name, customer_phone, customer_email, customer_address)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(sql, (self.name, self.phone,
-                                   self.email, self.address))
-                    self.customer_id = cursor.lastrowid
-                conn.commit()
+                    # Insert new, or reuse the customer with this phone
+                    self.customer_id = upsert_customer(
+                        cursor, self.name, self.phone, self.email, self.address)
+                commit_changes(conn)
                 return True
         finally:
             conn.close()
 
+    @classmethod
+    def find_or_create(cls, name, phone, email, address):
+        """
+        Return the customer with this phone number (refreshing their name,
+        email and address), or create one. Returns None if the database
+        is unreachable.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return None
+        try:
+            with db_cursor(conn) as cursor:
+                customer_id = upsert_customer(
+                    cursor, name, phone, email, address)
+                commit_changes(conn)
+                return cls(customer_id=customer_id, name=name, phone=phone,
+                           email=email, address=address)
+        finally:
+            conn.close()
+
     @classmethod
     def get_by_id(cls, customer_id):
         """Load customer from database by ID"""
@@ -110,8 +202,12 @@ class Customer:
             with db_cursor(conn) as cursor:
                 sql = "DELETE FROM customers WHERE customer_id = %s"
                 cursor.execute(sql, (self.customer_id,))
-                conn.commit()
-                return cursor.rowcount > 0
+                deleted = cursor.rowcount > 0
+                if deleted:
+                    record_change(cursor, "customers",
+                                  self.customer_id, "delete")
+                commit_changes(conn)
+                return deleted
         finally:
             conn.close()
 
@@ -138,6 +234,11 @@ def add_customer(name, phone, email, address):
     return False
 
 
+def find_or_create_customer(name, phone, email, address):
+    customer = Customer.find_or_create(name, phone, email, address)
+    return customer.customer_id if customer else False
+
+
 def get_customer_by_id(customer_id):
     customer = Customer.get_by_id(customer_id)
     return customer.to_dict() if customer else None
@@ -149,6 +250,7 @@ def get_all_customers():
 
 
 def update_customer(customer_id, name, phone, email, address):
+    """Raises DuplicatePhoneError if phone belongs to another customer"""
     customer = Customer(customer_id=customer_id, name=name, phone=phone,
                         email=email, address=address)
     return customer.save()
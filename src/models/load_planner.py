@@ -0,0 +1,188 @@
+import heapq
+
+from db.connection import get_db_connection, db_cursor
+from models import lookup_cache
+from models.order_state_machine import get_order_state_machine
+from models.records import Record
+
+
+# Dry laundry one washer takes per run
+MACHINE_CAPACITY_KG = 8
+QUEUE_STATUS = "queueing"
+LOAD_PRICE_UNIT = "per kg"
+# Per-kg services that are not washed on their own (e.g. Folding)
+LOAD_EXCLUDED_CATEGORIES = ("add ons",)
+
+
+class MachineLoad(Record):
+    """One machine run: kg used and the (order_id, kg) parts in it"""
+    __slots__ = ("service_id", "used_kg", "parts")
+
+
+def _pieces(order_id, kg, capacity):
+    """An item as machine-sized pieces: full loads, then the rest"""
+    full, rest = divmod(kg, capacity)
+    return [(order_id, capacity)] * full + ([(order_id, rest)] if rest else [])
+
+
+class _ServiceLoads:
+    """
+    First-fit packing of one service's pieces. Loads with room left are
+    kept in one heap of load numbers per free kg, so finding the first load
+    a piece fits in looks at capacity heaps, not at every load.
+    """
+
+    __slots__ = ("service_id", "capacity", "loads", "by_free")
+
+    def __init__(self, service_id, capacity):
+        self.service_id = service_id
+        self.capacity = capacity
+        self.loads = []
+        self.by_free = [[] for _ in range(capacity + 1)]
+
+    def place(self, order_id, kg):
+        best = None
+        for free in range(kg, self.capacity + 1):
+            heap = self.by_free[free]
+            if heap and (best is None or heap[0] < best[0]):
+                best = (heap[0], free)
+        if best is None:
+            index = len(self.loads)
+            self.loads.append(MachineLoad(self.service_id, 0, []))
+        else:
+            index = heapq.heappop(self.by_free[best[1]])
+        load = self.loads[index]
+        load.used_kg += kg
+        load.parts.append((order_id, kg))
+        if load.used_kg < self.capacity:
+            heapq.heappush(self.by_free[self.capacity - load.used_kg], index)
+
+    def pieces(self):
+        return [part for load in self.loads for part in load.parts]
+
+
+def _pack(service_id, pieces, capacity):
+    packer = _ServiceLoads(service_id, capacity)
+    for order_id, kg in sorted(pieces, key=lambda piece: piece[1], reverse=True):
+        packer.place(order_id, kg)
+    return packer
+
+
+def first_fit_decreasing(service_id, pieces, capacity=MACHINE_CAPACITY_KG):
+    """Pack (order_id, kg) pieces of one service into as few loads as FFD finds"""
+    return _pack(service_id, pieces, capacity).loads
+
+
+class LoadPlanner:
+    """
+    Machine loads for the queued orders, one set of loads per service.
+    Orders joining the queue are fitted into the existing loads first-fit,
+    largest piece first, so planned loads stay put; when orders leave, only
+    their services are repacked (first-fit decreasing).
+    """
+
+    __slots__ = ("capacity", "groups", "order_items")
+
+    def __init__(self, capacity=MACHINE_CAPACITY_KG):
+        self.capacity = capacity
+        self.groups = {}       # service_id -> _ServiceLoads
+        self.order_items = {}  # order_id -> ((service_id, kg), ...)
+
+    def add_order(self, order_id, items):
+        """Fit an order's (service_id, kg) items into the loads"""
+        items = tuple(items)
+        if order_id in self.order_items:
+            if self.order_items[order_id] == items:
+                return
+            self.remove_orders([order_id])
+        self.order_items[order_id] = items
+        pieces = [(service_id, piece) for service_id, kg in items
+                  for piece in _pieces(order_id, kg, self.capacity)]
+        for service_id, (_, kg) in sorted(pieces, key=lambda p: p[1][1], reverse=True):
+            group = self.groups.get(service_id)
+            if group is None:
+                group = self.groups[service_id] = _ServiceLoads(service_id, self.capacity)
+            group.place(order_id, kg)
+
+    def remove_orders(self, order_ids):
+        services = set()
+        for order_id in order_ids:
+            items = self.order_items.pop(order_id, ())
+            services.update(service_id for service_id, _ in items)
+        gone = set(order_ids)
+        for service_id in services:
+            self._repack(service_id, [piece for piece in self.groups[service_id].pieces()
+                                      if piece[0] not in gone])
+
+    def sync(self, queued):
+        """
+        Bring the plan in line with the queue, given as {order_id: items}
+        in queue order: orders that left are removed, new ones added.
+        """
+        self.remove_orders([order_id for order_id in self.order_items
+                            if order_id not in queued])
+        for order_id, items in queued.items():
+            self.add_order(order_id, items)
+
+    def repack(self):
+        """Repack every service from scratch (first-fit decreasing)"""
+        for service_id, group in list(self.groups.items()):
+            self._repack(service_id, group.pieces())
+
+    def _repack(self, service_id, pieces):
+        if not pieces:
+            self.groups.pop(service_id, None)
+            return
+        self.groups[service_id] = _pack(service_id, pieces, self.capacity)
+
+    def loads(self):
+        """Every planned load, by service, fullest first"""
+        return [load for service_id in sorted(self.groups)
+                for load in sorted(self.groups[service_id].loads,
+                                   key=lambda load: load.used_kg, reverse=True)]
+
+    def utilization(self):
+        """Share of the planned machine capacity that is filled (0..1)"""
+        loads = self.loads()
+        if not loads:
+            return 0.0
+        return sum(load.used_kg for load in loads) / (len(loads) * self.capacity)
+
+
+def load_service_ids():
+    """Services washed by the kilo as their own machine loads"""
+    return {service["service_id"] for service in lookup_cache.get_services()
+            if (service.get("price_unit") or "").lower().strip() == LOAD_PRICE_UNIT
+            and (service.get("category_name") or "").lower().strip()
+            not in LOAD_EXCLUDED_CATEGORIES}
+
+
+def get_queued_load_items():
+    """
+    Machine-washed items of the orders in the queue, as
+    {order_id: [(service_id, kg), ...]} in the order they were queued.
+    """
+    queue_id = get_order_state_machine().id_of(QUEUE_STATUS)
+    service_ids = load_service_ids()
+    if queue_id is None or not service_ids:
+        return {}
+    conn = get_db_connection()
+    if not conn:
+        return {}
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            placeholders = ", ".join(["%s"] * len(service_ids))
+            cursor.execute(f"""
+                SELECT oi.order_id, oi.service_id, oi.quantity
+                FROM orders o
+                JOIN order_items oi ON oi.order_id = o.order_id
+                WHERE o.order_status_id = %s AND oi.service_id IN ({placeholders})
+                    AND oi.quantity > 0
+                ORDER BY o.status_changed_at, o.order_id, oi.order_item_id
+            """, [queue_id] + sorted(service_ids))
+            queued = {}
+            for order_id, service_id, quantity in cursor.fetchall():
+                queued.setdefault(order_id, []).append((service_id, quantity))
+            return queued
+    finally:
+        conn.close()
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from db.connection import get_db_connection
+
+
+# Reference data is reloaded after this long, so edits made on another
+# terminal show up without a restart.
+CACHE_TTL_SECONDS = 600
+
+# Lookup table name -> id column
+ID_COLUMNS = {
+    "order_statuses": "order_status_id",
+    "payment_methods": "payment_method_id",
+    "payment_statuses": "payment_status_id",
+    "services": "service_id",
+    "categories": "category_id",
+}
+
+_lock = threading.Lock()
+_cache = {}  # name -> (loaded_at, rows, {id: row})
+# Bumped whenever a table is loaded or invalidated, for derived caches
+_generation = 0
+
+
+def _loaders():
+    # Imported here because those modules call invalidate() from their mutators
+    from models.order_status import get_all_order_statuses
+    from models.payment_method import get_all_payment_methods
+    from models.payment_status import get_all_payment_statuses
+    from models.service import get_all_services
+    from models.category import get_all_categories
+    return {
+        "order_statuses": get_all_order_statuses,
+        "payment_methods": get_all_payment_methods,
+        "payment_statuses": get_all_payment_statuses,
+        "services": get_all_services,
+        "categories": get_all_categories,
+    }
+
+
+def _entry(name):
+    global _generation
+    with _lock:
+        entry = _cache.get(name)
+    if entry and time.monotonic() - entry[0] < CACHE_TTL_SECONDS:
+        return entry
+
+    rows = _loaders()[name]()
+    if not rows:
+        # Nothing to cache while offline; keep serving what we had
+        return entry or (0, [], {})
+    id_column = ID_COLUMNS[name]
+    entry = (time.monotonic(), rows, {row[id_column]: row for row in rows})
+    with _lock:
+        _cache[name] = entry
+        _generation += 1
+    return entry
+
+
+def get_all(name):
+    """All rows of a lookup table (dictionaries, as the model getters return)"""
+    return list(_entry(name)[1])
+
+
+def get_by_id(name, row_id):
+    return _entry(name)[2].get(row_id)
+
+
+def get_order_statuses():
+    return get_all("order_statuses")
+
+
+def get_payment_methods():
+    return get_all("payment_methods")
+
+
+def get_payment_statuses():
+    return get_all("payment_statuses")
+
+
+def get_services():
+    return get_all("services")
+
+
+def generation():
+    """Changes whenever cached reference data may have changed"""
+    return _generation
+
+
+def invalidate(*names):
+    """Forget cached tables (all of them if no names are given)"""
+    global _generation
+    with _lock:
+        _generation += 1
+        for name in names or list(_cache):
+            _cache.pop(name, None)
+
+
+def warm_up():
+    """
+    Open the connection pool and load every lookup table. Meant to run on
+    a worker thread right after the first window paints, so the first
+    click on Admin, Services or Track does not pay for it.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+    conn.close()
+    for name in ID_COLUMNS:
+        _entry(name)
+    return True
@@ -0,0 +1,168 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+
+class Money:
+    """
+    A peso amount stored as a whole number of centavos.
+    Arithmetic and comparisons are plain int operations, so totals over
+    many items stay exact without building a Decimal per value. Convert
+    with to_decimal() where a value goes to MySQL (DECIMAL columns) and
+    with Money.of() where one comes back.
+    Money(150) is ₱1.50; Money.of(150) is ₱150.00.
+    """
+
+    __slots__ = ("centavos",)
+
+    def __init__(self, centavos=0):
+        self.centavos = centavos
+
+    @classmethod
+    def of(cls, value):
+        """Money from pesos given as Money, int, Decimal, float, str or None"""
+        if isinstance(value, Money):
+            return value
+        if value is None:
+            return cls(0)
+        if isinstance(value, int):
+            return cls(value * 100)
+        if isinstance(value, float):
+            # Through its shortest repr, so 1.005 rounds like "1.005" does
+            return cls(_round_centavos(Decimal(str(value))))
+        if isinstance(value, Decimal):
+            return cls(_round_centavos(value))
+        if isinstance(value, str):
+            return cls.parse(value)
+        raise TypeError(f"Cannot convert {type(value).__name__} to Money")
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse user or display text such as "₱1,234.50", "-12.5" or "".
+        Raises ValueError for anything else. Digits past the centavo are
+        rounded half up.
+        """
+        text = text.strip().replace("₱", "").replace(",", "").replace(" ", "")
+        if not text:
+            return cls(0)
+        sign = 1
+        if text[0] in "+-":
+            sign = -1 if text[0] == "-" else 1
+            text = text[1:]
+        pesos, _, fraction = text.partition(".")
+        if not (pesos or fraction) or (pesos and not pesos.isdigit()) \
+                or (fraction and not fraction.isdigit()):
+            raise ValueError(f"Invalid amount: {text!r}")
+        centavos = int(pesos or 0) * 100 + int((fraction + "00")[:2])
+        if len(fraction) > 2 and fraction[2] >= "5":
+            centavos += 1
+        return cls(sign * centavos)
+
+    def to_decimal(self):
+        return Decimal(self.centavos).scaleb(-2)
+
+    def format(self):
+        """Display text, e.g. "₱1234.50" (the style used across the app)"""
+        sign = "-" if self.centavos < 0 else ""
+        pesos, cents = divmod(abs(self.centavos), 100)
+        return f"₱{sign}{pesos}.{cents:02d}"
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return f"Money({self.centavos})"
+
+    def __float__(self):
+        return self.centavos / 100
+
+    def __int__(self):
+        return self.centavos // 100
+
+    def __bool__(self):
+        return self.centavos != 0
+
+    def __hash__(self):
+        # Same as the int/Decimal peso amount it is equal to
+        return hash(self.to_decimal())
+
+    # Arithmetic: Money +/- Money, Money * quantity
+    def __add__(self, other):
+        return Money(self.centavos + _centavos(other))
+
+    __radd__ = __add__  # so sum() works
+
+    def __sub__(self, other):
+        return Money(self.centavos - _centavos(other))
+
+    def __rsub__(self, other):
+        return Money(_centavos(other) - self.centavos)
+
+    def __neg__(self):
+        return Money(-self.centavos)
+
+    def __abs__(self):
+        return Money(abs(self.centavos))
+
+    def __mul__(self, quantity):
+        if isinstance(quantity, int):
+            return Money(self.centavos * quantity)
+        if isinstance(quantity, float):
+            quantity = Decimal(str(quantity))
+        if isinstance(quantity, Decimal):
+            return Money(_round_centavos(self.to_decimal() * quantity))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    # Comparisons are exact and only against Money or peso amounts as
+    # int/Decimal, so equal values hash alike and == agrees with <= and >=;
+    # convert anything else (floats, text) with Money.of() first
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.centavos == other.centavos
+        other = _pesos(other)
+        return NotImplemented if other is NotImplemented else self.to_decimal() == other
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.centavos < other.centavos
+        other = _pesos(other)
+        return NotImplemented if other is NotImplemented else self.to_decimal() < other
+
+    def __le__(self, other):
+        if isinstance(other, Money):
+            return self.centavos <= other.centavos
+        other = _pesos(other)
+        return NotImplemented if other is NotImplemented else self.to_decimal() <= other
+
+    def __gt__(self, other):
+        if isinstance(other, Money):
+            return self.centavos > other.centavos
+        other = _pesos(other)
+        return NotImplemented if other is NotImplemented else self.to_decimal() > other
+
+    def __ge__(self, other):
+        if isinstance(other, Money):
+            return self.centavos >= other.centavos
+        other = _pesos(other)
+        return NotImplemented if other is NotImplemented else self.to_decimal() >= other
+
+
+def _round_centavos(pesos):
+    """Decimal pesos -> whole centavos, rounded half up"""
+    return int(pesos.scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+
+def _pesos(value):
+    """A peso amount Money compares with, or NotImplemented"""
+    if isinstance(value, Decimal) or (isinstance(value, int) and not isinstance(value, bool)):
+        return value
+    return NotImplemented
+
+
+def _centavos(value):
+    if isinstance(value, Money):
+        return value.centavos
+    if isinstance(value, int):
+        return value * 100
+    return Money.of(value).centavos
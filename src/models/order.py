@@ -1,30 +1,47 @@
-from db.connection import get_db_connection, db_cursor
+import re
 
+from db.connection import get_db_connection, db_cursor, VersionConflictError
+from models.change_log import record_change, record_changes, commit_changes
+from models.money import Money
+from models.order_index import date_from_seconds
+from models.records import OrderRecord
+from models.order_state_machine import get_order_state_machine
+from models.status_history import record_status_changes, record_order_removals
 
-def add_order(customer_id, order_status_id, order_date, total_price):
+
+def add_order(customer_id, order_status_id, order_date, total_price, admin_id=None):
     conn = get_db_connection()
     if not conn:
         return False
     try:
         with db_cursor(conn) as cursor:
             sql = """
-                INSERT INTO orders (customer_id, order_status_id, order_date, total_price)
-                VALUES (%s, %s, %s, %s)
+                INSERT INTO orders (customer_id, order_status_id, order_date, total_price, balance)
+                VALUES (%s, %s, %s, %s, %s)
             """
             cursor.execute(
-                sql, (customer_id, order_status_id, order_date, total_price))
-            conn.commit()
-            return cursor.lastrowid
+                sql, (customer_id, order_status_id, order_date, total_price, total_price))
+            order_id = cursor.lastrowid
+            record_change(cursor, "orders", order_id, "insert", order_id)
+            record_status_changes(
+                cursor, [(order_id, None, order_status_id)], admin_id)
+            commit_changes(conn)
+            return order_id
     finally:
         conn.close()
 
 
-def get_order_by_id(order_id):
+def get_order_by_id(order_id, as_record=False):
     conn = get_db_connection()
     if not conn:
         return None
     try:
-        with db_cursor(conn) as cursor:
+        with db_cursor(conn, dictionary=not as_record) as cursor:
+            if as_record:
+                sql = f"SELECT {OrderRecord.columns()} FROM orders WHERE order_id = %s"
+                cursor.execute(sql, (order_id,))
+                row = cursor.fetchone()
+                return OrderRecord(*row) if row else None
             sql = "SELECT * FROM orders WHERE order_id = %s"
             cursor.execute(sql, (order_id,))
             return cursor.fetchone()
@@ -32,12 +49,15 @@ def get_order_by_id(order_id):
         conn.close()
 
 
-def get_all_orders():
+def get_all_orders(as_records=False):
     conn = get_db_connection()
     if not conn:
         return []
     try:
-        with db_cursor(conn) as cursor:
+        with db_cursor(conn, dictionary=not as_records) as cursor:
+            if as_records:
+                cursor.execute(f"SELECT {OrderRecord.columns()} FROM orders")
+                return [OrderRecord(*row) for row in cursor.fetchall()]
             sql = "SELECT * FROM orders"
             cursor.execute(sql)
             return cursor.fetchall()
@@ -45,21 +65,343 @@ def get_all_orders():
         conn.close()
 
 
-def update_order(order_id, customer_id, order_status_id, order_date, total_price):
+def get_orders_by_ids(order_ids, as_records=False):
+    order_ids = list(order_ids)
+    if not order_ids:
+        return []
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        with db_cursor(conn, dictionary=not as_records) as cursor:
+            placeholders = ", ".join(["%s"] * len(order_ids))
+            if as_records:
+                sql = f"SELECT {OrderRecord.columns()} FROM orders WHERE order_id IN ({placeholders})"
+                cursor.execute(sql, order_ids)
+                return [OrderRecord(*row) for row in cursor.fetchall()]
+            sql = f"SELECT * FROM orders WHERE order_id IN ({placeholders})"
+            cursor.execute(sql, order_ids)
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+# Grid sort keys mapped to columns; order_id breaks ties so paging is stable.
+# Nullable ones are coalesced so the keyset comparison below holds for them.
+GRID_SORT_COLUMNS = {
+    "order_id": "o.order_id",
+    "customer": "COALESCE(c.customer_name, '')",
+    "status": "COALESCE(s.order_status_name, '')",
+    "order_date": "o.order_date",
+    "total": "o.total_price",
+}
+
+
+def _keyset_condition(sort_by, descending, after):
+    """
+    WHERE fragment selecting the rows that sort after the grid row
+    `after` (the last one loaded), so a page is an index range read
+    however deep it is, and rows added or dropped locally do not shift it.
+    """
+    op = "<" if descending else ">"
+    if sort_by == "order_id":
+        return f"o.order_id {op} %s", [after[0]]
+    column = GRID_SORT_COLUMNS[sort_by]
+    if sort_by == "status":
+        value = "COALESCE((SELECT order_status_name FROM order_statuses WHERE order_status_id = %s), '')"
+        param = after[2]
+    else:
+        value = "%s"
+        param = {
+            "customer": lambda: after[6] or "",
+            "order_date": lambda: date_from_seconds(after[3]),
+            "total": lambda: Money(after[4]).to_decimal(),
+        }[sort_by]()
+    return (f"({column} {op} {value} OR ({column} = {value} AND o.order_id {op} %s))",
+            [param, param, after[0]])
+
+
+def _search_customer_ids(cursor, term):
+    """
+    Customers whose name, phone or email starts with term, or whose name
+    contains words starting with the words of term (FULLTEXT). Each branch
+    is its own SELECT so it can use its own index; MySQL cannot mix a
+    FULLTEXT MATCH and LIKEs in one OR without scanning the table.
+    """
+    prefix = term.replace("\\", "\\\\").replace(
+        "%", "\\%").replace("_", "\\_") + "%"
+    branches = ["SELECT customer_id FROM customers WHERE customer_name LIKE %s",
+                "SELECT customer_id FROM customers WHERE customer_phone LIKE %s",
+                "SELECT customer_id FROM customers WHERE customer_email LIKE %s"]
+    params = [prefix] * 3
+    # InnoDB skips FULLTEXT tokens shorter than 3 characters
+    words = [w for w in re.findall(r"\w+", term) if len(w) >= 3]
+    if words:
+        branches.append("SELECT customer_id FROM customers "
+                        "WHERE MATCH(customer_name) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(" ".join(f"+{w}*" for w in words))
+    cursor.execute(" UNION ".join(branches), params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _search_join(cursor, term):
+    """
+    JOIN fragment keeping the orders whose id is term or whose customer
+    _search_customer_ids() finds, or None if nothing can match. The order
+    id and the customer orders are separate index lookups combined by
+    UNION into a derived table, which the grid query joins on order_id.
+    """
+    branches, params = [], []
+    if term.isdigit():
+        branches.append("SELECT order_id FROM orders WHERE order_id = %s")
+        params.append(int(term))
+    customer_ids = _search_customer_ids(cursor, term)
+    if customer_ids:
+        branches.append("SELECT order_id FROM orders WHERE customer_id IN ("
+                        + ", ".join(["%s"] * len(customer_ids)) + ")")
+        params.extend(customer_ids)
+    if not branches:
+        return None
+    return ("JOIN (" + " UNION ".join(branches) + ") matched ON matched.order_id = o.order_id",
+            params)
+
+
+def get_order_grid_rows(order_ids=None, sort_by="order_date", descending=True,
+                        status_id=None, date_from=None, date_to=None,
+                        search=None, limit=None, after=None, customer_ids=None,
+                        raise_offline=False):
+    """
+    Get compact rows for the admin grid as tuples:
+    (order_id, customer_id, order_status_id, order_date as seconds since
+     models.order_index.DATE_EPOCH (no time zone applied),
+     total_price in centavos, version, customer_name)
+    Sorting, the status/date-range/search filters and paging (limit, and
+    after: the last row of the previous page) all run in SQL, so only the
+    requested page leaves the server.
+    Pass order_ids (or customer_ids) to fetch only those orders.
+    Returns [] if MySQL is unreachable, or raises ConnectionError with
+    raise_offline, for callers that must tell that apart from no rows.
+    """
+    if order_ids is not None:
+        order_ids = list(order_ids)
+        if not order_ids:
+            return []
+    if customer_ids is not None:
+        customer_ids = list(customer_ids)
+        if not customer_ids:
+            return []
+    conn = get_db_connection()
+    if not conn:
+        if raise_offline:
+            raise ConnectionError("Database connection failed")
+        return []
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            sql = """
+                SELECT o.order_id, o.customer_id, o.order_status_id,
+                       TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', o.order_date),
+                       CAST(ROUND(o.total_price * 100) AS SIGNED),
+                       o.version, c.customer_name
+                FROM orders o
+                LEFT JOIN customers c ON c.customer_id = o.customer_id
+            """
+            if sort_by not in GRID_SORT_COLUMNS:
+                sort_by = "order_date"
+            if sort_by == "status":
+                sql += " LEFT JOIN order_statuses s ON s.order_status_id = o.order_status_id"
+            where, params = [], []
+            if search:
+                join = _search_join(cursor, search.strip())
+                if join is None:
+                    return []
+                sql += " " + join[0]
+                params.extend(join[1])
+            if order_ids is not None:
+                where.append(
+                    f"o.order_id IN ({', '.join(['%s'] * len(order_ids))})")
+                params.extend(order_ids)
+            if customer_ids is not None:
+                where.append(
+                    f"o.customer_id IN ({', '.join(['%s'] * len(customer_ids))})")
+                params.extend(customer_ids)
+            if status_id is not None:
+                where.append("o.order_status_id = %s")
+                params.append(status_id)
+            if date_from is not None:
+                where.append("o.order_date >= %s")
+                params.append(date_from)
+            if date_to is not None:
+                where.append("o.order_date < %s")
+                params.append(date_to)
+            if after is not None:
+                clause, keyset_params = _keyset_condition(sort_by, descending, after)
+                where.append(clause)
+                params.extend(keyset_params)
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+
+            direction = "DESC" if descending else "ASC"
+            sql += f" ORDER BY {GRID_SORT_COLUMNS[sort_by]} {direction}, o.order_id {direction}"
+            if limit is not None:
+                sql += " LIMIT %s"
+                params.append(limit)
+
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def update_order(order_id, customer_id, order_status_id, order_date, total_price, version=None,
+                 admin_id=None):
+    """
+    Update an order. When version is given, the update only applies if the
+    row is still at that version, otherwise VersionConflictError is raised.
+    A status change is logged in the status history under admin_id.
+    """
     conn = get_db_connection()
     if not conn:
         return False
     try:
         with db_cursor(conn) as cursor:
+            cursor.execute(
+                "SELECT order_status_id FROM orders WHERE order_id = %s FOR UPDATE", (order_id,))
+            row = cursor.fetchone()
+            from_status_id = row["order_status_id"] if row else None
             sql = """
                 UPDATE orders
-                SET customer_id = %s, order_status_id = %s, order_date = %s, total_price = %s
+                SET customer_id = %s, order_status_id = %s, order_date = %s, total_price = %s,
+                    balance = %s - amount_paid_total, version = version + 1
                 WHERE order_id = %s
             """
-            cursor.execute(sql, (customer_id, order_status_id,
-                           order_date, total_price, order_id))
-            conn.commit()
-            return cursor.rowcount > 0
+            params = [customer_id, order_status_id,
+                      order_date, total_price, total_price, order_id]
+            if version is not None:
+                sql += " AND version = %s"
+                params.append(version)
+            cursor.execute(sql, params)
+            updated = cursor.rowcount > 0
+            if not updated and version is not None:
+                cursor.execute(
+                    "SELECT 1 FROM orders WHERE order_id = %s", (order_id,))
+                if cursor.fetchone():
+                    raise VersionConflictError("orders", order_id)
+            if updated:
+                record_change(cursor, "orders", order_id, "update", order_id)
+                record_status_changes(
+                    cursor, [(order_id, from_status_id, order_status_id)], admin_id)
+            commit_changes(conn)
+            return updated
+    finally:
+        conn.close()
+
+
+def advance_orders(order_ids, to_status_id=None, admin_id=None):
+    """
+    Move many orders to to_status_id, or, when it is None, each to the
+    next status in the normal process (Queueing -> Washing/Cleaning, ...).
+    The orders and their latest payments are read and locked with one query,
+    checked with the order state machine, and every valid order is moved
+    by one UPDATE and logged in the status history under admin_id.
+    Invalid orders are left untouched.
+    Returns (advanced, rejected): advanced maps order_id to
+    (new order_status_id, new version); rejected is [(order_id, reason)].
+    Returns None if the database is unreachable.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return {}, []
+    machine = get_order_state_machine()
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            try:
+                placeholders = ", ".join(["%s"] * len(order_ids))
+                cursor.execute(f"""
+                    SELECT o.order_id, o.order_status_id, o.total_price, o.version,
+                           p.payment_status_id, o.amount_paid_total
+                    FROM orders o
+                    LEFT JOIN payments p ON p.payment_id = (
+                        SELECT MAX(payment_id) FROM payments WHERE order_id = o.order_id)
+                    WHERE o.order_id IN ({placeholders})
+                    FOR UPDATE
+                """, order_ids)
+                rows = cursor.fetchall()
+
+                found = {row[0] for row in rows}
+                rejected = [(order_id, f"Order ID {order_id} was not found.")
+                            for order_id in order_ids if order_id not in found]
+
+                # Group by target status so each group is one validate_batch call
+                targets = {}
+                for order_id, from_id, total, version, payment_status_id, paid in rows:
+                    target = to_status_id if to_status_id is not None \
+                        else machine.next_in_process(from_id)
+                    if target is None:
+                        rejected.append((order_id, machine.validate(
+                            from_id, from_id, payment_status_id, paid, total)[1]))
+                        continue
+                    targets.setdefault(target, []).append(
+                        (order_id, from_id, payment_status_id, paid, total, version))
+
+                advanced, from_ids = {}, {}
+                for target, group in targets.items():
+                    failed = machine.validate_batch(
+                        target, (row[:5] for row in group))
+                    rejected.extend(failed)
+                    failed_ids = {order_id for order_id, _ in failed}
+                    advanced.update((row[0], (target, row[5] + 1))
+                                    for row in group if row[0] not in failed_ids)
+                    from_ids.update((row[0], row[1])
+                                    for row in group if row[0] not in failed_ids)
+
+                if advanced:
+                    ids = list(advanced)
+                    cases = " ".join(["WHEN %s THEN %s"] * len(ids))
+                    params = [value for order_id in ids
+                              for value in (order_id, advanced[order_id][0])]
+                    cursor.execute(f"""
+                        UPDATE orders
+                        SET order_status_id = CASE order_id {cases} END,
+                            version = version + 1
+                        WHERE order_id IN ({", ".join(["%s"] * len(ids))})
+                    """, params + ids)
+                    record_changes(cursor, "orders", ids, "update")
+                    record_status_changes(
+                        cursor, [(order_id, from_ids[order_id], advanced[order_id][0])
+                                 for order_id in ids], admin_id)
+                commit_changes(conn)
+            except Exception:
+                conn.rollback()
+                raise
+        return advanced, rejected
+    finally:
+        conn.close()
+
+
+def get_unpaid_orders(limit=200):
+    """
+    Orders with an outstanding balance, largest first. Reads the
+    maintained orders.balance through its index, not the payments.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        with db_cursor(conn) as cursor:
+            sql = """
+                SELECT order_id, customer_id, order_status_id, order_date,
+                       total_price, amount_paid_total, balance
+                FROM orders
+                WHERE balance > 0
+                ORDER BY balance DESC
+                LIMIT %s
+            """
+            cursor.execute(sql, (limit,))
+            return cursor.fetchall()
     finally:
         conn.close()
 
@@ -70,9 +412,13 @@ def delete_order(order_id):
         return False
     try:
         with db_cursor(conn) as cursor:
+            record_order_removals(cursor, [order_id])
             sql = "DELETE FROM orders WHERE order_id = %s"
             cursor.execute(sql, (order_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            if deleted:
+                record_change(cursor, "orders", order_id, "delete", order_id)
+            commit_changes(conn)
+            return deleted
     finally:
         conn.close()
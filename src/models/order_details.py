@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+from models.records import Record
+
+
+# Assembled order details kept in memory (least recently used dropped first)
+ORDER_DETAILS_CACHE_SIZE = 256
+
+
+class OrderDetails(Record):
+    """
+    Everything the admin detail cards show for one order. customer is the
+    get_customer_by_id() dict, items are OrderItemRecords and payments are
+    the get_payments_by_order() dicts. Treat all of it as read-only: the
+    same object is handed to every caller until it is invalidated.
+    """
+    __slots__ = ("order_id", "customer_id", "customer", "items", "payments")
+
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # order_id -> OrderDetails
+# Bumped by every invalidation, so a load that raced one is not cached
+_invalidations = 0
+
+
+def _load(order_id, customer_id):
+    # Imported here because the mutators of these modules invalidate this cache
+    from models.customer_class import get_customer_by_id
+    from models.order_item import get_order_items_by_order
+    from models.payment import get_payments_by_order
+    customer = get_customer_by_id(customer_id) if customer_id else None
+    return OrderDetails(order_id, customer_id, customer,
+                        tuple(get_order_items_by_order(order_id, as_records=True)),
+                        tuple(get_payments_by_order(order_id)))
+
+
+def get_order_details(order_id, customer_id):
+    """Cached details of one order, assembled from the database on a miss"""
+    with _lock:
+        details = _cache.get(order_id)
+        if details is not None and details.customer_id == customer_id:
+            _cache.move_to_end(order_id)
+            return details
+        seen = _invalidations
+
+    details = _load(order_id, customer_id)
+    with _lock:
+        if seen != _invalidations:
+            return details
+        _cache[order_id] = details
+        _cache.move_to_end(order_id)
+        while len(_cache) > ORDER_DETAILS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return details
+
+
+def prefetch_order_details(orders):
+    """
+    Load details for (order_id, customer_id) pairs not cached yet.
+    Meant for a worker thread; returns the number of orders loaded.
+    """
+    loaded = 0
+    for order_id, customer_id in orders:
+        with _lock:
+            cached = _cache.get(order_id)
+        if cached is None or cached.customer_id != customer_id:
+            get_order_details(order_id, customer_id)
+            loaded += 1
+    return loaded
+
+
+def invalidate_order(order_id):
+    global _invalidations
+    with _lock:
+        _invalidations += 1
+        _cache.pop(order_id, None)
+
+
+def invalidate_customer(customer_id):
+    """Drop every cached order that shows this customer"""
+    global _invalidations
+    with _lock:
+        _invalidations += 1
+        for order_id in [order_id for order_id, details in _cache.items()
+                         if details.customer_id == customer_id]:
+            del _cache[order_id]
+
+
+def clear():
+    global _invalidations
+    with _lock:
+        _invalidations += 1
+        _cache.clear()
@@ -0,0 +1,165 @@
+from decimal import Decimal
+
+from db.connection import get_db_connection, db_cursor, VersionConflictError
+from models.change_log import record_change, commit_changes
+from models.payment import refresh_order_balances
+from models.status_history import record_status_changes
+
+
+# Columns the admin detail cards may change
+ORDER_EDIT_COLUMNS = ("order_status_id",)
+PAYMENT_EDIT_COLUMNS = ("amount_paid", "payment_date",
+                        "payment_method_id", "payment_status_id")
+
+
+class OrderChangeSet:
+    """
+    Pending edits to one order and its payment, written together by
+    save_order_changes(). Setting a field again overwrites the earlier
+    value, so several quick edits become one UPDATE per table.
+    payment is the payment row the edits were made against (with its
+    payment_id and version), order the order row (what the edits are
+    undone to if they cannot be saved). refunds are the order's other
+    payments to zero out, payment_id -> (version, payment_status_id).
+    """
+
+    __slots__ = ("order_id", "order_version", "order_fields",
+                 "payment", "payment_fields", "order", "refunds")
+
+    def __init__(self, order_id, order_version=None, payment=None, order=None):
+        self.order_id = order_id
+        self.order_version = order_version
+        self.order = order
+        self.order_fields = {}
+        self.payment = payment
+        self.payment_fields = {}
+        self.refunds = {}
+
+    def set_order(self, **fields):
+        for name in fields:
+            if name not in ORDER_EDIT_COLUMNS:
+                raise ValueError(f"Cannot edit orders.{name} here")
+        self.order_fields.update(fields)
+
+    def set_payment(self, **fields):
+        if self.payment is None:
+            raise ValueError(f"Order {self.order_id} has no payment to edit")
+        for name in fields:
+            if name not in PAYMENT_EDIT_COLUMNS:
+                raise ValueError(f"Cannot edit payments.{name} here")
+        self.payment_fields.update(fields)
+
+    def refund_payments(self, payments, payment_status_id):
+        """
+        Also refund other payments of the order (rows with payment_id and
+        version): amount_paid becomes 0 and the status payment_status_id.
+        Their payment_date is kept.
+        """
+        for payment in payments:
+            self.refunds[payment["payment_id"]] = (payment.get("version"), payment_status_id)
+
+    def merged_payment(self):
+        """The payment row with the pending edits applied"""
+        return dict(self.payment or {}, **self.payment_fields)
+
+    def __bool__(self):
+        return bool(self.order_fields or self.payment_fields or self.refunds)
+
+
+def _update_versioned(cursor, table_name, id_column, row_id, fields, version):
+    """
+    UPDATE only the given columns and bump the version. Raises
+    VersionConflictError if version is given and the row has moved on.
+    Returns True if a row was updated.
+    """
+    assignments = ", ".join(f"{name} = %s" for name in fields)
+    sql = f"""
+        UPDATE {table_name}
+        SET {assignments}, version = version + 1
+        WHERE {id_column} = %s
+    """
+    params = list(fields.values()) + [row_id]
+    if version is not None:
+        sql += " AND version = %s"
+        params.append(version)
+    cursor.execute(sql, params)
+    if cursor.rowcount > 0:
+        return True
+    if version is not None:
+        cursor.execute(
+            f"SELECT 1 FROM {table_name} WHERE {id_column} = %s", (row_id,))
+        if cursor.fetchone():
+            raise VersionConflictError(table_name, row_id)
+    return False
+
+
+def apply_order_changes(cursor, changes, admin_id=None):
+    """
+    Write an OrderChangeSet with the caller's cursor (and transaction).
+    A status change is logged in the status history under admin_id.
+    Returns (order_version, payment_version) after the write (None for a
+    version that was not tracked). Raises VersionConflictError.
+    """
+    order_version = changes.order_version
+    payment_version = (changes.payment or {}).get("version")
+    paid_changed = False
+    if changes.payment_fields:
+        payment_id = changes.payment["payment_id"]
+        if _update_versioned(cursor, "payments", "payment_id", payment_id,
+                             changes.payment_fields, payment_version):
+            record_change(cursor, "payments", payment_id,
+                          "update", changes.order_id)
+            paid_changed = "amount_paid" in changes.payment_fields
+            if payment_version is not None:
+                payment_version += 1
+    for payment_id, (version, payment_status_id) in changes.refunds.items():
+        if _update_versioned(cursor, "payments", "payment_id", payment_id,
+                             {"amount_paid": Decimal("0"),
+                              "payment_status_id": payment_status_id}, version):
+            record_change(cursor, "payments", payment_id,
+                          "update", changes.order_id)
+            paid_changed = True
+    if paid_changed:
+        refresh_order_balances(cursor, [changes.order_id])
+    if changes.order_fields:
+        from_status_id = None
+        if "order_status_id" in changes.order_fields:
+            cursor.execute("""
+                SELECT order_status_id FROM orders WHERE order_id = %s FOR UPDATE
+            """, (changes.order_id,))
+            row = cursor.fetchone()
+            from_status_id = row["order_status_id"] if row else None
+        if _update_versioned(cursor, "orders", "order_id", changes.order_id,
+                             changes.order_fields, order_version):
+            record_change(cursor, "orders", changes.order_id,
+                          "update", changes.order_id)
+            if "order_status_id" in changes.order_fields:
+                record_status_changes(cursor, [(
+                    changes.order_id, from_status_id,
+                    changes.order_fields["order_status_id"])], admin_id)
+            if order_version is not None:
+                order_version += 1
+    return order_version, payment_version
+
+
+def save_order_changes(changes, admin_id=None):
+    """
+    Write an OrderChangeSet in one transaction: either every edit is
+    applied or, on a version conflict, none is (see apply_order_changes).
+    Returns (order_version, payment_version) after the write, or None if
+    MySQL is unreachable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with db_cursor(conn) as cursor:
+            try:
+                versions = apply_order_changes(cursor, changes, admin_id)
+                commit_changes(conn)
+            except Exception:
+                conn.rollback()
+                raise
+        return versions
+    finally:
+        conn.close()
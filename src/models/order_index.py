@@ -0,0 +1,131 @@
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+from models.money import Money
+from models.records import OrderRecord
+
+
+# order_date is held as whole seconds since this naive moment. MySQL
+# DATETIME values carry no time zone, so no zone or DST rule is applied on
+# the way in (TIMESTAMPDIFF in SQL) or out (date_from_seconds).
+DATE_EPOCH = datetime(1970, 1, 1)
+
+
+def seconds_from_date(value):
+    """Naive datetime -> seconds since DATE_EPOCH"""
+    return int((value - DATE_EPOCH).total_seconds())
+
+
+def date_from_seconds(seconds):
+    """Seconds since DATE_EPOCH -> the naive datetime stored in MySQL"""
+    return DATE_EPOCH + timedelta(seconds=seconds)
+
+
+class OrderColumnStore:
+    """
+    Column-oriented, array-backed storage for the admin orders grid.
+    Rows come from get_order_grid_rows():
+        (order_id, customer_id, order_status_id, order_date as seconds since
+         DATE_EPOCH, total_price in centavos, version, customer_name)
+    Each numeric column is a typed array (8 bytes per value instead of a
+    boxed int/Decimal/datetime per cell) and customer names are interned,
+    so a regular customer's name is stored once however many orders they
+    have. Strings for display are produced on demand by the caller.
+    """
+
+    def __init__(self, rows=()):
+        self.load(rows)
+
+    def load(self, rows):
+        # order_id -> row position, rebuilt on demand after inserts/removals
+        self._positions = {}
+        self.order_ids = array('q')
+        self.customer_ids = array('q')
+        self.status_ids = array('q')
+        self.order_dates = array('q')
+        self.totals = array('q')
+        self.versions = array('i')
+        self.customer_names = []
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return len(self.order_ids)
+
+    def append(self, row):
+        order_id, customer_id, status_id, order_date, total, version, name = row
+        if self._positions is not None:
+            self._positions[order_id] = len(self.order_ids)
+        self.order_ids.append(order_id)
+        self.customer_ids.append(customer_id or 0)
+        self.status_ids.append(status_id or 0)
+        self.order_dates.append(int(order_date or 0))
+        self.totals.append(int(total or 0))
+        self.versions.append(version or 0)
+        self.customer_names.append(sys.intern(name) if name else None)
+
+    def insert(self, i, row):
+        order_id, customer_id, status_id, order_date, total, version, name = row
+        self._positions = None
+        self.order_ids.insert(i, order_id)
+        self.customer_ids.insert(i, customer_id or 0)
+        self.status_ids.insert(i, status_id or 0)
+        self.order_dates.insert(i, int(order_date or 0))
+        self.totals.insert(i, int(total or 0))
+        self.versions.insert(i, version or 0)
+        self.customer_names.insert(i, sys.intern(name) if name else None)
+
+    def replace(self, i, row):
+        order_id, customer_id, status_id, order_date, total, version, name = row
+        if self._positions is not None and self.order_ids[i] != order_id:
+            self._positions.pop(self.order_ids[i], None)
+            self._positions[order_id] = i
+        self.order_ids[i] = order_id
+        self.customer_ids[i] = customer_id or 0
+        self.status_ids[i] = status_id or 0
+        self.order_dates[i] = int(order_date or 0)
+        self.totals[i] = int(total or 0)
+        self.versions[i] = version or 0
+        self.customer_names[i] = sys.intern(name) if name else None
+
+    def row(self, i):
+        """Row i as a get_order_grid_rows() tuple"""
+        return (self.order_ids[i], self.customer_ids[i] or None,
+                self.status_ids[i] or None, self.order_dates[i], self.totals[i],
+                self.versions[i], self.customer_names[i])
+
+    def remove(self, i):
+        self._positions = None
+        for column in (self.order_ids, self.customer_ids, self.status_ids,
+                       self.order_dates, self.totals, self.versions, self.customer_names):
+            del column[i]
+
+    def find(self, order_id):
+        """Row position of order_id, or None"""
+        if self._positions is None:
+            self._positions = {oid: i for i, oid in enumerate(self.order_ids)}
+        return self._positions.get(order_id)
+
+    def format_date(self, i):
+        seconds = self.order_dates[i]
+        return date_from_seconds(seconds).strftime('%Y-%m-%d %H:%M:%S') if seconds else ""
+
+    def format_total(self, i):
+        return Money(self.totals[i]).format()
+
+    def record(self, i):
+        """
+        Materialize one row as an OrderRecord (for the detail cards and
+        updates). The grid does not hold amount_paid_total or balance, so
+        those are None.
+        """
+        seconds = self.order_dates[i]
+        return OrderRecord(
+            self.order_ids[i],
+            self.customer_ids[i] or None,
+            self.status_ids[i] or None,
+            date_from_seconds(seconds) if seconds else None,
+            Money(self.totals[i]).to_decimal(),
+            self.versions[i]
+        )
@@ -1,4 +1,6 @@
 from db.connection import get_db_connection, db_cursor
+from models.change_log import record_change, commit_changes
+from models.records import OrderItemRecord
 
 
 def add_order_item(order_id, service_id, quantity, price):
@@ -12,8 +14,11 @@ def add_order_item(order_id, service_id, quantity, price):
                 VALUES (%s, %s, %s, %s)
             """
             cursor.execute(sql, (order_id, service_id, quantity, price))
-            conn.commit()
-            return cursor.lastrowid
+            order_item_id = cursor.lastrowid
+            record_change(cursor, "order_items",
+                          order_item_id, "insert", order_id)
+            commit_changes(conn)
+            return order_item_id
     finally:
         conn.close()
 
@@ -31,12 +36,16 @@ def get_order_item_by_id(order_item_id):
         conn.close()
 
 
-def get_order_items_by_order(order_id):
+def get_order_items_by_order(order_id, as_records=False):
     conn = get_db_connection()
     if not conn:
         return []
     try:
-        with db_cursor(conn) as cursor:
+        with db_cursor(conn, dictionary=not as_records) as cursor:
+            if as_records:
+                sql = f"SELECT {OrderItemRecord.columns()} FROM order_items WHERE order_id = %s"
+                cursor.execute(sql, (order_id,))
+                return [OrderItemRecord(*row) for row in cursor.fetchall()]
             sql = "SELECT * FROM order_items WHERE order_id = %s"
             cursor.execute(sql, (order_id,))
             return cursor.fetchall()
@@ -57,8 +66,12 @@ def update_order_item(order_item_id, order_id, service_id, quantity, price):
             """
             cursor.execute(sql, (order_id, service_id,
                            quantity, price, order_item_id))
-            conn.commit()
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+            if updated:
+                record_change(cursor, "order_items",
+                              order_item_id, "update", order_id)
+            commit_changes(conn)
+            return updated
     finally:
         conn.close()
 
@@ -69,9 +82,16 @@ def delete_order_item(order_item_id):
         return False
     try:
         with db_cursor(conn) as cursor:
+            cursor.execute(
+                "SELECT order_id FROM order_items WHERE order_item_id = %s", (order_item_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
             sql = "DELETE FROM order_items WHERE order_item_id = %s"
             cursor.execute(sql, (order_item_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+            record_change(cursor, "order_items", order_item_id,
+                          "delete", row["order_id"])
+            commit_changes(conn)
+            return True
     finally:
         conn.close()
@@ -0,0 +1,158 @@
+from models import lookup_cache
+from models.money import Money
+from models.order_validator import OrderStatusManager
+
+
+def _bit(status_id):
+    return 1 << status_id
+
+
+class OrderStateMachine:
+    """
+    OrderStatusManager's transition and payment rules compiled against the
+    ids in the order_statuses and payment_statuses tables. Every status set
+    is an integer bitset (bit n = status id n), so a check is a shift and a
+    mask, with no string handling after compile().
+    """
+
+    __slots__ = ("names", "ids", "transitions", "forward", "payment_required",
+                 "full_payment_required", "unpaid_payment_statuses",
+                 "paid_payment_statuses")
+
+    def __init__(self):
+        self.names = {}             # order_status_id -> display name
+        self.ids = {}               # normalized name -> order_status_id
+        self.transitions = {}       # order_status_id -> bitset of next ids
+        self.forward = {}           # order_status_id -> next id in the process
+        self.payment_required = 0
+        self.full_payment_required = 0
+        self.unpaid_payment_statuses = 0
+        self.paid_payment_statuses = 0
+
+    @classmethod
+    def compile(cls, order_statuses, payment_statuses):
+        """Build from order_statuses / payment_statuses rows (dictionaries)"""
+        machine = cls()
+        for status in order_statuses:
+            name = status['order_status_name'].lower().strip()
+            machine.names[status['order_status_id']] = status['order_status_name']
+            machine.ids[name] = status['order_status_id']
+
+        def bitset(names, ids):
+            mask = 0
+            for name in names:
+                if name in ids:
+                    mask |= _bit(ids[name])
+            return mask
+
+        for name, status_id in machine.ids.items():
+            next_names = OrderStatusManager.VALID_TRANSITIONS.get(name, ())
+            machine.transitions[status_id] = bitset(next_names, machine.ids)
+            # The first listed transition is the normal next step
+            if next_names and next_names[0] in machine.ids:
+                machine.forward[status_id] = machine.ids[next_names[0]]
+        machine.payment_required = bitset(
+            OrderStatusManager.PAYMENT_REQUIRED_STATUSES, machine.ids)
+        machine.full_payment_required = bitset(
+            OrderStatusManager.FULL_PAYMENT_REQUIRED_STATUSES, machine.ids)
+
+        payment_ids = {status['payment_status_name'].lower().strip(): status['payment_status_id']
+                       for status in payment_statuses}
+        machine.unpaid_payment_statuses = bitset(
+            OrderStatusManager.UNPAID_PAYMENT_STATUSES, payment_ids)
+        machine.paid_payment_statuses = bitset(
+            (OrderStatusManager.PAID_PAYMENT_STATUS,), payment_ids)
+        return machine
+
+    def id_of(self, name):
+        """order_status_id for a normalized (lower-case) status name, or None"""
+        return self.ids.get(name)
+
+    def can_transition(self, from_id, to_id):
+        return bool(self.transitions.get(from_id, 0) >> to_id & 1)
+
+    def next_statuses(self, from_id):
+        mask = self.transitions.get(from_id, 0)
+        return [status_id for status_id in self.names if mask >> status_id & 1]
+
+    def next_in_process(self, status_id):
+        """Status an order normally advances to from status_id, or None"""
+        return self.forward.get(status_id)
+
+    def is_final(self, status_id):
+        return not self.transitions.get(status_id, 0)
+
+    def validate(self, from_id, to_id, payment_status_id, amount_paid, total_price):
+        """
+        Check one transition against the process flow and the payment.
+        Amounts may be Money, or Decimal, int or float as long as both are
+        the same kind.
+        Returns: (is_valid, error_message)
+        """
+        if not self.transitions.get(from_id, 0) >> to_id & 1:
+            return False, self._transition_error(from_id, to_id)
+
+        to_bit = _bit(to_id)
+        payment_bit = _bit(payment_status_id) if payment_status_id else 0
+        if self.full_payment_required & to_bit:
+            if not self.paid_payment_statuses & payment_bit:
+                return False, "Order cannot be completed unless payment status is 'Paid'."
+            if amount_paid < total_price:
+                return False, (f"Order cannot be completed. Amount paid ({Money.of(amount_paid)}) "
+                               f"is less than total ({Money.of(total_price)}).")
+        if self.payment_required & to_bit:
+            if self.unpaid_payment_statuses & payment_bit or amount_paid <= 0:
+                return False, f"Order cannot move to '{self._title(to_id)}' without any payment."
+        return True, ""
+
+    def validate_batch(self, to_id, orders):
+        """
+        Check moving many orders to one status.
+        orders yields (order_id, from_id, payment_status_id, amount_paid, total_price).
+        Returns [(order_id, error_message)] for the orders that may not move.
+        """
+        to_bit = _bit(to_id)
+        needs_full = self.full_payment_required & to_bit
+        needs_some = self.payment_required & to_bit
+        rejected = []
+        for order_id, from_id, payment_status_id, amount_paid, total_price in orders:
+            payment_bit = _bit(payment_status_id) if payment_status_id else 0
+            if not self.transitions.get(from_id, 0) & to_bit \
+                    or (needs_full and (not self.paid_payment_statuses & payment_bit
+                                        or amount_paid < total_price)) \
+                    or (needs_some and (self.unpaid_payment_statuses & payment_bit
+                                        or amount_paid <= 0)):
+                # Only failures pay for building the message
+                rejected.append((order_id, self.validate(
+                    from_id, to_id, payment_status_id, amount_paid, total_price)[1]))
+        return rejected
+
+    def _title(self, status_id):
+        return self.names.get(status_id, str(status_id)).lower().strip().title()
+
+    def _transition_error(self, from_id, to_id):
+        valid_next = self.next_statuses(from_id)
+        if valid_next:
+            return (f"Invalid transition from '{self._title(from_id)}' to '{self._title(to_id)}'. "
+                    f"Valid next statuses: {', '.join(self._title(s) for s in valid_next)}.")
+        return f"'{self._title(from_id)}' is a final status and cannot be changed."
+
+
+_machine = None
+_machine_generation = None
+
+
+def get_order_state_machine():
+    """The compiled machine, rebuilt when the cached status tables change"""
+    global _machine, _machine_generation
+    if _machine is None or _machine_generation != lookup_cache.generation():
+        order_statuses = lookup_cache.get_order_statuses()
+        payment_statuses = lookup_cache.get_payment_statuses()
+        if not order_statuses:
+            # MySQL is unreachable and nothing is cached. An empty machine
+            # would make every status final, so it is not kept: the next
+            # call compiles again once the statuses can be read.
+            return _machine or OrderStateMachine.compile(order_statuses, payment_statuses)
+        _machine = OrderStateMachine.compile(order_statuses, payment_statuses)
+        _machine_generation = lookup_cache.generation()
+    return _machine
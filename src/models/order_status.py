@@ -1,4 +1,5 @@
 from db.connection import get_db_connection, db_cursor
+from models import lookup_cache
 
 
 def add_order_status(order_status_name):
@@ -10,6 +11,7 @@ def add_order_status(order_status_name):
             sql = "INSERT INTO order_statuses (order_status_name) VALUES (%s)"
             cursor.execute(sql, (order_status_name,))
             conn.commit()
+            lookup_cache.invalidate("order_statuses")
             return cursor.lastrowid
     finally:
         conn.close()
@@ -50,6 +52,7 @@ def update_order_status(order_status_id, order_status_name):
             sql = "UPDATE order_statuses SET order_status_name = %s WHERE order_status_id = %s"
             cursor.execute(sql, (order_status_name, order_status_id))
             conn.commit()
+            lookup_cache.invalidate("order_statuses")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -64,6 +67,7 @@ def delete_order_status(order_status_id):
             sql = "DELETE FROM order_statuses WHERE order_status_id = %s"
             cursor.execute(sql, (order_status_id,))
             conn.commit()
+            lookup_cache.invalidate("order_statuses")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -0,0 +1,144 @@
+from array import array
+
+from db.connection import get_db_connection, db_cursor
+from models.money import Money
+
+try:
+    import numpy as np
+except ImportError:  # optional; the array code below gives the same results
+    np = None
+
+
+class OrderBalances:
+    """
+    Per-order totals for many orders at once, as parallel columns sorted by
+    order_id. Amounts are whole centavos (numpy int64 arrays when NumPy is
+    installed, array('q') otherwise); get() returns Money.
+    """
+
+    __slots__ = ("order_ids", "totals", "paid", "balances", "_index")
+
+    def __init__(self, order_ids, totals, paid, balances):
+        self.order_ids = order_ids
+        self.totals = totals
+        self.paid = paid
+        self.balances = balances
+        self._index = None
+
+    def __len__(self):
+        return len(self.order_ids)
+
+    def __iter__(self):
+        """(order_id, total, paid, balance) in centavos"""
+        return zip(self.order_ids, self.totals, self.paid, self.balances)
+
+    def get(self, order_id):
+        """(total, paid, balance) as Money, or None for an unknown order"""
+        if self._index is None:
+            self._index = {int(oid): i for i, oid in enumerate(self.order_ids)}
+        i = self._index.get(order_id)
+        if i is None:
+            return None
+        return (Money(int(self.totals[i])), Money(int(self.paid[i])),
+                Money(int(self.balances[i])))
+
+    def unpaid(self):
+        """order_ids with an outstanding balance"""
+        return [int(oid) for oid, balance in zip(self.order_ids, self.balances)
+                if balance > 0]
+
+
+def _sum_by_order_np(all_ids, ids, values):
+    out = np.zeros(len(all_ids), dtype=np.int64)
+    if len(ids):
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+        # reduceat keeps the sums in int64, so they stay exact
+        out[np.searchsorted(all_ids, sorted_ids[starts])] = np.add.reduceat(values[order], starts)
+    return out
+
+
+def _compute_np(item_order_ids, quantities, unit_prices, payment_order_ids, payment_amounts):
+    item_ids = np.asarray(item_order_ids, dtype=np.int64)
+    line_totals = np.asarray(quantities, dtype=np.int64) * np.asarray(unit_prices, dtype=np.int64)
+    pay_ids = np.asarray(payment_order_ids, dtype=np.int64)
+    amounts = np.asarray(payment_amounts, dtype=np.int64)
+
+    all_ids = np.union1d(item_ids, pay_ids)
+    totals = _sum_by_order_np(all_ids, item_ids, line_totals)
+    paid = _sum_by_order_np(all_ids, pay_ids, amounts)
+    return OrderBalances(all_ids, totals, paid, totals - paid)
+
+
+def _compute_arrays(item_order_ids, quantities, unit_prices, payment_order_ids, payment_amounts):
+    totals = {}
+    for order_id, qty, price in zip(item_order_ids, quantities, unit_prices):
+        totals[order_id] = totals.get(order_id, 0) + qty * price
+    paid = {}
+    for order_id, amount in zip(payment_order_ids, payment_amounts):
+        paid[order_id] = paid.get(order_id, 0) + amount
+
+    order_ids = array('q', sorted(totals.keys() | paid.keys()))
+    total_column = array('q', (totals.get(oid, 0) for oid in order_ids))
+    paid_column = array('q', (paid.get(oid, 0) for oid in order_ids))
+    balance_column = array('q', (t - p for t, p in zip(total_column, paid_column)))
+    return OrderBalances(order_ids, total_column, paid_column, balance_column)
+
+
+def compute_order_balances(item_order_ids, quantities, unit_prices,
+                           payment_order_ids=(), payment_amounts=()):
+    """
+    Totals, amounts paid and balances for every order in one pass.
+    The first three columns describe order items (unit prices in centavos),
+    the last two describe payments (amounts in centavos). Any sequences of
+    ints work: lists, array('q'), numpy arrays.
+    Orders appear once in the result even if they only have payments.
+    """
+    if np is not None:
+        return _compute_np(item_order_ids, quantities, unit_prices,
+                           payment_order_ids, payment_amounts)
+    return _compute_arrays(item_order_ids, quantities, unit_prices,
+                           payment_order_ids, payment_amounts)
+
+
+def load_order_balances(order_ids=None):
+    """
+    compute_order_balances() over the order_items and payments tables
+    (optionally only the given orders). Prices come back from MySQL as
+    centavo integers, so no Decimal is built per row.
+    Returns None if MySQL is unreachable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    where, params = "", ()
+    if order_ids is not None:
+        order_ids = list(order_ids)
+        if not order_ids:
+            return compute_order_balances((), (), ())
+        where = f"WHERE order_id IN ({', '.join(['%s'] * len(order_ids))})"
+        params = tuple(order_ids)
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            cursor.execute(f"""
+                SELECT order_id, quantity, CAST(price * 100 AS SIGNED)
+                FROM order_items {where}
+            """, params)
+            item_ids, quantities, prices = array('q'), array('q'), array('q')
+            for order_id, quantity, price in cursor:
+                item_ids.append(order_id)
+                quantities.append(quantity)
+                prices.append(price)
+
+            cursor.execute(f"""
+                SELECT order_id, CAST(amount_paid * 100 AS SIGNED)
+                FROM payments {where}
+            """, params)
+            pay_ids, amounts = array('q'), array('q')
+            for order_id, amount in cursor:
+                pay_ids.append(order_id)
+                amounts.append(amount)
+    finally:
+        conn.close()
+    return compute_order_balances(item_ids, quantities, prices, pay_ids, amounts)
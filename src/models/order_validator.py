@@ -1,55 +1,85 @@
-from decimal import Decimal
 from datetime import datetime
 
+from models.money import Money
+from models.records import Record
 
-class OrderValidator:
 
-    def __init__(self):
-        self.errors = []
+def customer_info_errors(name, phone, email, address):
+    """Messages for customer fields that are missing or malformed"""
+    errors = []
+    if not name or not name.strip():
+        errors.append("Customer name is required")
 
-    def validate_customer_info(self, name, phone, email, address):
-        self.errors = []
+    if not phone or not phone.strip():
+        errors.append("Contact number is required")
 
-        if not name or not name.strip():
-            self.errors.append("Customer name is required")
+    if email and '@' not in email:
+        errors.append("Invalid email format")
+    return errors
 
-        if not phone or not phone.strip():
-            self.errors.append("Contact number is required")
 
-        if email and '@' not in email:
-            self.errors.append("Invalid email format")
+def _positive_price(price):
+    try:
+        return Money.of(price).centavos > 0
+    except (TypeError, ValueError):
+        return False
 
-        return len(self.errors) == 0
 
-    def validate_order_items(self, items):
-        self.errors = []
+def order_items_errors(items):
+    """Messages for an empty item list or items with a bad qty/price"""
+    if not items:
+        return ["At least one service must be selected"]
 
-        if not items or len(items) == 0:
-            self.errors.append("At least one service must be selected")
-            return False
+    errors = []
+    for item in items:
+        qty = item.get('qty', 0)
+        if not isinstance(qty, int) or qty <= 0:
+            errors.append(
+                f"Invalid quantity for {item.get('service_name', 'service')}"
+            )
 
-        for item in items:
-            if item.get('qty', 0) <= 0:
-                self.errors.append(
-                    f"Invalid quantity for {item.get('service_name', 'service')}"
-                )
+        if not _positive_price(item.get('price', 0)):
+            errors.append(
+                f"Invalid price for {item.get('service_name', 'service')}"
+            )
+    return errors
 
-            if item.get('price', 0) <= 0:
-                self.errors.append(
-                    f"Invalid price for {item.get('service_name', 'service')}"
-                )
 
-        return len(self.errors) == 0
+def payment_errors(amount_paid, total_price, payment_status):
+    """Messages for a payment that does not fit the order total"""
+    try:
+        amount_paid = Money.of(amount_paid)
+    except (TypeError, ValueError):
+        return ["Invalid amount paid"]
+    try:
+        total_price = Money.of(total_price)
+    except (TypeError, ValueError):
+        return ["Invalid total price"]
 
-    def validate_payment(self, amount_paid, total_price, payment_status):
+    errors = []
+    if amount_paid.centavos < 0:
+        errors.append("Amount paid cannot be negative")
+
+    if payment_status.lower() == "paid" and amount_paid < total_price:
+        errors.append("Amount paid is less than total price")
+    return errors
+
+
+class OrderValidator:
+
+    def __init__(self):
         self.errors = []
 
-        if amount_paid < 0:
-            self.errors.append("Amount paid cannot be negative")
+    def validate_customer_info(self, name, phone, email, address):
+        self.errors = customer_info_errors(name, phone, email, address)
+        return len(self.errors) == 0
 
-        if payment_status.lower() == "paid" and amount_paid < total_price:
-            self.errors.append("Amount paid is less than total price")
+    def validate_order_items(self, items):
+        self.errors = order_items_errors(items)
+        return len(self.errors) == 0
 
+    def validate_payment(self, amount_paid, total_price, payment_status):
+        self.errors = payment_errors(amount_paid, total_price, payment_status)
         return len(self.errors) == 0
 
     def get_errors(self):
@@ -61,16 +91,80 @@ class OrderValidator:
         return "\n".join(f"• {error}" for error in self.errors)
 
 
+class ValidationIssue(Record):
+    """
+    One problem found in a batch of orders. section is customer, items or
+    payment (importers may add their own, e.g. order).
+    """
+    __slots__ = ("row", "section", "message")
+
+
+class BatchOrderValidator:
+    """
+    The OrderValidator rules for many orders, e.g. an import file.
+    Nothing is kept between records, so validate() runs over any number of
+    rows in constant memory and one instance can be shared between threads.
+
+    Each record is a mapping with the AddOrderDialog fields:
+    name, phone, email, address, items (dicts with qty, price and
+    service_name), amount_paid, payment_status and optionally total_price
+    (computed from the items when missing).
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def check(record, row=None):
+        """ValidationIssues for one record (empty if it is valid)"""
+        issues = [ValidationIssue(row, "customer", message)
+                  for message in customer_info_errors(
+                      record.get("name"), record.get("phone"),
+                      record.get("email"), record.get("address"))]
+
+        items = record.get("items") or ()
+        item_errors = order_items_errors(items)
+        issues.extend(ValidationIssue(row, "items", message) for message in item_errors)
+
+        total_price = record.get("total_price")
+        if total_price is None:
+            # A total cannot be trusted when the items it comes from are bad
+            if item_errors:
+                return issues
+            total_price = PaymentProcessor.calculate_total(items)
+        issues.extend(ValidationIssue(row, "payment", message)
+                      for message in payment_errors(record.get("amount_paid"), total_price,
+                                                    record.get("payment_status") or ""))
+        return issues
+
+    def validate(self, records, start=1):
+        """
+        Yield a ValidationIssue for every problem, numbering records from
+        start (1 = first data row). Consumes records lazily.
+        """
+        for row, record in enumerate(records, start):
+            yield from self.check(record, row)
+
+
 class PaymentProcessor:
 
     @staticmethod
     def calculate_total(order_items):
-        total = Decimal("0.00")
+        """Sum of qty * price as Money (prices may be Money, Decimal, float or str)"""
+        centavos = 0
         for item in order_items:
-            qty = item.get("qty", 0)
-            price = Decimal(str(item.get("price", 0)))
-            total += qty * price
-        return total
+            centavos += item.get("qty", 0) * Money.of(item.get("price", 0)).centavos
+        return Money(centavos)
+
+    @staticmethod
+    def calculate_totals(item_order_ids, quantities, unit_prices,
+                         payment_order_ids=(), payment_amounts=()):
+        """
+        calculate_total() for many orders from columnar data (centavos),
+        also giving amounts paid and balances. See compute_order_balances().
+        """
+        from models.order_totals import compute_order_balances
+        return compute_order_balances(item_order_ids, quantities, unit_prices,
+                                      payment_order_ids, payment_amounts)
 
     @staticmethod
     def determine_payment_date(payment_status):
@@ -84,13 +178,13 @@ class PaymentProcessor:
         status = payment_status.lower().strip()
 
         if status == "paid":
-            return Decimal(str(total_price))
+            return Money.of(total_price)
         elif status == "refunded":
-            return Decimal("0")
+            return Money(0)
         elif custom_amount is not None:
-            return Decimal(str(custom_amount))
+            return Money.of(custom_amount)
         else:
-            return Decimal("0")
+            return Money(0)
 
     @staticmethod
     def can_refund(payment_status):
@@ -108,8 +202,8 @@ class PaymentProcessor:
         """
         Automatically determine payment status based on amount
         """
-        amount_paid = Decimal(str(amount_paid))
-        total_price = Decimal(str(total_price))
+        amount_paid = Money.of(amount_paid).centavos
+        total_price = Money.of(total_price).centavos
 
         if amount_paid <= 0:
             return "Pending"
@@ -135,6 +229,17 @@ class OrderStatusManager:
         "cancelled": []
     }
 
+    # Statuses that need some payment first, and those that need full payment
+    PAYMENT_REQUIRED_STATUSES = (
+        "queueing",
+        "washing/cleaning",
+        "finishing up",
+        "ready for pickup/delivery!"
+    )
+    FULL_PAYMENT_REQUIRED_STATUSES = ("completed",)
+    UNPAID_PAYMENT_STATUSES = ("pending", "unpaid")
+    PAID_PAYMENT_STATUS = "paid"
+
     @classmethod
     def can_transition(cls, from_status, to_status):
         from_status = from_status.lower().strip()
@@ -163,24 +268,19 @@ class OrderStatusManager:
         new_order_status = new_order_status.lower().strip()
         payment_status = payment_status.lower().strip()
 
-        amount_paid = Decimal(str(amount_paid))
-        total_price = Decimal(str(total_price))
+        amount_paid = Money.of(amount_paid)
+        total_price = Money.of(total_price)
 
         # Rule 1: Cannot complete unless fully paid
-        if new_order_status == "completed":
-            if payment_status != "paid":
+        if new_order_status in cls.FULL_PAYMENT_REQUIRED_STATUSES:
+            if payment_status != cls.PAID_PAYMENT_STATUS:
                 return False, "Order cannot be completed unless payment status is 'Paid'."
             if amount_paid < total_price:
-                return False, f"Order cannot be completed. Amount paid (₱{float(amount_paid):.2f}) is less than total (₱{float(total_price):.2f})."
+                return False, f"Order cannot be completed. Amount paid ({amount_paid}) is less than total ({total_price})."
 
         # Rule 2: Cannot start process (Queueing or later) without payment started
-        if new_order_status in [
-            "queueing",
-            "washing/cleaning",
-            "finishing up",
-            "ready for pickup/delivery!"
-        ]:
-            if payment_status in ["pending", "unpaid"] or amount_paid <= 0:
+        if new_order_status in cls.PAYMENT_REQUIRED_STATUSES:
+            if payment_status in cls.UNPAID_PAYMENT_STATUSES or amount_paid <= 0:
                 return False, f"Order cannot move to '{new_order_status.title()}' without any payment."
 
         return True, ""
@@ -218,8 +318,8 @@ class PaymentStatusValidator:
         Returns: (is_valid, error_message, suggested_status)
         """
         new_payment_status = new_payment_status.lower().strip()
-        amount_paid = Decimal(str(amount_paid))
-        total_price = Decimal(str(total_price))
+        amount_paid = Money.of(amount_paid)
+        total_price = Money.of(total_price)
 
         # Determine what status SHOULD be based on amount
         if amount_paid <= 0:
@@ -237,14 +337,14 @@ class PaymentStatusValidator:
         if new_payment_status == "paid" and amount_paid < total_price:
             return (
                 False,
-                f"Cannot set status to 'Paid' when amount paid (₱{float(amount_paid):.2f}) is less than total (₱{float(total_price):.2f}).",
+                f"Cannot set status to 'Paid' when amount paid ({amount_paid}) is less than total ({total_price}).",
                 correct_status,
             )
 
         if new_payment_status in ["pending", "unpaid"] and amount_paid > 0:
             return (
                 False,
-                f"Cannot set status to '{new_payment_status.title()}' when amount paid is ₱{float(amount_paid):.2f}. Use 'Partial' instead.",
+                f"Cannot set status to '{new_payment_status.title()}' when amount paid is {amount_paid}. Use 'Partial' instead.",
                 correct_status,
             )
 
@@ -270,8 +370,8 @@ class PaymentStatusValidator:
         Automatically determine the correct payment status based on amount.
         Returns: status name as string.
         """
-        amount_paid = Decimal(str(amount_paid))
-        total_price = Decimal(str(total_price))
+        amount_paid = Money.of(amount_paid).centavos
+        total_price = Money.of(total_price).centavos
 
         if amount_paid <= 0:
             return "Pending"
@@ -1,35 +1,84 @@
-from db.connection import get_db_connection, db_cursor
+from db.connection import get_db_connection, db_cursor, VersionConflictError
+from models.change_log import record_change, commit_changes
+from models.money import Money
+from models.records import PaymentRecord
 
 
-def get_payments_by_order(order_id):
+def refresh_order_balances(cursor, order_ids):
     """
-    Get all payments for a given order.
+    Recompute orders.amount_paid_total and balance from the payments of
+    the given orders, using the caller's cursor (and transaction). Every
+    write to payments calls this, so reading an order's balance never
+    needs a SUM. The SUM here is a locking read, so two terminals adding
+    payments to one order cannot both miss each other's payment.
+    """
+    order_ids = [order_id for order_id in set(order_ids) if order_id is not None]
+    if not order_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    cursor.execute(f"""
+        UPDATE orders o
+        LEFT JOIN (
+            SELECT order_id, SUM(amount_paid) AS paid
+            FROM payments
+            WHERE order_id IN ({placeholders})
+            GROUP BY order_id
+        ) p ON p.order_id = o.order_id
+        SET o.amount_paid_total = COALESCE(p.paid, 0),
+            o.balance = o.total_price - COALESCE(p.paid, 0)
+        WHERE o.order_id IN ({placeholders})
+    """, order_ids + order_ids)
+
+
+def get_order_balance(order_id):
+    """
+    (total_price, amount_paid_total, balance) of an order as Money, read
+    from the order row. Returns None if the order or MySQL is missing.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with db_cursor(conn, dictionary=False) as cursor:
+            cursor.execute("""
+                SELECT total_price, amount_paid_total, balance
+                FROM orders WHERE order_id = %s
+            """, (order_id,))
+            row = cursor.fetchone()
+            return tuple(Money.of(value) for value in row) if row else None
+    finally:
+        conn.close()
+
+
+def get_payments_by_order(order_id, as_records=False):
+    """
+    Get all payments for a given order, oldest first.
+    Pass as_records=True to get PaymentRecord objects instead of dicts.
     """
     conn = get_db_connection()
     if not conn:
         return []
     try:
-        with db_cursor(conn) as cursor:
-            sql = """
-                SELECT
-                    payment_id,
-                    order_id,
-                    amount_paid,
-                    payment_date,
-                    payment_method_id,
-                    payment_status_id
+        with db_cursor(conn, dictionary=not as_records) as cursor:
+            sql = f"""
+                SELECT {PaymentRecord.columns()}
                 FROM payments
                 WHERE order_id = %s
+                ORDER BY payment_id
             """
             cursor.execute(sql, (order_id,))
+            if as_records:
+                return [PaymentRecord(*row) for row in cursor.fetchall()]
             return cursor.fetchall()
     finally:
         conn.close()
 
 
-def update_payment(payment_id, order_id, amount_paid, payment_date, payment_method_id, payment_status_id):
+def update_payment(payment_id, order_id, amount_paid, payment_date, payment_method_id, payment_status_id, version=None):
     """
     Update payment details for a given payment record.
+    When version is given, the update only applies if the row is still at
+    that version, otherwise VersionConflictError is raised.
     """
     conn = get_db_connection()
     if not conn:
@@ -43,20 +92,35 @@ def update_payment(payment_id, order_id, amount_paid, payment_date, payment_meth
                     amount_paid = %s,
                     payment_date = %s,
                     payment_method_id = %s,
-                    payment_status_id = %s
+                    payment_status_id = %s,
+                    version = version + 1
                 WHERE payment_id = %s
             """
-            cursor.execute(sql, (order_id, amount_paid, payment_date,
-                           payment_method_id, payment_status_id, payment_id))
-            conn.commit()
-            return cursor.rowcount > 0
+            params = [order_id, amount_paid, payment_date,
+                      payment_method_id, payment_status_id, payment_id]
+            if version is not None:
+                sql += " AND version = %s"
+                params.append(version)
+            cursor.execute(sql, params)
+            updated = cursor.rowcount > 0
+            if not updated and version is not None:
+                cursor.execute(
+                    "SELECT 1 FROM payments WHERE payment_id = %s", (payment_id,))
+                if cursor.fetchone():
+                    raise VersionConflictError("payments", payment_id)
+            if updated:
+                record_change(cursor, "payments",
+                              payment_id, "update", order_id)
+                refresh_order_balances(cursor, [order_id])
+            commit_changes(conn)
+            return updated
     finally:
         conn.close()
 
 
 def add_payment(order_id, amount_paid, payment_date, payment_method_id, payment_status_id):
     """
-    Add a new payment record for an order.
+    Add a payment to an order's ledger (an order may have any number).
     """
     conn = get_db_connection()
     if not conn:
@@ -69,8 +133,11 @@ def add_payment(order_id, amount_paid, payment_date, payment_method_id, payment_
             """
             cursor.execute(sql, (order_id, amount_paid,
                            payment_date, payment_method_id, payment_status_id))
-            conn.commit()
-            return cursor.lastrowid
+            payment_id = cursor.lastrowid
+            record_change(cursor, "payments", payment_id, "insert", order_id)
+            refresh_order_balances(cursor, [order_id])
+            commit_changes(conn)
+            return payment_id
     finally:
         conn.close()
 
@@ -84,9 +151,17 @@ def delete_payment(payment_id):
         return False
     try:
         with db_cursor(conn) as cursor:
+            cursor.execute(
+                "SELECT order_id FROM payments WHERE payment_id = %s", (payment_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
             sql = "DELETE FROM payments WHERE payment_id = %s"
             cursor.execute(sql, (payment_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+            record_change(cursor, "payments", payment_id,
+                          "delete", row["order_id"])
+            refresh_order_balances(cursor, [row["order_id"]])
+            commit_changes(conn)
+            return True
     finally:
         conn.close()
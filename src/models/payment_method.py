@@ -1,4 +1,5 @@
 from db.connection import get_db_connection, db_cursor
+from models import lookup_cache
 
 
 def add_payment_method(payment_method_name):
@@ -10,6 +11,7 @@ def add_payment_method(payment_method_name):
             sql = "INSERT INTO payment_methods (payment_method_name) VALUES (%s)"
             cursor.execute(sql, (payment_method_name,))
             conn.commit()
+            lookup_cache.invalidate("payment_methods")
             return cursor.lastrowid
     finally:
         conn.close()
@@ -50,6 +52,7 @@ def update_payment_method(payment_method_id, payment_method_name):
             sql = "UPDATE payment_methods SET payment_method_name = %s WHERE payment_method_id = %s"
             cursor.execute(sql, (payment_method_name, payment_method_id))
             conn.commit()
+            lookup_cache.invalidate("payment_methods")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -64,6 +67,7 @@ def delete_payment_method(payment_method_id):
             sql = "DELETE FROM payment_methods WHERE payment_method_id = %s"
             cursor.execute(sql, (payment_method_id,))
             conn.commit()
+            lookup_cache.invalidate("payment_methods")
             return cursor.rowcount > 0
     finally:
         conn.close()
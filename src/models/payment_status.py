@@ -1,4 +1,5 @@
 from db.connection import get_db_connection, db_cursor
+from models import lookup_cache
 
 
 def add_payment_status(payment_status_name):
@@ -10,6 +11,7 @@ def add_payment_status(payment_status_name):
             sql = "INSERT INTO payment_statuses (payment_status_name) VALUES (%s)"
             cursor.execute(sql, (payment_status_name,))
             conn.commit()
+            lookup_cache.invalidate("payment_statuses")
             return cursor.lastrowid
     finally:
         conn.close()
@@ -50,6 +52,7 @@ def update_payment_status(payment_status_id, payment_status_name):
             sql = "UPDATE payment_statuses SET payment_status_name = %s WHERE payment_status_id = %s"
             cursor.execute(sql, (payment_status_name, payment_status_id))
             conn.commit()
+            lookup_cache.invalidate("payment_statuses")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -64,6 +67,7 @@ def delete_payment_status(payment_status_id):
             sql = "DELETE FROM payment_statuses WHERE payment_status_id = %s"
             cursor.execute(sql, (payment_status_id,))
             conn.commit()
+            lookup_cache.invalidate("payment_statuses")
             return cursor.rowcount > 0
     finally:
         conn.close()
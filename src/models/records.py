@@ -0,0 +1,72 @@
+class Record:
+    """
+    Base class for compact row records.
+    Subclasses only list their columns in __slots__, so a record costs a
+    fixed-size object instead of a per-row dict. get() and [] are kept so
+    code written against dictionary cursor rows keeps working.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, None)
+
+    @classmethod
+    def columns(cls, alias=None):
+        """Column list for a SELECT returning fields in record order"""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + name for name in cls.__slots__)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*(row.get(name) for name in cls.__slots__))
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    # Records are mutable (e.g. MachineLoad.used_kg grows as pieces are
+    # placed), so a hash over the fields could change while the record sits
+    # in a set; they are deliberately unhashable. Key by the id column.
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}"
+                           for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class OrderRecord(Record):
+    # amount_paid_total and balance are kept up to date by refresh_order_balances()
+    __slots__ = ("order_id", "customer_id", "order_status_id",
+                 "order_date", "total_price", "version",
+                 "amount_paid_total", "balance")
+
+
+class OrderItemRecord(Record):
+    __slots__ = ("order_item_id", "order_id",
+                 "service_id", "quantity", "price")
+
+
+class PaymentRecord(Record):
+    __slots__ = ("payment_id", "order_id", "amount_paid", "payment_date",
+                 "payment_method_id", "payment_status_id", "version")
+
+
+class ServiceRecord(Record):
+    __slots__ = ("service_id", "category_id", "category_name", "service_name",
+                 "min_price", "max_price", "price_unit", "service_notes")
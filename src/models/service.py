@@ -1,4 +1,6 @@
 from db.connection import get_db_connection, db_cursor
+from models import lookup_cache
+from models.records import ServiceRecord
 
 
 def add_service(category_id, service_name, min_price, max_price, price_unit, service_notes):
@@ -14,6 +16,7 @@ def add_service(category_id, service_name, min_price, max_price, price_unit, ser
             cursor.execute(sql, (category_id, service_name,
                            min_price, max_price, price_unit, service_notes))
             conn.commit()
+            lookup_cache.invalidate("services")
             return cursor.lastrowid
     finally:
         conn.close()
@@ -35,12 +38,12 @@ def get_service_by_id(service_id):
         conn.close()
 
 
-def get_all_services():
+def get_all_services(as_records=False):
     conn = get_db_connection()
     if not conn:
         return []
     try:
-        with db_cursor(conn, dictionary=True) as cursor:
+        with db_cursor(conn, dictionary=not as_records) as cursor:
             sql = """
                 SELECT 
                     s.service_id,
@@ -57,6 +60,8 @@ def get_all_services():
             """
             cursor.execute(sql)
             rows = cursor.fetchall()
+            if as_records:
+                return [ServiceRecord(*row) for row in rows]
             return rows  # list of dicts with category_name included
     finally:
         conn.close()
@@ -89,6 +94,7 @@ def update_service(service_id, category_id, service_name, min_price, max_price,
             cursor.execute(sql, (category_id, service_name, min_price,
                            max_price, price_unit, service_notes, service_id))
             conn.commit()
+            lookup_cache.invalidate("services")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -103,6 +109,7 @@ def delete_service(service_id):
             sql = "DELETE FROM services WHERE service_id=%s"
             cursor.execute(sql, (service_id,))
             conn.commit()
+            lookup_cache.invalidate("services")
             return cursor.rowcount > 0
     finally:
         conn.close()
@@ -1,5 +1,6 @@
 from datetime import datetime
-from decimal import Decimal
+
+from models.money import Money
 
 
 class PaymentStatus:
@@ -11,7 +12,7 @@ class PaymentStatus:
         return None
 
     def get_amount_paid(self, total_price):
-        return Decimal("0")
+        return Money(0)
 
     def can_modify_amount(self):
         return True
@@ -35,7 +36,7 @@ class PartialStatus(PaymentStatus):
         super().__init__("Partial")
 
     def get_amount_paid(self, total_price):
-        return Decimal("0")
+        return Money(0)
 
     def get_display_color(self):
         return "#fd7e14"
@@ -50,7 +51,7 @@ class PaidStatus(PaymentStatus):
         return datetime.now()
 
     def get_amount_paid(self, total_price):
-        return Decimal(str(total_price))
+        return Money.of(total_price)
 
     def can_modify_amount(self):
         return False
@@ -74,7 +75,7 @@ class RefundedStatus(PaymentStatus):
         super().__init__("Refunded")
 
     def get_amount_paid(self, total_price):
-        return Decimal("0")
+        return Money(0)
 
     def can_modify_amount(self):
         return False
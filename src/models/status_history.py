@@ -0,0 +1,201 @@
+from db.connection import get_db_connection, db_cursor
+
+
+def record_status_changes(cursor, transitions, admin_id=None):
+    """
+    Log order status transitions using the caller's cursor (and
+    transaction), after the orders rows were updated and locked.
+    transitions yields (order_id, from_status_id, to_status_id);
+    from_status_id is None for a new order.
+    Besides appending to order_status_history this keeps the running
+    totals in order_status_durations (orders that entered and left each
+    status and the time they spent in it) and service_status_durations
+    (the same time split over the order's services) and stamps
+    orders.status_changed_at, so metrics never need to scan the history.
+    """
+    transitions = [t for t in transitions if t[1] != t[2]]
+    if not transitions:
+        return
+    cursor.execute("SELECT NOW() AS now")
+    row = cursor.fetchone()
+    now = row["now"] if isinstance(row, dict) else row[0]
+
+    order_ids = [order_id for order_id, _, _ in transitions]
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    cursor.execute(f"""
+        SELECT order_id, TIMESTAMPDIFF(SECOND, status_changed_at, %s) AS seconds
+        FROM orders WHERE order_id IN ({placeholders})
+    """, [now] + order_ids)
+    seconds_in = {}
+    for row in cursor.fetchall():
+        order_id, seconds = (row["order_id"], row["seconds"]) if isinstance(row, dict) else row
+        seconds_in[order_id] = max(seconds, 0) if seconds is not None else None
+
+    cursor.executemany("""
+        INSERT INTO order_status_history
+        (order_id, from_status_id, to_status_id, changed_at, admin_id, seconds_in_from)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [(order_id, from_id, to_id, now, admin_id,
+           seconds_in.get(order_id) if from_id is not None else None)
+          for order_id, from_id, to_id in transitions])
+
+    # status_id -> [entered, exited, seconds, longest]
+    totals = {}
+    for order_id, from_id, to_id in transitions:
+        totals.setdefault(to_id, [0, 0, 0, 0])[0] += 1
+        if from_id is not None:
+            seconds = seconds_in.get(order_id) or 0
+            entry = totals.setdefault(from_id, [0, 0, 0, 0])
+            entry[1] += 1
+            entry[2] += seconds
+            entry[3] = max(entry[3], seconds)
+    cursor.executemany("""
+        INSERT INTO order_status_durations
+        (order_status_id, entered_count, exited_count, total_seconds, max_seconds)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            entered_count = entered_count + VALUES(entered_count),
+            exited_count = exited_count + VALUES(exited_count),
+            total_seconds = total_seconds + VALUES(total_seconds),
+            max_seconds = GREATEST(max_seconds, VALUES(max_seconds))
+    """, [(status_id, *values) for status_id, values in totals.items()])
+
+    _add_service_durations(cursor, [(order_id, from_id, seconds_in.get(order_id))
+                                    for order_id, from_id, _ in transitions
+                                    if from_id is not None])
+
+    cursor.execute(f"""
+        UPDATE orders SET status_changed_at = %s WHERE order_id IN ({placeholders})
+    """, [now] + order_ids)
+
+
+def record_order_removals(cursor, order_ids):
+    """
+    Take orders that are about to be deleted out of the running totals,
+    using the caller's cursor (and transaction): each no longer counts as
+    having entered its current status, so entered - exited stays the
+    number of orders in that status. The time already spent in earlier
+    statuses stays in the totals. Call before the DELETE.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    cursor.execute(f"""
+        SELECT order_status_id FROM orders
+        WHERE order_id IN ({placeholders}) AND order_status_id IS NOT NULL
+        FOR UPDATE
+    """, order_ids)
+    removed = {}
+    for row in cursor.fetchall():
+        status_id = row["order_status_id"] if isinstance(row, dict) else row[0]
+        removed[status_id] = removed.get(status_id, 0) + 1
+    if removed:
+        cursor.executemany("""
+            UPDATE order_status_durations
+            SET entered_count = entered_count - %s
+            WHERE order_status_id = %s
+        """, [(count, status_id) for status_id, count in removed.items()])
+
+
+def _add_service_durations(cursor, exits):
+    """
+    Split the seconds each order spent in the status it left over its
+    items by quantity, and add them to the per-service totals.
+    exits yields (order_id, from_status_id, seconds).
+    """
+    exits = [(order_id, from_id, seconds) for order_id, from_id, seconds in exits
+             if seconds is not None]
+    if not exits:
+        return
+    placeholders = ", ".join(["%s"] * len(exits))
+    cursor.execute(f"""
+        SELECT order_id, service_id, quantity FROM order_items
+        WHERE order_id IN ({placeholders})
+    """, [order_id for order_id, _, _ in exits])
+    items = {}
+    for row in cursor.fetchall():
+        order_id, service_id, quantity = (
+            (row["order_id"], row["service_id"], row["quantity"])
+            if isinstance(row, dict) else row)
+        if quantity and quantity > 0:
+            items.setdefault(order_id, []).append((service_id, quantity))
+
+    # (service_id, status_id) -> [orders, units, seconds]
+    totals = {}
+    for order_id, from_id, seconds in exits:
+        order_items = items.get(order_id)
+        if not order_items:
+            continue
+        units = sum(quantity for _, quantity in order_items)
+        for service_id, quantity in order_items:
+            entry = totals.setdefault((service_id, from_id), [0, 0, 0])
+            entry[0] += 1
+            entry[1] += quantity
+            entry[2] += seconds * quantity // units
+    if not totals:
+        return
+    cursor.executemany("""
+        INSERT INTO service_status_durations
+        (service_id, order_status_id, order_count, units_total, total_seconds)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            order_count = order_count + VALUES(order_count),
+            units_total = units_total + VALUES(units_total),
+            total_seconds = total_seconds + VALUES(total_seconds)
+    """, [(service_id, status_id, *values)
+          for (service_id, status_id), values in totals.items()])
+
+
+def get_status_history(order_id):
+    """Transitions of one order, oldest first"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        with db_cursor(conn) as cursor:
+            sql = """
+                SELECT history_id, order_id, from_status_id, to_status_id,
+                       changed_at, admin_id, seconds_in_from
+                FROM order_status_history
+                WHERE order_id = %s
+                ORDER BY history_id
+            """
+            cursor.execute(sql, (order_id,))
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def get_status_metrics():
+    """
+    Per-status throughput from the running totals: orders that entered and
+    left each status, how many are in it now, and the average and longest
+    time spent in it (seconds, None before any order has left).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        with db_cursor(conn) as cursor:
+            sql = """
+                SELECT s.order_status_id, s.order_status_name,
+                       COALESCE(d.entered_count, 0) AS entered_count,
+                       COALESCE(d.exited_count, 0) AS exited_count,
+                       COALESCE(d.entered_count - d.exited_count, 0) AS current_count,
+                       d.total_seconds / NULLIF(d.exited_count, 0) AS avg_seconds,
+                       d.max_seconds
+                FROM order_statuses s
+                LEFT JOIN order_status_durations d ON d.order_status_id = s.order_status_id
+                ORDER BY s.order_status_id
+            """
+            cursor.execute(sql)
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def get_bottleneck_status():
+    """The status orders spend the longest in on average, or None"""
+    timed = [m for m in get_status_metrics() if m["avg_seconds"] is not None]
+    return max(timed, key=lambda m: m["avg_seconds"]) if timed else None
@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+from db.connection import get_db_connection, db_cursor
+from models.order_state_machine import get_order_state_machine
+
+
+# Orders worked on at the same time; the wait in the queue is the work
+# ahead of an order divided by this
+TURNAROUND_STATIONS = 3
+
+QUEUE_STATUS = "queueing"
+READY_STATUS = "ready for pickup/delivery!"
+
+
+class TurnaroundRates:
+    """
+    Historical processing times, read from the running totals that
+    record_status_changes() keeps up to date on every status change:
+    average seconds per order in each status, seconds per unit of each
+    service in each status, and how many orders are in each status now.
+    """
+
+    __slots__ = ("status_seconds", "service_seconds", "in_status")
+
+    def __init__(self, status_seconds=None, service_seconds=None, in_status=None):
+        self.status_seconds = status_seconds or {}    # status_id -> seconds per order
+        self.service_seconds = service_seconds or {}  # (service_id, status_id) -> seconds per unit
+        self.in_status = in_status or {}              # status_id -> orders in it now
+
+    @classmethod
+    def load(cls, cursor):
+        rates = cls()
+        cursor.execute("""
+            SELECT order_status_id, entered_count, exited_count, total_seconds
+            FROM order_status_durations
+        """)
+        for row in cursor.fetchall():
+            status_id = row["order_status_id"]
+            rates.in_status[status_id] = max(row["entered_count"] - row["exited_count"], 0)
+            if row["exited_count"]:
+                rates.status_seconds[status_id] = row["total_seconds"] / row["exited_count"]
+        cursor.execute("""
+            SELECT service_id, order_status_id, units_total, total_seconds
+            FROM service_status_durations
+            WHERE units_total > 0
+        """)
+        for row in cursor.fetchall():
+            rates.service_seconds[row["service_id"], row["order_status_id"]] = \
+                row["total_seconds"] / row["units_total"]
+        return rates
+
+    def work_seconds(self, status_id, items):
+        """
+        Expected seconds an order with items [(service_id, quantity)]
+        spends in status_id. Services never timed in that status are
+        charged the status average for their share of the quantity.
+        """
+        average = self.status_seconds.get(status_id, 0)
+        units = sum(quantity for _, quantity in items)
+        if not units:
+            return average
+        seconds = 0
+        for service_id, quantity in items:
+            rate = self.service_seconds.get((service_id, status_id))
+            seconds += quantity * rate if rate is not None else average * quantity / units
+        return seconds
+
+
+def remaining_statuses(machine, status_id):
+    """
+    Statuses an order in status_id still goes through before it is ready,
+    starting with its own; None if it will not become ready (it already
+    is, is finished or was cancelled).
+    """
+    ready_id = machine.id_of(READY_STATUS)
+    path = []
+    while status_id is not None and status_id != ready_id:
+        if status_id in path:
+            return None
+        path.append(status_id)
+        status_id = machine.next_in_process(status_id)
+    return path if status_id == ready_id and path else None
+
+
+def estimate_remaining_seconds(machine, rates, status_id, elapsed, items, queue_ahead):
+    """
+    Seconds until an order in status_id (entered elapsed seconds ago, with
+    items [(service_id, quantity)] and queue_ahead orders before it in the
+    queue) is ready, or None if it will not become ready.
+    Time before the queue, i.e. waiting for payment, is not counted.
+    """
+    path = remaining_statuses(machine, status_id)
+    if path is None:
+        return None
+    queue_id = machine.id_of(QUEUE_STATUS)
+    first_step = machine.next_in_process(queue_id) if queue_id is not None else None
+    if queue_id in path:
+        path = path[path.index(queue_id):]
+
+    seconds = 0
+    for step in path:
+        if step == queue_id:
+            # Everything queued before the order, plus what is being worked
+            # on now, shares the stations ahead of it
+            waiting = queue_ahead + rates.in_status.get(first_step, 0)
+            seconds += waiting * rates.status_seconds.get(first_step, 0) / TURNAROUND_STATIONS
+            continue
+        work = rates.work_seconds(step, items)
+        if step == status_id:
+            work = max(work - elapsed, 0)
+        seconds += work
+    return int(seconds)
+
+
+def estimate_ready_time(order_id):
+    """
+    When an order should be ready for pickup/delivery, from the current
+    queue, its services and the historical rates, as (ready_at, seconds
+    from now). None if the order is unknown, already ready, finished or
+    cancelled, or MySQL is unreachable.
+    """
+    machine = get_order_state_machine()
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with db_cursor(conn) as cursor:
+            cursor.execute("""
+                SELECT order_status_id, status_changed_at, NOW() AS now,
+                       TIMESTAMPDIFF(SECOND, status_changed_at, NOW()) AS elapsed
+                FROM orders WHERE order_id = %s
+            """, (order_id,))
+            order = cursor.fetchone()
+            if not order or remaining_statuses(machine, order["order_status_id"]) is None:
+                return None
+            status_id = order["order_status_id"]
+
+            cursor.execute(
+                "SELECT service_id, quantity FROM order_items WHERE order_id = %s", (order_id,))
+            items = [(row["service_id"], row["quantity"]) for row in cursor.fetchall()]
+            rates = TurnaroundRates.load(cursor)
+
+            queue_id = machine.id_of(QUEUE_STATUS)
+            if status_id == queue_id:
+                # Served in the order they entered the queue
+                cursor.execute("""
+                    SELECT COUNT(*) AS ahead FROM orders
+                    WHERE order_status_id = %s
+                      AND (status_changed_at < %s
+                           OR (status_changed_at = %s AND order_id < %s))
+                """, (queue_id, order["status_changed_at"],
+                      order["status_changed_at"], order_id))
+                queue_ahead = cursor.fetchone()["ahead"]
+            else:
+                queue_ahead = rates.in_status.get(queue_id, 0)
+    finally:
+        conn.close()
+
+    seconds = estimate_remaining_seconds(machine, rates, status_id,
+                                         max(order["elapsed"] or 0, 0), items, queue_ahead)
+    if seconds is None:
+        return None
+    return order["now"] + timedelta(seconds=seconds), seconds
+
+
+def describe_estimate(estimate):
+    """Text for a (ready_at, seconds) estimate, e.g. 'Oct 19, 03:40 PM (about 2h 15m)'"""
+    if estimate is None:
+        return "-"
+    ready_at, seconds = estimate
+    minutes = max(round(seconds / 60), 1)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    parts = [f"{value}{unit}" for value, unit in ((days, "d"), (hours, "h"), (minutes, "m"))
+             if value]
+    return f"{ready_at.strftime('%b %d, %I:%M %p')} (about {' '.join(parts[:2])})"
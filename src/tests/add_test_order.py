@@ -1,4 +1,5 @@
 from db.connection import get_db_connection, db_cursor
+from models.customer_class import upsert_customer
 import sys
 import os
 from datetime import datetime
@@ -32,17 +33,14 @@ def add_student_order():
 
             # Step 1: Add Customer
             print("👤 Step 1: Adding Customer...")
-            customer_sql = """
-                INSERT INTO customers (customer_name, customer_phone, customer_email, customer_address)
-                VALUES (%s, %s, %s, %s)
-            """
-            cursor.execute(customer_sql, (
+            # Reuses the customer if this phone number is already on file
+            customer_id = upsert_customer(
+                cursor,
                 "Juan Dela Cruz",
                 "09175551234",
                 "juan.delacruz@studentmail.com",
                 "Dormitory A, University Belt, Manila"
-            ))
-            customer_id = cursor.lastrowid
+            )
             order_data['customer_id'] = customer_id
             print(f"✅ Customer added with ID: {customer_id}")
 
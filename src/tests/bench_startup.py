@@ -0,0 +1,111 @@
+"""
+Startup benchmark for the kiosk window.
+
+Reports:
+  1. The slowest imports pulled in by gui.main_window (python -X importtime)
+  2. Time from process start to MainWindow's first paint
+
+Run from the project root:
+    python src/tests/bench_startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.dirname(current_dir)
+project_dir = os.path.dirname(src_dir)
+
+# Child process: import the window, show it and report the first paint
+FIRST_PAINT_SCRIPT = r"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src_dir!r})
+from PyQt6.QtCore import QObject, QEvent, QTimer
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from gui.main_window import MainWindow
+imported = time.perf_counter()
+window = MainWindow()
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            painted = time.perf_counter()
+            print(f"{{imported - start:.6f}} {{painted - start:.6f}}")
+            QTimer.singleShot(0, app.quit)
+            window.removeEventFilter(self)
+        return False
+
+
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+"""
+
+
+def import_breakdown(top):
+    """Slowest cumulative imports of gui.main_window, in microseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import sys; sys.path.insert(0, {src_dir!r}); import gui.main_window"],
+        cwd=project_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1])
+        return []
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [
+            part.strip() for part in line.split(":", 1)[1].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def time_to_first_paint(runs):
+    """(import seconds, first paint seconds) for each fresh process"""
+    script = FIRST_PAINT_SCRIPT.format(src_dir=src_dir)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", script], cwd=project_dir,
+                                capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        lines = [line for line in result.stdout.splitlines() if line.strip()]
+        if result.returncode != 0 or not lines:
+            print(f"❌ Run failed:\n{result.stderr.strip()}")
+            return timings
+        imported, painted = (float(value) for value in lines[-1].split())
+        timings.append((imported, painted, wall))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiosk startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print("📦 Slowest imports (cumulative ms / self ms):")
+    for cumulative_us, self_us, name in import_breakdown(args.top):
+        print(f"  {cumulative_us / 1000:8.1f}  {self_us / 1000:8.1f}  {name}")
+
+    print(f"\n🖼️  Time to first paint over {args.runs} runs:")
+    timings = time_to_first_paint(args.runs)
+    for i, (imported, painted, wall) in enumerate(timings, 1):
+        print(f"  run {i}: imports {imported * 1000:7.1f} ms, "
+              f"first paint {painted * 1000:7.1f} ms, process {wall * 1000:7.1f} ms")
+    if timings:
+        best = min(painted for _, painted, _ in timings)
+        print(f"\n✅ Best time to first paint: {best * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from models.order_status import get_all_order_statuses
 from models.category import get_all_categories
 from models.service import get_all_services
-from models.customer_class import get_all_customers, add_customer
+from models.customer_class import get_all_customers, add_customer, normalize_phone
 import sys
 import os
 # Add the project root to Python path
@@ -58,9 +58,14 @@ def test_models():
     # Test adding a customer (optional)
     print("\n🆕 Testing Add Customer:")
     try:
+        test_phone = "09123456789"
+        # add_customer reuses a customer with the same phone number, so only
+        # clean up the row if this test created it
+        existed = any(normalize_phone(c['contact_number']) == normalize_phone(test_phone)
+                      for c in customers)
         customer_id = add_customer(
             name="Test Customer",
-            phone="09123456789",
+            phone=test_phone,
             email="test@example.com",
             address="123 Test Street"
         )
@@ -69,7 +74,9 @@ def test_models():
 
             # Clean up - delete the test customer
             from models.customer_class import delete_customer
-            if delete_customer(customer_id):
+            if existed:
+                print("⚠️ Phone number was already on file, keeping that customer")
+            elif delete_customer(customer_id):
                 print("✅ Test customer cleaned up successfully")
         else:
             print("❌ Failed to add test customer")